@@ -0,0 +1,398 @@
+"""
+Bulk historical backfill of past seasons.
+
+The pollers only follow the current season. This crawls the competitions
+index of each requested season, then every round of every grade Mentone
+played in, and bulk-writes the competitions, grades and Mentone games
+(tagged with their season) for trend stats.
+
+All work goes through a resumable queue kept in a SQLite state file:
+interrupt a run and start the same command again to carry on where it
+stopped. Fetched pages are kept in a persistent response cache in the same
+file, so re-runs, or re-parsing after a parser fix, download nothing twice.
+Rounds are fetched concurrently (--workers, still under the per-host rate
+limit), parsed in the process pool (PARSE_WORKERS) and written in bulk
+without per-document reads, to Firestore or with --local to the SQLite
+mirror only.
+
+Usage (from the backend directory):
+    python backfill.py --seasons 2019-2024
+    python backfill.py --seasons 2022 2023 --local history.db --workers 12
+
+Environment:
+    BACKFILL_STATE     Work queue and response cache file (default backfill_state.db)
+    SEASON_INDEX_URL   Competitions index of a past season, {season} is replaced
+                       (default: the competitions index with ?season={season})
+    DRY_RUN, PARSE_WORKERS, RATE_LIMIT_RPS, ... as for the pollers
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+from utils.db import db, firestore
+from utils.fetch import POOL_MAXSIZE
+from utils.parsers import COMPETITIONS_URL, SITE_URL, classify_competition, classify_team, parse_competition_blocks
+from utils.parse_pool import ParsePool, parse_history_round
+from utils.response_cache import ResponseCache, cached_fetch_all_with_status
+from utils.work_queue import WorkQueue
+from utils.batch import BatchWriter, is_dry_run
+from utils.enhance import enhance_game_metadata
+from utils.ids import assign_game_id, make_comp_id, make_grade_id
+from utils.mirror import MirrorClient, MirrorWriter, get_mirror
+from utils import metrics, profiling
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"backfill_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_STATE_FILE = "backfill_state.db"
+DEFAULT_SEASON_INDEX_URL = COMPETITIONS_URL + "?season={season}"
+DEFAULT_WORKERS = 8
+TASKS_PER_WORKER = 4  # tasks claimed per wave, per fetch worker
+MAX_ROUNDS = 18
+# Rounds crawled before a grade with no Mentone games is dropped (a bye can
+# leave Mentone off any single round)
+GRADE_PROBE_ROUNDS = 3
+WRITE_BATCH_SIZE = 400
+SEASON_REGEX = re.compile(r"\b(19|20)\d{2}\b")
+
+def parse_seasons(values):
+    """Turn ["2019-2021", "2023"] into [2019, 2020, 2021, 2023]."""
+    seasons = []
+    for value in values:
+        if "-" in value:
+            first, last = (int(part) for part in value.split("-", 1))
+            seasons.extend(range(first, last + 1))
+        else:
+            seasons.append(int(value))
+    return sorted(set(seasons))
+
+def season_index_url(season):
+    """Competitions index URL for a season."""
+    return os.environ.get("SEASON_INDEX_URL", DEFAULT_SEASON_INDEX_URL).format(season=season)
+
+def round_url(comp_id, fixture_id, round_num):
+    return f"{SITE_URL}/games/{comp_id}/{fixture_id}/round/{round_num}"
+
+def round_task(season, comp_id, fixture_id, round_num, mentone=False):
+    """Work queue entry for one round page (mentone: an earlier round had Mentone games)."""
+    payload = {"season": season, "comp_id": comp_id, "fixture_id": fixture_id, "round": round_num,
+               "mentone": mentone}
+    return f"round:{comp_id}:{fixture_id}:{round_num}", "round", payload
+
+def task_url(task):
+    payload = task["payload"]
+    if task["kind"] == "index":
+        return season_index_url(payload["season"])
+    return round_url(payload["comp_id"], payload["fixture_id"], payload["round"])
+
+def competition_season(comp):
+    """Year named in a competition's heading or grade name, or None."""
+    for name in (comp.get("comp_heading", ""), comp["name"]):
+        match = SEASON_REGEX.search(name or "")
+        if match:
+            return int(match.group(0))
+    return None
+
+def build_competition(comp, season):
+    """Competition document for a past season (process_index sets created_at for new ones)."""
+    comp_name = comp.get("comp_heading") or comp["name"]
+    document_id = make_comp_id(comp["comp_id"])
+    return {
+        "id": document_id,
+        "original_id": comp["comp_id"],
+        "name": comp_name,
+        "type": classify_competition(comp_name),
+        "season": str(season),
+        "fixture_id": comp["fixture_id"],
+        "updated_at": firestore.SERVER_TIMESTAMP,
+        "active": False
+    }
+
+def build_grade(comp, competition_data, competition_ref):
+    """Grade document for a past season (process_index sets created_at for new ones)."""
+    team_type, team_gender = classify_team(comp["name"])
+    return {
+        "id": make_grade_id(comp["fixture_id"]),
+        "original_id": comp["fixture_id"],
+        "name": comp["name"],
+        "comp_id": comp["comp_id"],
+        "competition_name": competition_data["name"],
+        "competition_id": competition_data["id"],
+        "competition_ref": competition_ref,
+        "season": competition_data["season"],
+        "type": team_type,
+        "gender": team_gender,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    }
+
+def transform_history_game(game):
+    """
+    Prepare a backfilled game for writing.
+
+    created_at is set by process_round, and only for games not stored yet,
+    so re-running a season doesn't reset it.
+    """
+    game["updated_at"] = firestore.SERVER_TIMESTAMP
+    game["last_polled_at"] = firestore.SERVER_TIMESTAMP
+    return game
+
+def fetch_error(status):
+    """Why a page couldn't be fetched, for the work queue."""
+    return f"fetch failed (HTTP {status})" if status is not None else "fetch failed (no response)"
+
+class Backfill:
+    """One backfill run over a work queue."""
+
+    def __init__(self, queue, cache, writers, client, workers=DEFAULT_WORKERS):
+        """
+        Args:
+            queue: WorkQueue holding index and round tasks
+            cache: ResponseCache for fetched pages (or None)
+            writers: {"competitions": ..., "grades": ..., "games": ...} BatchWriter/MirrorWriter sinks
+            client: Client the documents reference each other through
+            workers: Concurrent fetches per wave
+        """
+        self.queue = queue
+        self.cache = cache
+        self.writers = writers
+        self.client = client
+        self.workers = workers
+        self.games = 0
+
+    def add_seasons(self, seasons):
+        """Queue the competitions index of each season."""
+        added = self.queue.add_many((f"index:{season}", "index", {"season": season}) for season in seasons)
+        logger.info(f"Queued {added} new seasons ({len(seasons) - added} already known)")
+
+    def run(self, pool):
+        """Work through the queue until it is empty."""
+        wave = 0
+        while True:
+            tasks = self.queue.claim(self.workers * TASKS_PER_WORKER)
+            if not tasks:
+                break
+            wave += 1
+
+            with metrics.stage("fetch_wave"):
+                pages = cached_fetch_all_with_status([task_url(task) for task in tasks], self.cache, self.workers)
+
+            done = []
+            round_tasks = []
+            for task, (html, status) in zip(tasks, pages):
+                if task["kind"] == "index":
+                    if self.process_index(task, html, status):
+                        done.append(task["key"])
+                elif html is None and status == 404 and task["payload"]["round"] > 1:
+                    # Past the last round: the page doesn't exist
+                    metrics.incr("backfill_missing_rounds")
+                    done.append(task["key"])
+                elif html is None:
+                    # Server errors, timeouts and an open circuit are retried on a later run
+                    self.fail(task, fetch_error(status))
+                else:
+                    round_tasks.append((task, html))
+
+            jobs = [(html, task["payload"]["comp_id"], task["payload"]["fixture_id"], task["payload"]["round"])
+                    for task, html in round_tasks]
+            with metrics.stage("parse"):
+                results = pool.map(parse_history_round, jobs)
+            for games, _ in results:
+                for game in games:
+                    assign_game_id(game)
+            stored = self.stored_ids("games", [game["id"] for games, _ in results for game in games])
+            for (task, _), (games, element_count) in zip(round_tasks, results):
+                self.process_round(task, games, element_count, stored)
+                done.append(task["key"])
+
+            # Only mark tasks done once what they produced is written
+            with metrics.stage("firestore_write"):
+                for writer in self.writers.values():
+                    writer.flush()
+            self.queue.complete(done)
+
+            counts = self.queue.counts()
+            logger.info(f"Wave {wave}: {len(tasks)} tasks, {self.games} games so far "
+                        f"({counts['pending']} pending, {counts['done']} done, {counts['failed']} failed)")
+
+    def fail(self, task, error):
+        if self.queue.fail(task["key"], error):
+            logger.warning(f"{task['key']}: {error}, will retry")
+        else:
+            logger.error(f"{task['key']}: {error}, giving up")
+
+    def stored_ids(self, collection, document_ids):
+        """IDs among document_ids already stored in a collection, read in one round trip."""
+        if not document_ids:
+            return set()
+        references = [self.client.collection(collection).document(document_id) for document_id in document_ids]
+        with metrics.stage("firestore_read"):
+            if hasattr(self.client, "get_all"):
+                snapshots = list(self.client.get_all(references))
+            else:
+                # The local mirror reads each document from SQLite
+                snapshots = [reference.get() for reference in references]
+        return {snapshot.id for snapshot in snapshots if snapshot.exists}
+
+    def process_index(self, task, html, status):
+        """Write a season's competitions and grades and queue round 1 of each grade."""
+        season = task["payload"]["season"]
+        if html is None:
+            self.fail(task, f"competitions index {fetch_error(status)}")
+            return False
+
+        competitions = parse_competition_blocks(html.decode("utf-8", errors="replace"))
+        kept = []
+        for comp in competitions:
+            named_season = competition_season(comp)
+            # The site may serve another season's index; don't file it under this one
+            if named_season is None or named_season == season:
+                kept.append(comp)
+        skipped = len(competitions) - len(kept)
+
+        # Documents already stored keep their created_at
+        stored_comps = self.stored_ids("competitions", list({make_comp_id(comp["comp_id"]) for comp in kept}))
+        stored_grades = self.stored_ids("grades", list({make_grade_id(comp["fixture_id"]) for comp in kept}))
+
+        new_tasks = []
+        for comp in kept:
+            competition_data = build_competition(comp, season)
+            competition_ref = self.client.collection("competitions").document(competition_data["id"])
+            grade_data = build_grade(comp, competition_data, competition_ref)
+            if competition_data["id"] not in stored_comps:
+                competition_data["created_at"] = firestore.SERVER_TIMESTAMP
+            if grade_data["id"] not in stored_grades:
+                grade_data["created_at"] = firestore.SERVER_TIMESTAMP
+            self.writers["competitions"].write(competition_data)
+            self.writers["grades"].write(grade_data)
+            new_tasks.append(round_task(season, comp["comp_id"], comp["fixture_id"], 1))
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} competitions on the {season} index that belong to another season")
+        added = self.queue.add_many(new_tasks)
+        logger.info(f"Season {season}: {len(competitions) - skipped} grades, queued {added}")
+        return True
+
+    def process_round(self, task, games, element_count, stored_ids):
+        """
+        Write a round's Mentone games and queue the next round while the grade goes on.
+
+        Args:
+            task: The round's work queue entry
+            games: Parsed games, with IDs assigned
+            element_count: Game elements on the page (Mentone's or not)
+            stored_ids: IDs of games already stored, which keep their created_at
+        """
+        payload = task["payload"]
+        comp_id, fixture_id, round_num = payload["comp_id"], payload["fixture_id"], payload["round"]
+
+        for game in games:
+            if game["id"] not in stored_ids:
+                game["created_at"] = firestore.SERVER_TIMESTAMP
+            game["season"] = str(payload["season"])
+            with metrics.stage("enhance"):
+                enhance_game_metadata(game)
+            self.writers["games"].write(game)
+        self.games += len(games)
+        metrics.incr("games_parsed", len(games))
+
+        # Grades Mentone isn't in are dropped once the first few rounds had
+        # none of its games; otherwise keep going (byes included) until a
+        # round has no games at all
+        mentone = payload.get("mentone", False) or bool(games)
+        if not mentone and round_num >= GRADE_PROBE_ROUNDS and element_count:
+            logger.debug(f"No Mentone games in {comp_id}/{fixture_id}, skipping the grade")
+        elif element_count and round_num < MAX_ROUNDS:
+            self.queue.add_many([round_task(payload["season"], comp_id, fixture_id, round_num + 1, mentone)])
+
+def make_writers(local_path=None):
+    """
+    Bulk sinks for the backfilled collections.
+
+    Args:
+        local_path: SQLite mirror to write to instead of Firestore
+
+    Returns:
+        Tuple of ({collection: writer}, client to build references with)
+    """
+    collections = {"competitions": None, "grades": None, "games": transform_history_game}
+    if local_path:
+        mirror = get_mirror(local_path)
+        writers = {name: MirrorWriter(mirror, name, transform, WRITE_BATCH_SIZE)
+                   for name, transform in collections.items()}
+        return writers, MirrorClient(mirror)
+
+    writers = {name: BatchWriter(db, name, transform, WRITE_BATCH_SIZE, flush_seconds=None, check_existing=False)
+               for name, transform in collections.items()}
+    return writers, db
+
+def main():
+    """Main function to run the backfill."""
+    parser = argparse.ArgumentParser(description="Backfill past seasons' competitions, grades and games")
+    parser.add_argument("--seasons", nargs="+", required=True, help="Years or ranges, e.g. 2019-2023 2025")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent fetches")
+    parser.add_argument("--state", default=os.environ.get("BACKFILL_STATE", DEFAULT_STATE_FILE),
+                        help="Work queue and response cache file")
+    parser.add_argument("--local", default=None, metavar="PATH",
+                        help="Write to this SQLite mirror instead of Firestore")
+    parser.add_argument("--retry-failed", action="store_true", help="Queue tasks that failed in earlier runs again")
+    parser.add_argument("--restart", action="store_true", help="Forget queued work (cached pages are kept)")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    metrics.start_run("backfill")
+    profiling.start("backfill")
+    logger.info("=== Mentone Hockey Club Historical Backfill ===")
+
+    if is_dry_run():
+        logger.info("Running in DRY RUN mode - nothing will be written")
+
+    seasons = parse_seasons(args.seasons)
+    workers = max(1, min(POOL_MAXSIZE, args.workers))
+    queue = WorkQueue(args.state)
+    cache = ResponseCache(args.state)
+
+    try:
+        if args.restart:
+            queue.clear()
+        if args.retry_failed:
+            logger.info(f"Retrying {queue.retry_failed()} failed tasks")
+
+        logger.info(f"Backfilling seasons {', '.join(map(str, seasons))} with {workers} fetch workers "
+                    f"into {'local mirror ' + args.local if args.local else 'Firestore'}")
+        writers, client = make_writers(args.local)
+        backfill = Backfill(queue, cache, writers, client, workers)
+        backfill.add_seasons(seasons)
+        with ParsePool() as pool:
+            backfill.run(pool)
+
+        for name, writer in writers.items():
+            writer.close()
+            logger.info(f"Wrote {writer.written} {name}")
+        for key, error in queue.failures():
+            logger.error(f"Failed: {key} ({error}); run again with --retry-failed")
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+    finally:
+        queue.close()
+        cache.close()
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Backfill completed in {elapsed_time:.2f} seconds")
+    metrics.write_report()
+    profiling.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark for the team and competition classifiers.
+
+Times utils.parsers.classify_team / classify_competition (one precompiled
+keyword regex plus an LRU cache) against the previous implementations,
+which lower-cased the name and ran a substring scan per keyword on every
+call. Every name is also checked for identical results.
+
+Names come from a synthetic league, mentone_teams.json and a list of
+real-world grade names; --live adds the current competitions index.
+
+Usage (from the backend directory):
+    python -m benchmarks.classify_bench --scale 10 --output classify.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from tabulate import tabulate
+
+from benchmarks.firestore_bench import git_version
+from utils.parsers import _classify_keywords, classify_competition, classify_team, get_competition_blocks
+from utils.synthetic import generate_league
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_SCALE = 10
+DEFAULT_PASSES = 20
+DEFAULT_REPEAT = 5
+TEAMS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mentone_teams.json")
+
+# Grade names seen on the Hockey Victoria site, covering every keyword
+EXTRA_NAMES = [
+    "Women's Premier League - 2025", "Men's Premier League Reserves - 2025",
+    "Women's Vic League 2 - 2025", "Men's Pennant C South East - 2025",
+    "Women's Metro 1 North - 2025", "Men's Metro 3 West - 2025",
+    "U12 Mixed Pennant West - 2025", "U14 Girls Pennant North - 2025",
+    "U16 Boys Vic League - 2025", "U18 Girls Pennant - 2025", "U10 Mixed - 2025",
+    "U13 Mixed Development - 2025", "Junior Boys Midweek - 2025",
+    "Masters Men 35+ A - 2025", "Masters Women 45+ - 2025", "Men's Masters 60+ - 2025",
+    "Midweek Women's Social - 2025", "Senior Mixed Indoor - 2025", "Outdoor Mixed Summer - 2025",
+    "Indoor Men's Division 1 - 2025", "Girls Development - 2025", "Social Hockey - 2025",
+]
+
+
+def legacy_classify_team(comp_name):
+    """classify_team as it was before the keyword regex and cache."""
+    comp_name_lower = comp_name.lower()
+
+    GENDER_MAP = {
+        "men": "Men",
+        "women": "Women",
+        "boys": "Boys",
+        "girls": "Girls",
+        "mixed": "Mixed"
+    }
+
+    TYPE_KEYWORDS = {
+        "senior": "Senior",
+        "junior": "Junior",
+        "midweek": "Midweek",
+        "masters": "Masters",
+        "outdoor": "Outdoor",
+        "indoor": "Indoor"
+    }
+
+    team_type = "Unknown"
+    for keyword, value in TYPE_KEYWORDS.items():
+        if keyword in comp_name_lower:
+            team_type = value
+            break
+
+    if "premier league" in comp_name_lower or "vic league" in comp_name_lower or "pennant" in comp_name_lower:
+        team_type = "Senior"
+    elif "u12" in comp_name_lower or "u14" in comp_name_lower or "u16" in comp_name_lower or "u18" in comp_name_lower:
+        team_type = "Junior"
+    elif "masters" in comp_name_lower or "35+" in comp_name_lower or "45+" in comp_name_lower or "60+" in comp_name_lower:
+        team_type = "Midweek"
+
+    if "women's" in comp_name_lower or "women" in comp_name_lower:
+        gender = "Women"
+    elif "men's" in comp_name_lower or "men" in comp_name_lower:
+        gender = "Men"
+    else:
+        gender = "Unknown"
+        for keyword, value in GENDER_MAP.items():
+            if keyword in comp_name_lower:
+                gender = value
+                break
+
+    return team_type, gender
+
+
+def legacy_classify_competition(comp_name):
+    """Competition type check as season_builder.create_competition did it."""
+    comp_type = "Senior"
+    if "junior" in comp_name.lower() or any(f"u{i}" in comp_name.lower() for i in range(10, 19)):
+        comp_type = "Junior"
+    elif "masters" in comp_name.lower() or any(f"{i}+" in comp_name.lower() for i in [35, 45, 60]):
+        comp_type = "Midweek/Masters"
+    return comp_type
+
+
+def competition_names(scale=DEFAULT_SCALE, live=False):
+    """Collect the competition and grade names to classify."""
+    league = generate_league(scale=scale)
+    names = [c["name"] for c in league["competitions"]] + [g["name"] for g in league["grades"]]
+    names.extend(EXTRA_NAMES)
+
+    try:
+        with open(TEAMS_FILE) as f:
+            names.extend(team["comp_name"] for team in json.load(f) if team.get("comp_name"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skipping {TEAMS_FILE}: {e}")
+
+    if live:
+        for comp in get_competition_blocks():
+            names.append(comp["name"])
+            if comp["comp_heading"]:
+                names.append(comp["comp_heading"])
+
+    return names
+
+
+def clear_caches():
+    """Forget every memoised classification."""
+    _classify_keywords.cache_clear()
+    classify_team.cache_clear()
+    classify_competition.cache_clear()
+
+
+def time_calls(func, names, passes, repeat, before_pass=None):
+    """Best-of-`repeat` time per call of `func` over `passes` runs through `names`."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(passes):
+            if before_pass:
+                before_pass()
+            for name in names:
+                func(name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / (passes * len(names))
+
+
+def run_benchmarks(scale=DEFAULT_SCALE, passes=DEFAULT_PASSES, repeat=DEFAULT_REPEAT, live=False):
+    """Compare the classifiers; returns a JSON-serialisable report."""
+    names = competition_names(scale, live)
+    pairs = [
+        ("classify_team", legacy_classify_team, classify_team),
+        ("classify_competition", legacy_classify_competition, classify_competition),
+    ]
+
+    results = []
+    for label, legacy, current in pairs:
+        mismatches = [name for name in names if legacy(name) != current(name)]
+        for name in mismatches[:10]:
+            logger.error(f"{label} mismatch for {name!r}: {legacy(name)} != {current(name)}")
+
+        legacy_ns = time_calls(legacy, names, passes, repeat) * 1e9
+        # Cold: cache cleared before each pass, so every distinct name is classified once
+        cold_ns = time_calls(current, names, passes, repeat, before_pass=clear_caches) * 1e9
+        warm_ns = time_calls(current, names, passes, repeat) * 1e9
+        results.append({
+            "function": label,
+            "names": len(names),
+            "distinct_names": len(set(names)),
+            "mismatches": len(mismatches),
+            "legacy_ns_per_call": round(legacy_ns, 1),
+            "cold_ns_per_call": round(cold_ns, 1),
+            "warm_ns_per_call": round(warm_ns, 1),
+            "cold_speedup": round(legacy_ns / cold_ns, 2),
+            "warm_speedup": round(legacy_ns / warm_ns, 2),
+        })
+
+    return {
+        "meta": {
+            "version": git_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "scale": scale,
+            "passes": passes,
+            "repeat": repeat,
+            "live": live,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+
+def print_report(report):
+    """Print a summary table of a benchmark report."""
+    rows = [[r["function"], r["names"], r["distinct_names"], r["mismatches"], r["legacy_ns_per_call"],
+             r["cold_ns_per_call"], r["warm_ns_per_call"], f"{r['cold_speedup']}x", f"{r['warm_speedup']}x"]
+            for r in report["results"]]
+    headers = ["Function", "Names", "Distinct", "Mismatches", "Legacy ns", "Cold ns", "Warm ns",
+               "Cold speedup", "Warm speedup"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark the team and competition classifiers")
+    parser.add_argument("--scale", type=int, default=DEFAULT_SCALE, help="Synthetic league scale")
+    parser.add_argument("--passes", type=int, default=DEFAULT_PASSES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--live", action="store_true", help="Also classify the live competitions index")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    report = run_benchmarks(args.scale, args.passes, args.repeat, args.live)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        logger.info(f"Wrote benchmark report to {args.output}")
+
+    if any(r["mismatches"] for r in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
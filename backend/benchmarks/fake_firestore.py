@@ -0,0 +1,307 @@
+"""
+In-process stand-in for the Firestore client used by the benchmarks.
+
+Implements the subset of the google-cloud-firestore surface the backend
+uses (collection/document/where/stream/get/set/create/update/delete/batch/get_all)
+and counts round trips, so write and read paths can be measured without a
+network. An optional simulated round-trip time models a remote server.
+"""
+import time
+from datetime import datetime, timezone
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+# Firestore's own limit on writes per batch commit
+MAX_BATCH_WRITES = 500
+
+
+def _copy_value(value):
+    """Copy plain containers so stored documents can't be mutated by callers."""
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, dict):
+        return {k: _copy_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(v) for v in value]
+    return value
+
+
+def _get_field(data, field_path):
+    """Resolve a dotted field path against a document dict."""
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _matches(value, op, expected):
+    """Evaluate a single where() filter."""
+    if op == "==":
+        return value == expected
+    if op == "!=":
+        return value is not None and value != expected
+    if op == "in":
+        return value in expected
+    if op == "not-in":
+        return value is not None and value not in expected
+    if op == "array_contains":
+        return isinstance(value, list) and expected in value
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(v in value for v in expected)
+
+    if value is None:
+        return False
+    try:
+        if op == "<":
+            return value < expected
+        if op == "<=":
+            return value <= expected
+        if op == ">":
+            return value > expected
+        if op == ">=":
+            return value >= expected
+    except TypeError:
+        # Firestore never compares across types
+        return False
+
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class FakeSnapshot:
+    """Minimal DocumentSnapshot."""
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return _copy_value(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        return _get_field(self._data or {}, field_path)
+
+
+class FakeDocumentReference:
+    """Minimal DocumentReference."""
+
+    def __init__(self, client, collection_name, doc_id):
+        self._client = client
+        self.collection_name = collection_name
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self.collection_name}/{self.id}"
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def get(self):
+        self._client._round_trip()
+        return self._client._snapshot(self)
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        self._client._apply_set(self, data, merge)
+
+    def update(self, data):
+        self._client._round_trip()
+        self._client._apply_update(self, data)
+
+    def delete(self):
+        self._client._round_trip()
+        self._client._apply_delete(self)
+
+
+class FakeQuery:
+    """Chained where()/order_by()/limit() query over one collection."""
+
+    def __init__(self, client, collection_name, filters=None, order=None, limit_count=None):
+        self._client = client
+        self._collection_name = collection_name
+        self._filters = filters or []
+        self._order = order or []
+        self._limit = limit_count
+
+    def where(self, field_path, op_string, value):
+        return FakeQuery(self._client, self._collection_name,
+                         self._filters + [(field_path, op_string, value)], self._order, self._limit)
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return FakeQuery(self._client, self._collection_name, self._filters,
+                         self._order + [(field_path, direction)], self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self._client, self._collection_name, self._filters, self._order, count)
+
+    def stream(self):
+        self._client._round_trip()
+        docs = self._client._store.get(self._collection_name, {})
+
+        results = []
+        for doc_id, data in docs.items():
+            if all(_matches(_get_field(data, f), op, v) for f, op, v in self._filters):
+                results.append((doc_id, data))
+
+        for field_path, direction in reversed(self._order):
+            results.sort(key=lambda item: (_get_field(item[1], field_path) is None,
+                                           _get_field(item[1], field_path)),
+                         reverse=str(direction).upper().startswith("DESC"))
+
+        if self._limit is not None:
+            results = results[:self._limit]
+
+        for doc_id, data in results:
+            ref = FakeDocumentReference(self._client, self._collection_name, doc_id)
+            yield FakeSnapshot(ref, data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    """Minimal CollectionReference."""
+
+    def __init__(self, client, collection_name):
+        super().__init__(client, collection_name)
+        self.id = collection_name
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._client, self._collection_name, doc_id)
+
+
+class FakeWriteBatch:
+    """Minimal WriteBatch; all queued writes land in one round trip."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(("set", reference, data, merge))
+
+    def create(self, reference, data):
+        self._writes.append(("create", reference, data, None))
+
+    def update(self, reference, data):
+        self._writes.append(("update", reference, data, None))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, None))
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"Batch of {len(self._writes)} writes exceeds the {MAX_BATCH_WRITES} limit")
+
+        self._client._round_trip()
+        # Batches are atomic: one existing document fails every create in it
+        for kind, reference, _, _ in self._writes:
+            if kind == "create" and reference.id in self._client._store.get(reference.collection_name, {}):
+                self._writes = []
+                raise AlreadyExists(f"Document already exists: {reference.path}")
+
+        self._client.stats["batch_commits"] += 1
+        for kind, reference, data, merge in self._writes:
+            if kind in ("set", "create"):
+                self._client._apply_set(reference, data, merge)
+            elif kind == "update":
+                self._client._apply_update(reference, data)
+            else:
+                self._client._apply_delete(reference)
+        self._writes = []
+
+
+class FakeClient:
+    """
+    In-memory Firestore client.
+
+    Args:
+        rtt_ms: Simulated network round-trip time added to every server call
+    """
+
+    def __init__(self, rtt_ms=0):
+        self.rtt_ms = rtt_ms
+        self._store = {}
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zero the round-trip and document counters."""
+        self.stats = {
+            "round_trips": 0,
+            "batch_commits": 0,
+            "doc_reads": 0,
+            "doc_writes": 0,
+            "doc_deletes": 0,
+        }
+
+    def _round_trip(self):
+        self.stats["round_trips"] += 1
+        if self.rtt_ms:
+            time.sleep(self.rtt_ms / 1000)
+
+    def _snapshot(self, reference):
+        self.stats["doc_reads"] += 1
+        data = self._store.get(reference.collection_name, {}).get(reference.id)
+        return FakeSnapshot(reference, data)
+
+    def _apply_set(self, reference, data, merge):
+        self.stats["doc_writes"] += 1
+        docs = self._store.setdefault(reference.collection_name, {})
+        if merge and reference.id in docs:
+            docs[reference.id].update(_copy_value(data))
+        else:
+            docs[reference.id] = _copy_value(data)
+
+    def _apply_update(self, reference, data):
+        docs = self._store.get(reference.collection_name, {})
+        if reference.id not in docs:
+            raise NotFound(f"No document to update: {reference.path}")
+
+        self.stats["doc_writes"] += 1
+        doc = docs[reference.id]
+        for field_path, value in data.items():
+            parts = field_path.split(".")
+            target = doc
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = _copy_value(value)
+
+    def _apply_delete(self, reference):
+        self.stats["doc_deletes"] += 1
+        self._store.get(reference.collection_name, {}).pop(reference.id, None)
+
+    def collection(self, collection_name):
+        return FakeCollectionReference(self, collection_name)
+
+    def document(self, document_path):
+        collection_name, doc_id = document_path.split("/", 1)
+        return FakeDocumentReference(self, collection_name, doc_id)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references, field_paths=None):
+        """Fetch many documents in a single round trip."""
+        references = list(references)
+        self._round_trip()
+        for reference in references:
+            yield self._snapshot(reference)
+
+    def count(self, collection_name):
+        """Number of stored documents in a collection (not a server call)."""
+        return len(self._store.get(collection_name, {}))
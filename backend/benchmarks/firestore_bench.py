@@ -0,0 +1,307 @@
+"""
+Firestore write/read benchmark harness.
+
+Measures batch_write_to_firestore, update_summaries and the query helpers in
+firestore_queries.py at several synthetic league sizes and reports ops/sec,
+round trips and latency percentiles per path as JSON, so results can be
+diffed between versions.
+
+Runs against the in-process fake client by default. Set
+FIRESTORE_EMULATOR_HOST (e.g. localhost:8080, see firebase.json) and pass
+--emulator to time against the local Firestore emulator instead; round-trip
+counts always come from the fake, which executes the same code path.
+
+Usage (from the backend directory):
+    python -m benchmarks.firestore_bench --scales 1 2 5 10 --output bench.json
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+from tabulate import tabulate
+
+from benchmarks.fake_firestore import FakeClient
+from utils.batch import batch_write_to_firestore
+from utils.db import set_db
+from utils.enhance import enhance_game_metadata
+from utils.synthetic import generate_league, home_club_games, mentone_teams_map
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_SCALES = [1, 2, 5, 10]
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 2025
+EMULATOR_PROJECT = "hockey-tracker-e67d0"
+SEED_BATCH_SIZE = 400
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def git_version():
+    """Short commit hash of the working tree, if available."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_emulator_client():
+    """Create a Firestore client pointed at the local emulator."""
+    from google.cloud import firestore as cloud_firestore
+
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise RuntimeError("FIRESTORE_EMULATOR_HOST must be set to use --emulator")
+    return cloud_firestore.Client(project=EMULATOR_PROJECT)
+
+
+def clear_store(client, collections):
+    """Delete benchmark data between runs."""
+    if isinstance(client, FakeClient):
+        for name in collections:
+            client._store.pop(name, None)
+        return
+
+    import requests
+
+    host = os.environ["FIRESTORE_EMULATOR_HOST"]
+    url = f"http://{host}/emulator/v1/projects/{EMULATOR_PROJECT}/databases/(default)/documents"
+    requests.delete(url, timeout=30).raise_for_status()
+
+
+def seed_league(client, league):
+    """Load a synthetic league into the client, linking teams/games to grades."""
+    batch = client.batch()
+    count = 0
+
+    def queue(collection, doc):
+        nonlocal batch, count
+        batch.set(client.collection(collection).document(doc["id"]), doc)
+        count += 1
+        if count >= SEED_BATCH_SIZE:
+            batch.commit()
+            batch = client.batch()
+            count = 0
+
+    for collection in ("clubs", "competitions", "grades"):
+        for doc in league[collection]:
+            queue(collection, doc)
+
+    for team in league["teams"]:
+        team = dict(team, grade_ref=client.collection("grades").document(team["grade_id"]))
+        queue("teams", team)
+
+    if count:
+        batch.commit()
+
+
+def run_path(name, size, func, repeat, setup=None, doc_count=0, counter_client=None):
+    """
+    Time one benchmark path.
+
+    Args:
+        name: Path name reported in the results
+        size: League scale the data was generated at
+        func: Callable executed once per repeat
+        repeat: Number of timed calls
+        setup: Optional untimed callable run before every call
+        doc_count: Documents processed per call, for ops/sec
+        counter_client: FakeClient whose stats give round trips per call
+
+    Returns:
+        Result dict for the JSON report
+    """
+    latencies = []
+    round_trips = []
+    doc_reads = []
+    doc_writes = []
+
+    for _ in range(repeat):
+        if setup:
+            setup()
+        if counter_client is not None:
+            counter_client.reset_stats()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if counter_client is not None:
+            round_trips.append(counter_client.stats["round_trips"])
+            doc_reads.append(counter_client.stats["doc_reads"])
+            doc_writes.append(counter_client.stats["doc_writes"])
+
+    total_seconds = sum(latencies) / 1000
+    return {
+        "path": name,
+        "scale": size,
+        "docs": doc_count,
+        "calls": repeat,
+        "ops_per_sec": round(doc_count * repeat / total_seconds, 1) if total_seconds and doc_count else None,
+        "round_trips": max(round_trips) if round_trips else None,
+        "doc_reads": max(doc_reads) if doc_reads else None,
+        "doc_writes": max(doc_writes) if doc_writes else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(max(latencies), 3),
+        },
+    }
+
+
+def bench_scale(client, scale, repeat, seed):
+    """Run every write and read path at one league scale."""
+    import firestore_queries
+    import fixture_poller
+
+    counter_client = client if isinstance(client, FakeClient) else None
+    set_db(client)
+
+    # Anchor the season so the weekly summary window has completed games
+    now = datetime.now()
+    league = generate_league(seed=seed, scale=scale, start_date=now - timedelta(weeks=9), as_of=now)
+    games = [enhance_game_metadata(copy.deepcopy(game)) for game in home_club_games(league)]
+    mentone_teams = mentone_teams_map(league)
+
+    clear_store(client, ["clubs", "competitions", "grades", "teams", "games",
+                         "team_summaries", "club_summaries"])
+    seed_league(client, league)
+
+    comp_id = league["competitions"][0]["original_id"]
+    fixture_id = league["grades"][0]["original_id"]
+
+    def clear_games():
+        clear_store(client, ["games"])
+
+    def write_games():
+        batch_write_to_firestore(client, copy.deepcopy(games), "games")
+
+    results = [
+        run_path("batch_write.games.create", scale, write_games, repeat,
+                 setup=clear_games, doc_count=len(games), counter_client=counter_client),
+        run_path("batch_write.games.update", scale, write_games, repeat,
+                 doc_count=len(games), counter_client=counter_client),
+        run_path("update_summaries", scale,
+                 lambda: fixture_poller.update_summaries(mentone_teams, copy.deepcopy(games)),
+                 repeat, doc_count=len(games), counter_client=counter_client),
+    ]
+
+    # Store games with grade references for the read helpers
+    for game in games:
+        game["grade_ref"] = client.collection("grades").document(f"grade_{game['fixture_id']}")
+    write_games()
+
+    teams_in_comp = sum(1 for t in league["teams"] if t["comp_id"] == comp_id)
+    teams_in_grade = sum(1 for t in league["teams"] if t["fixture_id"] == fixture_id)
+    weekly_games = sum(1 for g in games if now - timedelta(days=7) <= g["date"] <= now)
+
+    results.extend([
+        run_path("query.teams_by_competition", scale,
+                 lambda: firestore_queries.get_teams_by_competition(comp_id),
+                 repeat, doc_count=teams_in_comp, counter_client=counter_client),
+        run_path("query.teams_by_grade", scale,
+                 lambda: firestore_queries.get_teams_by_grade(fixture_id),
+                 repeat, doc_count=teams_in_grade, counter_client=counter_client),
+        run_path("query.weekly_summary", scale,
+                 firestore_queries.generate_weekly_summary,
+                 repeat, doc_count=weekly_games, counter_client=counter_client),
+    ])
+    return results
+
+
+def run_benchmarks(scales=None, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, rtt_ms=0, emulator=False):
+    """
+    Run the full benchmark suite.
+
+    Returns:
+        Report dict with "meta" and "results" keys
+    """
+    scales = scales or DEFAULT_SCALES
+    results = []
+
+    for scale in scales:
+        logger.info(f"Benchmarking scale {scale}x")
+        fake = FakeClient(rtt_ms=rtt_ms)
+        fake_results = bench_scale(fake, scale, repeat, seed)
+
+        if emulator:
+            # Time against the emulator, keep round-trip counts from the fake run
+            emulator_results = bench_scale(make_emulator_client(), scale, repeat, seed)
+            for timed, counted in zip(emulator_results, fake_results):
+                for key in ("round_trips", "doc_reads", "doc_writes"):
+                    timed[key] = counted[key]
+            fake_results = emulator_results
+
+        results.extend(fake_results)
+
+    return {
+        "meta": {
+            "version": git_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "backend": "emulator" if emulator else "fake",
+            "rtt_ms": rtt_ms,
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+
+def print_report(report):
+    """Print a summary table of a benchmark report."""
+    rows = []
+    for result in report["results"]:
+        latency = result["latency_ms"]
+        rows.append([result["path"], f"{result['scale']}x", result["docs"], result["ops_per_sec"],
+                     result["round_trips"], latency["p50"], latency["p95"], latency["p99"]])
+
+    headers = ["Path", "Scale", "Docs", "Ops/sec", "Round trips", "p50 ms", "p95 ms", "p99 ms"]
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark Firestore write and read paths")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--rtt-ms", type=float, default=0,
+                        help="Simulated round-trip time for the fake client")
+    parser.add_argument("--emulator", action="store_true", help="Time against the Firestore emulator")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    report = run_benchmarks(args.scales, args.repeat, args.seed, args.rtt_ms, args.emulator)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        logger.info(f"Wrote benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Merge duplicate game documents.
+
+Games used to be keyed only on a hash of competition, grade, round and both
+team names, so a renamed team or a game moved to another round got a new
+document while the old one stayed behind, and every later poll and summary
+scan processed both. Games are now keyed on the site's own game ID (with the
+hash kept as legacy_id); this job folds the leftovers into them.
+
+A hash-keyed game is merged into a game keyed on a site game ID when its ID
+is that game's legacy_id or one of its legacy_ids (the same game, re-keyed).
+The pollers migrate the current legacy_id themselves as they write, and add
+the previous one to legacy_ids when a renamed team or a moved round changes
+it, so this catches those leftovers and games the pollers haven't seen
+since. Hash-keyed games that only look like another game are reported for
+checking by hand, never merged: those in the same grade with the same
+Mentone team as a site-keyed game, in the same round, at the same start
+time or against the same opponent (leftovers from before the pollers kept
+legacy_ids), and those with the same grade, start time and teams as another
+hash-keyed game.
+
+Fields only a duplicate has are copied onto the kept game, which also keeps
+the earliest created_at and lists the merged IDs in legacy_ids. Each merged
+ID gets a game_aliases document pointing at the kept game, so old links can
+still be resolved (firestore_queries.get_game), and the duplicates are then
+deleted in batches. Running it again finds nothing to do.
+
+Usage (from the backend directory):
+    python compact_games.py
+
+Environment:
+    DRY_RUN   Report what would be merged without writing anything
+"""
+import logging
+import time
+from datetime import datetime
+
+from utils.db import db, firestore
+from utils.batch import BatchWriter, batch_delete_from_firestore, is_dry_run
+from utils import metrics
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"compact_games_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+ALIAS_COLLECTION = "game_aliases"
+WRITE_BATCH_SIZE = 400
+# Never copied from a duplicate onto the game it is merged into
+IDENTITY_FIELDS = {"id", "source_id", "legacy_id", "legacy_ids", "url", "created_at", "updated_at"}
+
+def is_source_keyed(game_id, game):
+    """Whether a game document is keyed on the site's game ID."""
+    return bool(game.get("source_id")) and str(game["source_id"]) == game_id
+
+def _date_key(value):
+    if value is None:
+        return ""
+    return value.strftime("%Y-%m-%d %H:%M") if hasattr(value, "strftime") else str(value)
+
+def _team_key(team):
+    return team.get("id") or team.get("name")
+
+def identity_key(game):
+    """Grade, start time and teams (IDs, else names) of a game, or None without a start time."""
+    if game.get("date") is None:
+        return None
+    return (game.get("fixture_id"), _date_key(game.get("date")),
+            _team_key(game.get("home_team", {})), _team_key(game.get("away_team", {})))
+
+def slot_keys(game):
+    """
+    (grade, Mentone team ID, round / start time / opponent) keys of a game.
+
+    Only tracked Mentone teams have IDs, and a team plays once per round,
+    so a hash-keyed game sharing one of these with a site-keyed game is
+    most likely the same game under an old name (same round or time) or
+    moved to another round (same opponent).
+    """
+    keys = []
+    for side, other_side in (("home_team", "away_team"), ("away_team", "home_team")):
+        team_id = game.get(side, {}).get("id")
+        if not team_id:
+            continue
+        if game.get("round") is not None:
+            keys.append((game.get("fixture_id"), team_id, "round", str(game["round"])))
+        if game.get("date") is not None:
+            keys.append((game.get("fixture_id"), team_id, "start time", _date_key(game["date"])))
+        if game.get(other_side, {}).get("name"):
+            keys.append((game.get("fixture_id"), team_id, "opponent", game[other_side]["name"]))
+    return keys
+
+def find_duplicates(games):
+    """
+    Work out which game documents are duplicates and where they belong.
+
+    Args:
+        games: {doc_id: game data} for the whole collection
+
+    Returns:
+        Tuple of ({duplicate doc_id: doc_id of the game it merges into},
+        [(doc_id, doc_id of the game it looks like, why)] to check by hand)
+    """
+    source_games = {game_id: game for game_id, game in games.items() if is_source_keyed(game_id, game)}
+
+    by_alias = {}
+    by_identity = {}
+    by_slot = {}
+    for game_id, game in source_games.items():
+        for alias in [game.get("legacy_id")] + list(game.get("legacy_ids") or []):
+            if alias:
+                by_alias[alias] = game_id
+        by_identity.setdefault(identity_key(game), []).append(game_id)
+        for key in slot_keys(game):
+            by_slot.setdefault(key, []).append(game_id)
+
+    duplicates = {}
+    suspects = []
+    hash_games = {}
+    for game_id, game in games.items():
+        if game_id in source_games:
+            continue
+
+        target = by_alias.get(game_id)
+        if target is not None:
+            duplicates[game_id] = target
+            continue
+
+        reasons = {}
+        key = identity_key(game)
+        if key is not None:
+            for other_id in by_identity.get(key, []):
+                reasons.setdefault(other_id, "same grade, start time and teams")
+            hash_games.setdefault(key, []).append(game_id)
+        for slot in slot_keys(game):
+            for other_id in by_slot.get(slot, []):
+                reasons.setdefault(other_id, f"same grade and Mentone team, same {slot[2]}")
+        suspects.extend((game_id, other_id, why) for other_id, why in sorted(reasons.items()))
+
+    # Hash-keyed games identical to each other
+    for group in hash_games.values():
+        group.sort()
+        suspects.extend((game_id, group[0], "same grade, start time and teams") for game_id in group[1:])
+
+    return duplicates, suspects
+
+def _earliest(values):
+    earliest = None
+    for value in values:
+        if not isinstance(value, datetime):
+            continue
+        try:
+            if earliest is None or value < earliest:
+                earliest = value
+        except TypeError:
+            # Naive and timezone-aware datetimes from different writers
+            continue
+    return earliest
+
+def merge_update(kept_id, kept, merged):
+    """
+    Fields to write onto a kept game for the duplicates merged into it.
+
+    Args:
+        kept_id: ID of the kept game
+        kept: Its data
+        merged: [(doc_id, data)] of its duplicates
+
+    Returns:
+        dict: Update for the kept game
+    """
+    update = {"id": kept_id}
+    for _, data in merged:
+        for field, value in data.items():
+            if field not in IDENTITY_FIELDS and field not in kept and field not in update:
+                update[field] = value
+
+    created_at = _earliest([kept.get("created_at")] + [data.get("created_at") for _, data in merged])
+    if created_at is not None and created_at != kept.get("created_at"):
+        update["created_at"] = created_at
+
+    legacy_ids = set(kept.get("legacy_ids") or [])
+    for doc_id, data in merged:
+        legacy_ids.add(doc_id)
+        legacy_ids.update(data.get("legacy_ids") or [])
+    update["legacy_ids"] = sorted(legacy_ids - {kept_id})
+    update["updated_at"] = firestore.SERVER_TIMESTAMP
+    return update
+
+def compact_games():
+    """
+    Merge and delete duplicate games.
+
+    Returns:
+        int: Number of duplicates removed
+    """
+    with metrics.stage("firestore_read"):
+        games = {doc.id: doc.to_dict() for doc in db.collection("games").stream()}
+        aliases = {doc.id: doc.to_dict() for doc in db.collection(ALIAS_COLLECTION).stream()}
+    logger.info(f"Loaded {len(games)} games and {len(aliases)} aliases")
+
+    duplicates, suspects = find_duplicates(games)
+    for game_id, other_id, why in suspects:
+        logger.warning(f"Possible duplicate: {game_id} looks like {other_id} ({why}), "
+                       f"not merged - check it and delete one by hand")
+    if not duplicates:
+        logger.info("No duplicate games found")
+        return 0
+
+    merged = {}
+    for doc_id, kept_id in duplicates.items():
+        merged.setdefault(kept_id, []).append((doc_id, games[doc_id]))
+    logger.info(f"Found {len(duplicates)} duplicates of {len(merged)} games")
+
+    # Merge and alias first, so an interrupted run never loses a game
+    with BatchWriter(db, "games", batch_size=WRITE_BATCH_SIZE, flush_seconds=None, check_existing=False) as writer:
+        for kept_id, group in merged.items():
+            logger.debug(f"Merging {', '.join(doc_id for doc_id, _ in group)} into {kept_id}")
+            writer.write(merge_update(kept_id, games[kept_id], group))
+
+    with BatchWriter(db, ALIAS_COLLECTION, batch_size=WRITE_BATCH_SIZE, flush_seconds=None,
+                     check_existing=False) as writer:
+        for doc_id, kept_id in duplicates.items():
+            writer.write({"id": doc_id, "game_id": kept_id, "created_at": firestore.SERVER_TIMESTAMP})
+
+        # Older aliases pointing at a game that is about to go
+        for alias_id, alias in aliases.items():
+            if alias.get("game_id") in duplicates:
+                writer.write({"id": alias_id, "game_id": duplicates[alias["game_id"]]})
+
+    return batch_delete_from_firestore(db, duplicates, "games", WRITE_BATCH_SIZE)
+
+def main():
+    """Main function to run the compaction."""
+    start_time = time.time()
+    metrics.start_run("compact_games")
+    logger.info("=== Mentone Hockey Club Game Compaction ===")
+
+    if is_dry_run():
+        logger.info("Running in DRY RUN mode - no Firestore changes will be made")
+
+    try:
+        removed = compact_games()
+        logger.info(f"Removed {removed} duplicate games")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Compaction completed in {elapsed_time:.2f} seconds")
+    metrics.write_report()
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,11 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import json
 from datetime import datetime, timedelta
 import os
+import sys
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate("../secrets/serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+# Shared backend helpers live one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.db import db
 
 def setup_collections():
     """Set up all collections in Firestore based on mentone_teams.json"""
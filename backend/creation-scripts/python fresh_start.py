@@ -1,16 +1,19 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import requests
 from bs4 import BeautifulSoup
-import re
 import json
 import logging
 import time
-from urllib.parse import urljoin
 from datetime import datetime, timedelta
 import os
+import sys
 import hashlib
 
+# Shared backend helpers live one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.db import db, firestore
+from utils.fetch import make_request
+from utils.parsers import (classify_competition, classify_team, extract_club_info, get_competition_blocks,
+                           is_valid_team, TEAM_ID_REGEX, GAME_ID_REGEX)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,100 +30,6 @@ BASE_URL = "https://www.revolutionise.com.au/vichockey/games/"
 TEAM_FILTER = "Mentone"
 HOME_CLUB_ID = "mentone"  # Used for filtering home club teams
 OUTPUT_FILE = "mentone_teams.json"
-REQUEST_TIMEOUT = 10  # seconds
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
-
-# Regex patterns
-COMP_FIXTURE_REGEX = re.compile(r"/games/(\d+)/(\d+)")
-TEAM_ID_REGEX = re.compile(r"/games/team/(\d+)/(\d+)")
-GAME_ID_REGEX = re.compile(r'/game/(\d+)$')
-
-# Gender/type classification based on naming
-GENDER_MAP = {
-    "men": "Men",
-    "women": "Women",
-    "boys": "Boys",
-    "girls": "Girls",
-    "mixed": "Mixed"
-}
-
-TYPE_KEYWORDS = {
-    "senior": "Senior",
-    "junior": "Junior",
-    "midweek": "Midweek",
-    "masters": "Masters",
-    "outdoor": "Outdoor",
-    "indoor": "Indoor"
-}
-
-# Initialize Firebase
-cred = credentials.Certificate("../secrets/serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-def make_request(url, retry_count=0):
-    """
-    Make an HTTP request with retries and error handling.
-
-    Args:
-        url (str): URL to request
-        retry_count (int): Current retry attempt
-
-    Returns:
-        requests.Response or None: Response object if successful, None if failed
-    """
-    try:
-        logger.debug(f"Requesting: {url}")
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Request to {url} failed: {e}. Retrying ({retry_count+1}/{MAX_RETRIES})...")
-            time.sleep(RETRY_DELAY)
-            return make_request(url, retry_count + 1)
-        else:
-            logger.error(f"Request to {url} failed after {MAX_RETRIES} attempts: {e}")
-            return None
-
-def extract_club_info(team_name):
-    """
-    Extract club name from team name.
-
-    Args:
-        team_name (str): Team name (e.g. "Mentone - Men's Vic League 1")
-
-    Returns:
-        tuple: (club_name, club_id)
-    """
-    if " - " in team_name:
-        club_name = team_name.split(" - ")[0].strip()
-    else:
-        # Handle case where there's no delimiter
-        club_name = team_name.split()[0]
-
-    # Generate simpler club_id
-    club_id = club_name.lower().replace(" ", "_").replace("-", "_")
-
-    return club_name, club_id
-
-def create_team_name(comp_name, club="Mentone"):
-    """
-    Create a descriptive team name from competition name.
-
-    Args:
-        comp_name (str): Competition name
-        club (str): Club name prefix
-
-    Returns:
-        str: Formatted team name
-    """
-    # Strip year and clean up competition name
-    name = comp_name.split(' - ')[0] if ' - ' in comp_name else comp_name
-
-    # Create a descriptive team name
-    return f"{club} - {name}"
 
 def create_or_get_club(club_name, club_id):
     """
@@ -163,105 +72,6 @@ def create_or_get_club(club_name, club_id):
     club_data = club_doc.to_dict()
     return club_ref, club_data
 
-def classify_team(comp_name):
-    """
-    Classify a team by type and gender based on competition name.
-
-    Args:
-        comp_name (str): Competition name
-
-    Returns:
-        tuple: (team_type, gender)
-    """
-    comp_name_lower = comp_name.lower()
-
-    # Determine team type
-    team_type = "Unknown"
-    for keyword, value in TYPE_KEYWORDS.items():
-        if keyword in comp_name_lower:
-            team_type = value
-            break
-
-    # Special case handling - identify senior/junior/masters competitions
-    if "premier league" in comp_name_lower or "vic league" in comp_name_lower or "pennant" in comp_name_lower:
-        team_type = "Senior"
-    elif "u12" in comp_name_lower or "u14" in comp_name_lower or "u16" in comp_name_lower or "u18" in comp_name_lower:
-        team_type = "Junior"
-    elif "masters" in comp_name_lower or "35+" in comp_name_lower or "45+" in comp_name_lower or "60+" in comp_name_lower:
-        team_type = "Midweek"
-
-    # Determine gender from competition name
-    if "women's" in comp_name_lower or "women" in comp_name_lower:
-        gender = "Women"
-    elif "men's" in comp_name_lower or "men" in comp_name_lower:
-        gender = "Men"
-    else:
-        # Fall back to keyword checking if not explicitly men's/women's
-        gender = "Unknown"
-        for keyword, value in GENDER_MAP.items():
-            if keyword in comp_name_lower:
-                gender = value
-                break
-
-    return team_type, gender
-
-def is_valid_team(name):
-    """
-    Filter out false positives like venue names.
-
-    Args:
-        name (str): Team name
-
-    Returns:
-        bool: True if valid team, False otherwise
-    """
-    invalid_keywords = ["playing fields", "grammar"]
-    return all(kw not in name.lower() for kw in invalid_keywords) and "hockey club" in name.lower()
-
-def get_competition_blocks():
-    """
-    Scrape the main page to get all competition blocks.
-
-    Returns:
-        list: List of competition dictionaries
-    """
-    logger.info("Discovering competitions from main page...")
-    res = make_request(BASE_URL)
-    if not res:
-        logger.error(f"Failed to get main page: {BASE_URL}")
-        return []
-
-    soup = BeautifulSoup(res.text, "html.parser")
-    competitions = []
-    current_heading = ""
-
-    # Find competition headings and links
-    headings = soup.find_all("h2")
-    logger.info(f"Found {len(headings)} competition heading sections")
-
-    for div in soup.select("div.px-4.py-2.border-top"):
-        heading_el = div.find_previous("h2")
-        if heading_el:
-            current_heading = heading_el.text.strip()
-
-        a = div.find("a")
-        if a and a.get("href"):
-            match = COMP_FIXTURE_REGEX.search(a["href"])
-            if match:
-                comp_id, fixture_id = match.groups()
-                comp_name = a.text.strip()
-                competitions.append({
-                    "name": comp_name,
-                    "comp_heading": current_heading,
-                    "comp_id": comp_id,
-                    "fixture_id": fixture_id,
-                    "url": urljoin("https://www.hockeyvictoria.org.au", a["href"])
-                })
-                logger.debug(f"Added competition: {comp_name} ({comp_id}/{fixture_id})")
-
-    logger.info(f"Found {len(competitions)} competitions")
-    return competitions
-
 def create_competition(comp):
     """
     Create a competition in Firestore with denormalized structure.
@@ -277,11 +87,7 @@ def create_competition(comp):
     comp_name = comp.get("comp_heading", comp["name"])
 
     # Determine competition type
-    comp_type = "Senior"  # Default type
-    if "junior" in comp_name.lower() or "u12" in comp_name.lower() or "u14" in comp_name.lower() or "u16" in comp_name.lower():
-        comp_type = "Junior"
-    elif "masters" in comp_name.lower() or "35+" in comp_name.lower() or "45+" in comp_name.lower() or "60+" in comp_name.lower():
-        comp_type = "Midweek/Masters"
+    comp_type = classify_competition(comp_name)
 
     # Extract season info
     season = "2025"  # Default
@@ -957,9 +763,6 @@ def fetch_real_games(mentone_teams, comp_data_map, grade_data_map):
                 db.collection("games").document(game["id"]).set(game)
                 games_found += 1
 
-            # Be nice to the server
-            time.sleep(0.5)
-
             # If no games found in this round, might have reached the end
             if not games and round_num > 1:
                 logger.info(f"No games found in round {round_num} for team {team_name}, stopping search")
@@ -1040,7 +843,7 @@ def main():
         cleanup_firestore()
 
         # Get competitions
-        comps = get_competition_blocks()
+        comps = get_competition_blocks(BASE_URL)
         if not comps:
             logger.error("No competitions found. Exiting.")
             return
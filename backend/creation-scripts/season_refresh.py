@@ -1,14 +1,17 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import requests
 from bs4 import BeautifulSoup
-import re
 import json
 import logging
 import time
-from urllib.parse import urljoin
 from datetime import datetime
 import os
+import sys
+
+# Shared backend helpers live one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.db import db, firestore
+from utils.fetch import make_request
+from utils.parsers import classify_competition, classify_team, extract_club_info, get_competition_blocks, is_valid_team
+from utils.ids import make_club_id
 
 # Configure logging
 logging.basicConfig(
@@ -25,68 +28,6 @@ logger = logging.getLogger(__name__)
 BASE_URL = "https://www.revolutionise.com.au/vichockey/games/"
 TEAM_FILTER = "Mentone"
 OUTPUT_FILE = "mentone_teams.json"
-REQUEST_TIMEOUT = 10  # seconds
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
-
-# Initialize Firebase
-cred = credentials.Certificate("../secrets/serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-# Regex for fixture links: /games/{comp_id}/{fixture_id}
-COMP_FIXTURE_REGEX = re.compile(r"/games/(\d+)/(\d+)")
-
-# Gender/type classification based on naming
-GENDER_MAP = {
-    "men": "Men",
-    "women": "Women",
-    "boys": "Boys",
-    "girls": "Girls",
-    "mixed": "Mixed"
-}
-
-TYPE_KEYWORDS = {
-    "senior": "Senior",
-    "junior": "Junior",
-    "midweek": "Midweek",
-    "masters": "Masters",
-    "outdoor": "Outdoor",
-    "indoor": "Indoor"
-}
-
-def make_request(url, retry_count=0):
-    """
-    Make an HTTP request with retries and error handling.
-    """
-    try:
-        logger.debug(f"Requesting: {url}")
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Request to {url} failed: {e}. Retrying ({retry_count+1}/{MAX_RETRIES})...")
-            time.sleep(RETRY_DELAY)
-            return make_request(url, retry_count + 1)
-        else:
-            logger.error(f"Request to {url} failed after {MAX_RETRIES} attempts: {e}")
-            return None
-
-def extract_club_info(team_name):
-    """
-    Extract club name from team name and create a club ID.
-    """
-    if " - " in team_name:
-        club_name = team_name.split(" - ")[0].strip()
-    else:
-        # Handle case where there's no delimiter
-        club_name = team_name.split()[0]
-
-    # Generate club_id - lowercase, underscores
-    club_id = f"club_{club_name.lower().replace(' ', '_').replace('-', '_')}"
-
-    return club_name, club_id
 
 def get_or_create_club(club_name, club_id):
     """
@@ -122,90 +63,6 @@ def get_or_create_club(club_name, club_id):
     club_ref.update({"updated_at": firestore.SERVER_TIMESTAMP})
     return club_ref, False
 
-def classify_team(comp_name):
-    """
-    Classify a team by type and gender based on competition name.
-    """
-    comp_name_lower = comp_name.lower()
-
-    # Determine team type
-    team_type = "Unknown"
-    for keyword, value in TYPE_KEYWORDS.items():
-        if keyword in comp_name_lower:
-            team_type = value
-            break
-
-    # Special case handling
-    if "premier league" in comp_name_lower or "vic league" in comp_name_lower or "pennant" in comp_name_lower:
-        team_type = "Senior"
-    elif "u12" in comp_name_lower or "u14" in comp_name_lower or "u16" in comp_name_lower or "u18" in comp_name_lower:
-        team_type = "Junior"
-    elif "masters" in comp_name_lower or "35+" in comp_name_lower or "45+" in comp_name_lower or "60+" in comp_name_lower:
-        team_type = "Midweek"
-
-    # Determine gender from competition name
-    if "women's" in comp_name_lower or "women" in comp_name_lower:
-        gender = "Women"
-    elif "men's" in comp_name_lower or "men" in comp_name_lower:
-        gender = "Men"
-    else:
-        # Fall back to keyword checking
-        gender = "Unknown"
-        for keyword, value in GENDER_MAP.items():
-            if keyword in comp_name_lower:
-                gender = value
-                break
-
-    return team_type, gender
-
-def create_team_name(comp_name, club="Mentone"):
-    """Create a team name from competition name."""
-    name = comp_name.split(' - ')[0] if ' - ' in comp_name else comp_name
-    return f"{club} - {name}"
-
-def is_valid_team(name):
-    """Filter out false positives like venue names."""
-    invalid_keywords = ["playing fields", "grammar"]
-    return all(kw not in name.lower() for kw in invalid_keywords) and "hockey club" in name.lower()
-
-def get_competition_blocks():
-    """Scrape the main page to get all competition blocks."""
-    logger.info("Discovering competitions from main page...")
-    res = make_request(BASE_URL)
-    if not res:
-        logger.error(f"Failed to get main page: {BASE_URL}")
-        return []
-
-    soup = BeautifulSoup(res.text, "html.parser")
-    competitions = []
-    current_heading = ""
-
-    # Find competition headings and links
-    headings = soup.find_all("h2")
-    logger.info(f"Found {len(headings)} competition heading sections")
-
-    for div in soup.select("div.px-4.py-2.border-top"):
-        heading_el = div.find_previous("h2")
-        if heading_el:
-            current_heading = heading_el.text.strip()
-
-        a = div.find("a")
-        if a and a.get("href"):
-            match = COMP_FIXTURE_REGEX.search(a["href"])
-            if match:
-                comp_id, fixture_id = match.groups()
-                comp_name = a.text.strip()
-                competitions.append({
-                    "name": comp_name,
-                    "comp_heading": current_heading,
-                    "comp_id": comp_id,
-                    "fixture_id": fixture_id,
-                    "url": urljoin("https://www.hockeyvictoria.org.au", a["href"])
-                })
-
-    logger.info(f"Found {len(competitions)} competitions")
-    return competitions
-
 def get_or_create_competition(comp):
     """Get existing competition or create if new."""
     comp_id = int(comp["comp_id"])
@@ -217,11 +74,7 @@ def get_or_create_competition(comp):
     # Check if competition exists
     if not comp_ref.get().exists:
         # Determine competition type
-        comp_type = "Senior"  # Default
-        if "junior" in comp_name.lower() or any(f"u{i}" in comp_name.lower() for i in range(10, 19)):
-            comp_type = "Junior"
-        elif "masters" in comp_name.lower() or any(f"{i}+" in comp_name.lower() for i in [35, 45, 60]):
-            comp_type = "Midweek/Masters"
+        comp_type = classify_competition(comp_name)
 
         # Extract season info
         season = str(datetime.now().year)  # Default to current year
@@ -284,7 +137,8 @@ def find_current_season_teams(competitions):
             text = a.text.strip()
             if TEAM_FILTER.lower() in text.lower() and is_valid_team(text):
                 # Extract club info
-                club_name, club_id = extract_club_info(text)
+                club_name, _ = extract_club_info(text)
+                club_id = make_club_id(club_name)
 
                 # Get or create club
                 club_ref, _ = get_or_create_club(club_name, club_id)
@@ -379,7 +233,7 @@ def main():
         archive_old_teams()
 
         # Get competitions
-        comps = get_competition_blocks()
+        comps = get_competition_blocks(BASE_URL)
         if not comps:
             logger.error("No competitions found. Exiting.")
             return
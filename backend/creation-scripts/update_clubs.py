@@ -1,12 +1,18 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import requests
 from bs4 import BeautifulSoup
 import logging
 import time
 import re
+import os
+import sys
 from datetime import datetime
 
+# Shared backend helpers live one level up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.db import db, firestore
+from utils.batch import BatchWriter
+from utils.fetch import fetch_all, make_request
+from utils.ids import make_club_id
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,32 +26,8 @@ logger = logging.getLogger(__name__)
 
 # Constants
 BASE_URL = "https://www.hockeyvictoria.org.au/games/team/"
-REQUEST_TIMEOUT = 10  # seconds
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
-
-# Initialize Firebase
-cred = credentials.Certificate("../secrets/serviceAccountKey.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-def make_request(url, retry_count=0):
-    """
-    Make an HTTP request with retries and error handling.
-    """
-    try:
-        logger.debug(f"Requesting: {url}")
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Request to {url} failed: {e}. Retrying ({retry_count+1}/{MAX_RETRIES})...")
-            time.sleep(RETRY_DELAY)
-            return make_request(url, retry_count + 1)
-        else:
-            logger.error(f"Request to {url} failed after {MAX_RETRIES} attempts: {e}")
-            return None
+DEFAULT_WORKERS = 8  # concurrent team page fetches, still under the per-host rate limit
+FULL_NAME_REGEX = re.compile(r"\b(?:Hockey|HC)\b")
 
 def extract_full_club_name(comp_id, team_id):
     """
@@ -66,7 +48,20 @@ def extract_full_club_name(comp_id, team_id):
         logger.warning(f"Failed to fetch team page")
         return None
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    return parse_full_club_name(response.text, comp_id)
+
+def parse_full_club_name(html, comp_id):
+    """
+    Find the full club name on a fetched team page.
+
+    Args:
+        html (str): Team page content
+        comp_id (str): Competition ID of the team
+
+    Returns:
+        str or None: Full club name if found, None otherwise
+    """
+    soup = BeautifulSoup(html, "html.parser")
 
     # Try to find the team heading which includes the club name
     # Format: "2025 Term 1 Summer Outdoor · KBH Brumbies Hockey Club"
@@ -108,88 +103,136 @@ def extract_full_club_name(comp_id, team_id):
     logger.warning(f"Could not find full club name on page")
     return None
 
-def update_club_names():
+def is_full_club_name(name):
+    """Whether a stored club name is already the full name (e.g. "Essendon Hockey Club")."""
+    return bool(FULL_NAME_REGEX.search(name or ""))
+
+def team_page_id(team_id, team_data):
+    """Site team ID of a team document (the suffix of older generated IDs)."""
+    original_id = str(team_data.get('original_id', ''))
+    if original_id.isdigit():
+        return original_id
+    return team_id.split('_')[-1] if '_' in team_id else team_id
+
+def club_document_id(team_data, stored_clubs):
     """
-    Update all club names in Firestore.
+    ID of a team's club document.
+
+    Teams store the site club ID ("mentone") while club documents are keyed
+    by make_club_id ("club_mentone"), so go through the team's club_ref.
     """
-    # Get all teams to collect comp_id and team_id pairs
-    teams_ref = db.collection("teams").stream()
-    teams = []
-
-    for doc in teams_ref:
-        team_data = doc.to_dict()
-        teams.append({
-            'id': doc.id,
-            'name': team_data.get('name', ''),
-            'comp_id': team_data.get('comp_id', ''),
-            'club': team_data.get('club', ''),
-            'club_id': team_data.get('club_id', '')
-        })
+    club_ref = team_data.get('club_ref')
+    if club_ref is not None and getattr(club_ref, 'id', None):
+        return club_ref.id
+    club_id = team_data.get('club_id')
+    if club_id in stored_clubs:
+        return club_id
+    return make_club_id(team_data['club']) if team_data.get('club') else club_id
+
+def find_full_names(clubs, max_workers=DEFAULT_WORKERS):
+    """
+    Look up the full name of several clubs concurrently.
 
-    logger.info(f"Found {len(teams)} teams in Firestore")
+    Works in waves: each wave fetches the next untried team page of every
+    club still without a name, all at once through fetch_all (so the shared
+    per-host rate limit applies), and a club drops out at its first success.
 
-    # Collect all unique clubs
-    clubs = {}
-    for team in teams:
-        if 'club_id' in team and team['club_id'] not in clubs:
-            clubs[team['club_id']] = {
-                'current_name': team.get('club', ''),
-                'full_name': None,
-                'teams': []
-            }
+    Args:
+        clubs: {club_id: club dict with a 'teams' list of {'id', 'comp_id', 'page_id'}}
+        max_workers: Concurrent fetches
 
-        if 'club_id' in team and team['club_id'] in clubs:
-            clubs[team['club_id']]['teams'].append({
-                'id': team['id'],
-                'comp_id': team['comp_id']
-            })
+    Returns:
+        dict: {club_id: full name} for the clubs a name was found for
+    """
+    found = {}
+    attempt = 0
+    while True:
+        wave = [(club_id, club_data['teams'][attempt]) for club_id, club_data in clubs.items()
+                if club_id not in found and attempt < len(club_data['teams'])]
+        if not wave:
+            break
+
+        logger.info(f"Fetching {len(wave)} team pages (attempt {attempt + 1})")
+        urls = [f"{BASE_URL}{team['comp_id']}/{team['page_id']}" for _, team in wave]
+        for (club_id, team), response in zip(wave, fetch_all(urls, max_workers)):
+            if not response:
+                continue
+            full_name = parse_full_club_name(response.text, team['comp_id'])
+            if full_name:
+                found[club_id] = full_name
+        attempt += 1
+
+    return found
+
+def update_club_names(max_workers=DEFAULT_WORKERS):
+    """
+    Update all club names in Firestore.
 
-    logger.info(f"Found {len(clubs)} unique clubs")
+    Team pages are only fetched for clubs not yet stored under a full name,
+    so re-running it after every season build only fetches pages for new
+    clubs. Teams of every club are still checked, and any whose club name
+    differs from the club's full name are renamed, as new season builds
+    write the short name onto team documents. Club and team renames are
+    written in batches.
 
-    # For each club, try to scrape the full name
-    for club_id, club_data in clubs.items():
-        logger.info(f"Processing club: {club_data['current_name']} ({club_id})")
+    Returns:
+        int: Number of clubs renamed
+    """
+    # Get all teams to collect comp_id and team_id pairs
+    stored_clubs = {doc.id: doc.to_dict() for doc in db.collection("clubs").stream()}
+    teams = [(doc.id, doc.to_dict()) for doc in db.collection("teams").stream()]
+    logger.info(f"Found {len(teams)} teams and {len(stored_clubs)} clubs in Firestore")
 
-        # Try each team until we get a full name
-        for team in club_data['teams']:
-            # Normalize team ID if it contains prefix/suffix
-            raw_team_id = team['id']
-            if '_' in raw_team_id:
-                raw_team_id = raw_team_id.split('_')[-1]
+    # Group the teams by club
+    clubs = {}
+    for team_id, team_data in teams:
+        club_id = club_document_id(team_data, stored_clubs)
+        if not club_id:
+            continue
 
-            full_club_name = extract_full_club_name(team['comp_id'], raw_team_id)
+        if club_id not in clubs:
+            clubs[club_id] = {
+                'current_name': stored_clubs.get(club_id, {}).get('name') or team_data.get('club', ''),
+                'teams': []
+            }
 
-            if full_club_name:
-                club_data['full_name'] = full_club_name
-                # Once we find it, no need to check other teams
-                break
+        clubs[club_id]['teams'].append({
+            'id': team_id,
+            'comp_id': team_data.get('comp_id', ''),
+            'page_id': team_page_id(team_id, team_data),
+            'club': team_data.get('club', '')
+        })
 
-            # Be nice to the server
-            time.sleep(0.5)
+    # Only clubs still missing a full name need their team pages
+    known_names = {club_id: club_data['current_name'] for club_id, club_data in clubs.items()
+                   if is_full_club_name(club_data['current_name'])}
+    missing = {club_id: club_data for club_id, club_data in clubs.items() if club_id not in known_names}
+    logger.info(f"{len(missing)} clubs need a full name, {len(known_names)} already have one")
+    found_names = find_full_names(missing, max_workers) if missing else {}
 
-        # If we didn't find a full name, keep the current one
-        if not club_data['full_name']:
-            club_data['full_name'] = club_data['current_name']
+    club_writer = BatchWriter(db, "clubs", flush_seconds=None, check_existing=False)
+    team_writer = BatchWriter(db, "teams", flush_seconds=None, check_existing=False)
+    for club_id, club_data in clubs.items():
+        full_name = known_names.get(club_id) or found_names.get(club_id)
+        if not full_name:
             logger.warning(f"Could not find full name for {club_data['current_name']}, keeping current name")
             continue
 
-        # Update the club in Firestore
-        logger.info(f"Updating club: {club_data['current_name']} -> {club_data['full_name']}")
-        club_ref = db.collection("clubs").document(club_id)
-        club_ref.update({
-            'name': club_data['full_name'],
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        if club_id in found_names:
+            logger.info(f"Updating club: {club_data['current_name']} -> {full_name}")
+            if club_id in stored_clubs:
+                club_writer.write({'id': club_id, 'name': full_name, 'updated_at': firestore.SERVER_TIMESTAMP})
 
         # Also update club name in all teams
         for team in club_data['teams']:
-            team_ref = db.collection("teams").document(team['id'])
-            team_ref.update({
-                'club': club_data['full_name'],
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-
-    logger.info("Club name update completed")
+            if team['club'] != full_name:
+                team_writer.write({'id': team['id'], 'club': full_name, 'updated_at': firestore.SERVER_TIMESTAMP})
+    club_writer.close()
+    team_writer.close()
+
+    logger.info(f"Club name update completed: {len(found_names)} clubs renamed, "
+                f"{team_writer.written} teams updated")
+    return len(found_names)
 
 def display_club_changes():
     """
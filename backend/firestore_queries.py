@@ -1,3 +1,22 @@
+from datetime import datetime, timedelta
+from tabulate import tabulate
+
+from utils.db import db
+from utils.mirror import MirrorClient, get_mirror
+
+def use_mirror(path=None):
+    """
+    Run the query helpers against the local SQLite mirror instead of Firestore.
+
+    Args:
+        path: Mirror file (defaults to LOCAL_MIRROR)
+    """
+    global db
+    mirror = get_mirror(path)
+    if mirror is None:
+        raise ValueError("No local mirror configured, set LOCAL_MIRROR or pass a path")
+    db = MirrorClient(mirror)
+
 def get_teams_by_competition(comp_id):
     """Get all teams in a specific competition"""
     print(f"Fetching teams for competition {comp_id}...")
@@ -65,6 +84,48 @@ def get_teams_by_grade(fixture_id):
 
     return teams
 
+def get_game(game_id):
+    """
+    Get a game by ID, following game_aliases for IDs merged away by compact_games.py.
+
+    Returns:
+        dict or None: Game data, or None if there is no such game
+    """
+    doc = db.collection("games").document(game_id).get()
+    if not doc.exists:
+        alias = db.collection("game_aliases").document(game_id).get()
+        if not alias.exists:
+            return None
+        doc = db.collection("games").document(alias.to_dict()["game_id"]).get()
+    return doc.to_dict() if doc.exists else None
+
+def get_venues(geohash_prefix=None):
+    """
+    Get the venues from the venue index (venue_index.py) in one read.
+
+    Args:
+        geohash_prefix: Only venues whose geohash starts with this (i.e. in that area)
+
+    Returns:
+        list: Venue data, ordered by geohash (venues without coordinates last)
+    """
+    query = db.collection("venues")
+    if geohash_prefix:
+        query = query.where("geohash", ">=", geohash_prefix).where("geohash", "<", geohash_prefix + "~")
+
+    venues = [doc.to_dict() for doc in query.stream()]
+    venues.sort(key=lambda venue: (venue.get("geohash") is None, venue.get("geohash") or "", venue["id"]))
+
+    if venues:
+        table_data = [[venue["name"], venue.get("address") or "-", venue.get("geohash") or "-",
+                       venue.get("upcoming_count", 0)] for venue in venues]
+        headers = ["Venue", "Address", "Geohash", "Upcoming"]
+        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+    else:
+        print("No venues found")
+
+    return venues
+
 def generate_weekly_summary():
     """Generate a weekly summary of games and results"""
     print("Generating weekly summary...")
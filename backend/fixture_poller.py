@@ -1,3 +1,64 @@
+from bs4 import BeautifulSoup
+import logging
+import time
+from datetime import datetime
+
+from utils.db import db, firestore
+from utils.fetch import fetch_all, fetch_workers, make_request
+from utils.parsers import TeamIndex, detect_date_format, extract_game_elements, parse_game_element
+from utils.parse_pool import ParsePool, parse_round_html, parse_team_html, parse_workers
+from utils.team_pages import fetch_team_games, team_page_url, use_team_pages
+from utils.batch import BatchWriter, batch_write_to_firestore, is_dry_run, is_stream_mode
+from utils.enhance import finish_games, generate_team_summaries, generate_club_summaries
+from utils.changes import diff_game, log_changes
+from utils.mirror import get_mirror
+from utils import metrics, outbox, page_index, profiling
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"fixture_poller_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+# Games found under their old hash ID are moved and aliased as they are written
+ALIAS_COLLECTION = "game_aliases"
+BASE_URL = "https://www.hockeyvictoria.org.au/games/"
+MAX_ROUNDS = 18
+STREAM_BATCH_SIZE = 100  # Smaller than a full batch so writes land early
+STREAM_FLUSH_SECONDS = 5
+
+def get_mentone_teams():
+    """Get all active Mentone teams from Firestore, keyed by team name."""
+    logger.info("Loading Mentone teams from Firestore")
+
+    teams_ref = db.collection("teams")
+    query = teams_ref.where("is_home_club_team", "==", True)
+
+    mentone_teams = {}
+    team_docs = []
+    with metrics.stage("firestore_read"):
+        for doc in query.stream():
+            metrics.incr("firestore_reads")
+            team_data = doc.to_dict()
+            team_docs.append((doc.id, team_data))
+            if team_data.get("active", True):
+                mentone_teams[team_data["name"]] = team_data
+
+    # Keep the local mirror's copy of the teams current
+    mirror = get_mirror()
+    if mirror is not None:
+        mirror.write("teams", team_docs)
+
+    logger.info(f"Found {len(mentone_teams)} Mentone teams")
+    return mentone_teams
+
+@profiling.hot
 def process_round_page(comp_id, fixture_id, round_num, mentone_teams):
     """Process a single round page and extract games."""
     round_url = f"{BASE_URL}{comp_id}/{fixture_id}/round/{round_num}"
@@ -8,30 +69,54 @@ def process_round_page(comp_id, fixture_id, round_num, mentone_teams):
         logger.warning(f"Failed to fetch round {round_num}")
         return []
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    game_elements = extract_game_elements(soup)
+    return parse_round_page(response.text, comp_id, fixture_id, round_num, mentone_teams)
+
+def parse_round_page(html, comp_id, fixture_id, round_num, mentone_teams):
+    """Parse and enhance the games on a fetched round page (reused as they are if it hasn't changed)."""
+    round_url = f"{BASE_URL}{comp_id}/{fixture_id}/round/{round_num}"
+    games = page_index.parse_page(
+        round_url, html,
+        lambda page: parse_round_games(page, comp_id, fixture_id, round_num, mentone_teams),
+        page_index.team_context(mentone_teams))
+
+    metrics.incr("games_parsed", len(games))
+    return games
+
+def parse_round_games(html, comp_id, fixture_id, round_num, mentone_teams):
+    """Parse the games on a round page and give them their IDs and metadata."""
+    with metrics.stage("parse"):
+        soup = BeautifulSoup(html, "html.parser")
+        game_elements = extract_game_elements(soup)
+        date_format = detect_date_format(game_elements)
 
     logger.info(f"Found {len(game_elements)} game elements on round {round_num} page")
     games = []
 
     for game_el in game_elements:
-        game = parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num)
-
+        with metrics.stage("parse"):
+            game = parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num, date_format)
         if game:
-            # Generate a proper game ID
-            game["id"] = make_game_id(comp_id, fixture_id, round_num,
-                                      game["home_team"]["name"],
-                                      game["away_team"]["name"])
+            games.append(game)
 
-            # Apply metadata enhancements
-            enhance_game_metadata(game)
+    return finish_games(games)
 
-            games.append(game)
+def process_team_page(team_data, team_index):
+    """
+    Get a team's whole season from its team fixture page.
 
+    Returns:
+        list or None: Enhanced games, or None to fall back to round pages
+    """
+    games = fetch_team_games(team_data, team_index)
+    if games is not None:
+        metrics.incr("games_parsed", len(games))
     return games
 
 def fetch_fixtures(mentone_teams):
     """Fetch all fixtures for Mentone teams."""
+    if fetch_workers() > 1 or parse_workers() > 0:
+        return fetch_fixtures_parallel(mentone_teams)
+
     logger.info("Fetching fixtures for all Mentone teams")
 
     all_games = []
@@ -49,10 +134,19 @@ def fetch_fixtures(mentone_teams):
 
         logger.info(f"[{processed_count}/{len(mentone_teams)}] Checking fixtures for {team_name}")
 
+        team_index = TeamIndex({team_name: team_data})
+
+        # One request for the whole season when the team page is usable
+        team_games = process_team_page(team_data, team_index) if use_team_pages() else None
+        if team_games is not None:
+            logger.info(f"Found {len(team_games)} total games for team {team_name} on its team page")
+            all_games.extend(team_games)
+            continue
+
         # Check all rounds
         team_games = []
         for round_num in range(1, MAX_ROUNDS + 1):
-            games = process_round_page(comp_id, fixture_id, round_num, {team_name: team_data})
+            games = process_round_page(comp_id, fixture_id, round_num, team_index)
 
             if games:
                 team_games.extend(games)
@@ -62,48 +156,263 @@ def fetch_fixtures(mentone_teams):
                 logger.info(f"No games found in round {round_num}, stopping search for {team_name}")
                 break
 
-            # Be nice to the server
-            time.sleep(0.5)
-
         logger.info(f"Found {len(team_games)} total games for team {team_name}")
         all_games.extend(team_games)
 
     return all_games
 
+def fetch_fixtures_parallel(mentone_teams):
+    """
+    Fetch all fixtures with concurrent fetches and pooled parsing.
+
+    Team pages are fetched first, all at once. Teams without a usable team
+    page are then crawled in waves: round N of every team still in season
+    is fetched concurrently (FETCH_WORKERS), parsed in the process pool
+    (PARSE_WORKERS), and teams whose round came back empty after round 1
+    drop out, just as fetch_fixtures stops. Games come back in the same
+    order as fetch_fixtures returns them.
+    """
+    logger.info("Fetching fixtures for all Mentone teams in parallel")
+
+    active = []
+    for team_name, team_data in mentone_teams.items():
+        comp_id = str(team_data.get("comp_id", ""))
+        fixture_id = str(team_data.get("fixture_id", ""))
+        if not comp_id or not fixture_id:
+            logger.warning(f"Missing comp_id or fixture_id for team {team_name}, skipping")
+            continue
+        active.append((team_name, team_data, comp_id, fixture_id))
+
+    team_games = {team_name: [] for team_name, _, _, _ in active}
+    with ParsePool() as pool:
+        if use_team_pages():
+            active = fetch_team_pages_parallel(active, team_games, pool)
+
+        for round_num in range(1, MAX_ROUNDS + 1):
+            if not active:
+                break
+
+            logger.info(f"Fetching round {round_num} for {len(active)} teams")
+            urls = [f"{BASE_URL}{comp_id}/{fixture_id}/round/{round_num}" for _, _, comp_id, fixture_id in active]
+            responses = fetch_all(urls)
+
+            pages = [(url, (response.content if response else None, comp_id, fixture_id, round_num, {team_name: team_data}),
+                      page_index.team_context({team_name: team_data}))
+                     for url, (team_name, team_data, comp_id, fixture_id), response in zip(urls, active, responses)]
+            with metrics.stage("parse"):
+                results = pool.parse_pages(parse_round_html, pages)
+
+            still_active = []
+            for (team_name, team_data, comp_id, fixture_id), games in zip(active, results):
+                metrics.incr("games_parsed", len(games))
+                if games:
+                    logger.info(f"Found {len(games)} games in round {round_num} for {team_name}")
+                    team_games[team_name].extend(games)
+                    still_active.append((team_name, team_data, comp_id, fixture_id))
+                elif round_num == 1:
+                    still_active.append((team_name, team_data, comp_id, fixture_id))
+                else:
+                    logger.info(f"No games found in round {round_num}, stopping search for {team_name}")
+            active = still_active
+
+    all_games = []
+    for team_name, games in team_games.items():
+        logger.info(f"Found {len(games)} total games for team {team_name}")
+        all_games.extend(games)
+    return all_games
+
+def fetch_team_pages_parallel(active, team_games, pool):
+    """
+    Fetch and parse the team pages of several teams concurrently.
+
+    Args:
+        active: (team_name, team_data, comp_id, fixture_id) of each team
+        team_games: {team_name: games}, filled in for teams whose page was usable
+        pool: ParsePool to parse in
+
+    Returns:
+        list: The entries of `active` that still need their round pages crawled
+    """
+    with_pages = [(entry, team_page_url(entry[1])) for entry in active]
+    with_pages = [(entry, url) for entry, url in with_pages if url]
+    logger.info(f"Fetching team pages for {len(with_pages)} of {len(active)} teams")
+
+    responses = fetch_all([url for _, url in with_pages])
+    pages = [(url, (response.content if response else None, comp_id, fixture_id, {team_name: team_data}),
+              page_index.team_context({team_name: team_data}))
+             for ((team_name, team_data, comp_id, fixture_id), url), response in zip(with_pages, responses)]
+    with metrics.stage("parse"):
+        results = pool.parse_pages(parse_team_html, pages)
+
+    used = set()
+    for ((team_name, _, _, _), _), games in zip(with_pages, results):
+        if games is not None:
+            metrics.incr("games_parsed", len(games))
+            team_games[team_name] = games
+            used.add(team_name)
+            logger.info(f"Found {len(games)} games for {team_name} on its team page")
+
+    metrics.incr("team_pages_used", len(used))
+    metrics.incr("team_page_fallbacks", len(active) - len(used))
+    return [entry for entry in active if entry[0] not in used]
+
+def transform_game(game):
+    """Prepare a game for Firestore."""
+    # Ensure timestamps
+    game["updated_at"] = firestore.SERVER_TIMESTAMP
+    game["last_polled_at"] = firestore.SERVER_TIMESTAMP
+    if "created_at" not in game:
+        game["created_at"] = firestore.SERVER_TIMESTAMP
+
+    # Remove any reference objects that might have been added
+    ref_fields = ["team_ref", "club_ref", "competition_ref", "grade_ref"]
+    for field in ref_fields:
+        if field in game:
+            del game[field]
+
+    return game
+
 def update_games_in_firestore(games):
-    """Update games in Firestore using batch operations."""
+    """
+    Update games in Firestore using batch operations.
+
+    Returns:
+        Tuple of (creates, updates, change records)
+    """
     if not games:
         logger.info("No games to update")
-        return 0, 0
+        return 0, 0, []
 
-    logger.info(f"Updating {len(games)} games in Firestore")
+    # Games from pages that haven't changed since the last poll are already stored
+    games, unchanged_ids = page_index.split_unchanged(games)
+    if unchanged_ids:
+        logger.info(f"Skipping {len(unchanged_ids)} unchanged games")
 
-    # Transform function to prepare games for Firestore
-    def transform_game(game):
-        # Ensure timestamps
-        game["updated_at"] = firestore.SERVER_TIMESTAMP
-        if "created_at" not in game:
-            game["created_at"] = firestore.SERVER_TIMESTAMP
-
-        # Remove any reference objects that might have been added
-        ref_fields = ["team_ref", "club_ref", "competition_ref", "grade_ref"]
-        for field in ref_fields:
-            if field in game:
-                del game[field]
+    logger.info(f"Updating {len(games)} games in Firestore")
 
-        return game
+    # Use batch writing, diffing each game against the stored version it reads
+    with BatchWriter(db, "games", transform_game, flush_seconds=None, diff_func=diff_game,
+                     alias_collection=ALIAS_COLLECTION,
+                     stage_changes=outbox.stager("fixture_poller")) as writer:
+        for game in games:
+            writer.write(game)
+
+    logger.info(f"Created {writer.creates} new games, updated {writer.updates} existing games")
+    if writer.duplicates:
+        logger.info(f"Skipped {writer.duplicates} repeated games (played between two tracked teams)")
+    log_changes(writer.changes)
+    return writer.creates, writer.updates, writer.changes
+
+def iter_round_pages(comp_id, fixture_id):
+    """
+    Fetch stage: yield (round_num, html) for each round page of a grade.
+
+    Pages are fetched lazily, one per iteration; closing the generator
+    stops the crawl without requesting further rounds.
+    """
+    for round_num in range(1, MAX_ROUNDS + 1):
+        round_url = f"{BASE_URL}{comp_id}/{fixture_id}/round/{round_num}"
+        logger.info(f"Checking round URL: {round_url}")
+
+        response = make_request(round_url)
+        if not response:
+            logger.warning(f"Failed to fetch round {round_num}")
+            yield round_num, None
+        else:
+            yield round_num, response.text
+
+def iter_team_games(team_name, team_data):
+    """
+    Parse and enhance stages: yield each game of one team's season as its round arrives.
+
+    Uses the team page when it can, otherwise stops after the first empty
+    round past round 1, like fetch_fixtures.
+    """
+    comp_id = str(team_data.get("comp_id", ""))
+    fixture_id = str(team_data.get("fixture_id", ""))
+
+    if not comp_id or not fixture_id:
+        logger.warning(f"Missing comp_id or fixture_id for team {team_name}, skipping")
+        return
+
+    team_index = TeamIndex({team_name: team_data})
+    if use_team_pages():
+        games = process_team_page(team_data, team_index)
+        if games is not None:
+            logger.info(f"Found {len(games)} games for {team_name} on its team page")
+            yield from games
+            return
 
-    # Use batch writing
-    creates, updates = batch_write_to_firestore(db, games, "games", transform_game)
+    pages = iter_round_pages(comp_id, fixture_id)
+    try:
+        for round_num, html in pages:
+            games = parse_round_page(html, comp_id, fixture_id, round_num, team_index) if html else []
+            if games:
+                logger.info(f"Found {len(games)} games in round {round_num}")
+                yield from games
+            elif round_num > 1:
+                logger.info(f"No games found in round {round_num}, stopping search for {team_name}")
+                break
+    finally:
+        pages.close()
+
+def stream_fixtures(mentone_teams):
+    """
+    Streaming mode: write games while the crawl is still running.
+
+    Games flow fetch -> parse -> enhance -> BatchWriter, which commits every
+    STREAM_BATCH_SIZE games or STREAM_FLUSH_SECONDS, whichever comes first.
+    Only the current team's games are held, for its summaries; team
+    summaries are written as each team finishes and club summaries at the
+    end.
+
+    Returns:
+        Tuple of (games written, creates, updates, change records)
+    """
+    logger.info("Streaming fixtures for all Mentone teams")
+
+    all_team_summaries = []
+    with BatchWriter(db, "games", transform_game, STREAM_BATCH_SIZE, STREAM_FLUSH_SECONDS,
+                     diff_func=diff_game, alias_collection=ALIAS_COLLECTION,
+                     stage_changes=outbox.stager("fixture_poller")) as games_writer, \
+            BatchWriter(db, "team_summaries", batch_size=STREAM_BATCH_SIZE,
+                        flush_seconds=STREAM_FLUSH_SECONDS) as summaries_writer:
+        for processed_count, (team_name, team_data) in enumerate(mentone_teams.items(), 1):
+            logger.info(f"[{processed_count}/{len(mentone_teams)}] Streaming fixtures for {team_name}")
+
+            team_games = []
+            for game in iter_team_games(team_name, team_data):
+                if not page_index.is_unchanged(game):
+                    games_writer.write(game)
+                team_games.append(game)
+
+            logger.info(f"Found {len(team_games)} total games for team {team_name}")
+            with metrics.stage("summaries"):
+                team_summaries = generate_team_summaries(group_games_by_team(team_games))
+                for summary in page_index.changed_summaries(team_summaries, team_games):
+                    summaries_writer.write(summary)
+            all_team_summaries.extend(team_summaries)
+
+    logger.info(f"Created {games_writer.creates} new games, updated {games_writer.updates} existing games")
+    log_changes(games_writer.changes)
+
+    with metrics.stage("summaries"):
+        club_summaries = generate_club_summaries(all_team_summaries) if summaries_writer.written else []
+        if club_summaries:
+            creates, updates = batch_write_to_firestore(db, club_summaries, "club_summaries")
+            logger.info(f"Updated {len(club_summaries)} club summaries ({creates} created, {updates} updated)")
 
-    logger.info(f"Created {creates} new games, updated {updates} existing games")
-    return creates, updates
+    return games_writer.written, games_writer.creates, games_writer.updates, games_writer.changes
 
 def update_summaries(mentone_teams, all_games):
     """Update team and club summaries based on games."""
-    # Group games by team
+    with metrics.stage("summaries"):
+        _update_summaries(all_games)
+
+def group_games_by_team(games):
+    """Group games under the Mentone team IDs playing in them."""
     team_games = {}
-    for game in all_games:
+    for game in games:
         # Process home team
         home_team_id = game["home_team"].get("id")
         if home_team_id and "Mentone" in game["home_team"].get("name", ""):
@@ -118,15 +427,20 @@ def update_summaries(mentone_teams, all_games):
                 team_games[away_team_id] = []
             team_games[away_team_id].append(game)
 
+    return team_games
+
+def _update_summaries(all_games):
+    """Generate and write team and club summaries."""
     # Generate team summaries
-    team_summaries = generate_team_summaries(team_games)
+    team_summaries = generate_team_summaries(group_games_by_team(all_games))
+    changed_summaries = page_index.changed_summaries(team_summaries, all_games)
 
-    if team_summaries:
+    if changed_summaries:
         # Update in Firestore
-        creates, updates = batch_write_to_firestore(db, team_summaries, "team_summaries")
-        logger.info(f"Updated {len(team_summaries)} team summaries ({creates} created, {updates} updated)")
+        creates, updates = batch_write_to_firestore(db, changed_summaries, "team_summaries")
+        logger.info(f"Updated {len(changed_summaries)} team summaries ({creates} created, {updates} updated)")
 
-        # Generate and update club summaries
+        # Generate and update club summaries (from every team's summaries)
         club_summaries = generate_club_summaries(team_summaries)
         if club_summaries:
             creates, updates = batch_write_to_firestore(db, club_summaries, "club_summaries")
@@ -137,6 +451,8 @@ def update_summaries(mentone_teams, all_games):
 def main():
     """Main function to run the fixture poller."""
     start_time = time.time()
+    metrics.start_run("fixture_poller")
+    profiling.start("fixture_poller")
     logger.info(f"=== Mentone Hockey Club Fixture Poller ===")
 
     # Check if we're in dry run mode
@@ -151,25 +467,41 @@ def main():
             logger.warning("No Mentone teams found, exiting")
             return
 
-        # Fetch all fixtures
-        all_games = fetch_fixtures(mentone_teams)
-
-        if not all_games:
-            logger.warning("No games found, exiting")
-            return
-
-        # Update games in Firestore
-        creates, updates = update_games_in_firestore(all_games)
-
-        # Update summaries if any games were created or updated
-        if creates > 0 or updates > 0:
-            update_summaries(mentone_teams, all_games)
+        if is_stream_mode():
+            # Write games and summaries as they are parsed
+            games_written, creates, updates, changes = stream_fixtures(mentone_teams)
+            if not games_written:
+                logger.warning("No games found")
+        else:
+            # Fetch all fixtures
+            all_games = fetch_fixtures(mentone_teams)
+
+            if not all_games:
+                logger.warning("No games found, exiting")
+                return
+
+            # Update games in Firestore
+            creates, updates, changes = update_games_in_firestore(all_games)
+
+            # Update summaries if any games were created or updated
+            if creates > 0 or updates > 0:
+                update_summaries(mentone_teams, all_games)
+
+        # Everything is written: tell consumers what changed (with anything an
+        # earlier run staged but didn't publish), then let unchanged pages be
+        # skipped next time
+        if not is_dry_run():
+            outbox.publish_pending()
+            page_index.commit()
 
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
-
-    elapsed_time = time.time() - start_time
-    logger.info(f"Fixture polling completed in {elapsed_time:.2f} seconds")
+    finally:
+        # Runs that stop early (no teams, no games) get a report too
+        elapsed_time = time.time() - start_time
+        logger.info(f"Fixture polling completed in {elapsed_time:.2f} seconds")
+        metrics.write_report()
+        profiling.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,296 @@
+"""
+Pre-game reminders and weekly digests from the email settings.
+
+create_settings (season_builder.py) stores pre_game_hours,
+weekly_summary_day/time and admin_emails in settings/email_settings; this
+sends them. Upcoming games are loaded once at startup into a time-indexed
+queue (utils/notify.py) holding each game's reminder and the next weekly
+digest. After that the dispatcher never scans games to find changes: each
+tick it reads the new change events from the outbox (utils/outbox.py),
+schedules new games, moves rescheduled ones and updates venues (O(log n)
+each), then pops whatever is due.
+
+Everything due for a recipient in one tick goes out as a single email
+through the configured transport (SMTP, or a local mbox file). Sent
+notifications are recorded in a state file, so a restart never sends one
+twice. A digest that came due in the last day and hasn't been sent goes
+out on startup, so a --once run from cron at the digest time sends it.
+
+Usage (from the backend directory):
+    python notification_dispatcher.py            # run, waking every minute
+    python notification_dispatcher.py --once     # load, send what is due and exit (cron)
+
+Environment:
+    NOTIFY_STATE   Sent-notification log (default notifications_state.db)
+    OUTBOX, DRY_RUN, and the SMTP_* / NOTIFY_* transport settings (utils/notify.py)
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils.db import db
+from utils.batch import is_dry_run
+from utils.notify import (ReminderQueue, SentLog, build_message, format_game, get_transport, local_time,
+                          next_weekly, sender_address)
+from utils import metrics, outbox
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"notification_dispatcher_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+CONSUMER = "notifications"
+DEFAULT_STATE_FILE = "notifications_state.db"
+DEFAULT_TICK_SECONDS = 60
+DIGEST_KEY = "digest"
+DIGEST_DAYS = 7
+# A digest missed by less than this (e.g. the cron run just after it) is still sent
+DIGEST_CATCH_UP = timedelta(hours=24)
+DEFAULT_SETTINGS = {
+    "pre_game_hours": 24,
+    "weekly_summary_day": "Sunday",
+    "weekly_summary_time": "20:00",
+    "admin_emails": [],
+}
+
+def load_settings():
+    """Email settings written by season_builder's create_settings."""
+    doc = db.collection("settings").document("email_settings").get()
+    settings = dict(DEFAULT_SETTINGS)
+    if doc.exists:
+        settings.update({key: value for key, value in doc.to_dict().items() if key in DEFAULT_SETTINGS})
+    else:
+        logger.warning("No email settings found, using defaults")
+    return settings
+
+def game_entry(data):
+    """What the dispatcher keeps of a stored game or a change event."""
+    home, away = data.get("home_team"), data.get("away_team")
+    return {
+        "id": data.get("game_id") or data.get("id"),
+        "date": local_time(data.get("date")),
+        "venue": data.get("venue"),
+        "home_team": home.get("name") if isinstance(home, dict) else home,
+        "away_team": away.get("name") if isinstance(away, dict) else away,
+    }
+
+def load_games(start, end=None):
+    """Games starting from `start` (up to `end`), in one range query."""
+    query = db.collection("games").where("date", ">=", start)
+    if end is not None:
+        query = query.where("date", "<=", end)
+    return [doc.to_dict() for doc in query.stream()]
+
+def reminder_key(game):
+    """Sent-log key of a game's reminder; a rescheduled game gets a new reminder."""
+    return f"reminder:{game['id']}:{game['date'].isoformat()}"
+
+def digest_key(due):
+    """Sent-log key of the digest due at `due`."""
+    return f"{DIGEST_KEY}:{due.date().isoformat()}"
+
+class Dispatcher:
+    """Queue of upcoming reminders and digests, fed by the change-event outbox."""
+
+    def __init__(self, settings, transport, events, sent_log):
+        self.settings = settings
+        self.transport = transport
+        self.events = events
+        self.sent_log = sent_log
+        self.queue = ReminderQueue()
+        self.games = {}
+        self.lead_time = timedelta(hours=settings["pre_game_hours"])
+
+    def seed(self, now):
+        """Load the upcoming games and the next digest into the queue."""
+        with metrics.stage("firestore_read"):
+            games = load_games(now)
+        for game in games:
+            self.track(game_entry(game), now)
+
+        # The latest digest is still due if it hasn't gone out (a --once
+        # run at the digest time starts just after it)
+        last_digest = self.next_digest(now - timedelta(days=7))
+        if now - last_digest <= DIGEST_CATCH_UP and not self.sent_log.was_sent(digest_key(last_digest)):
+            self.queue.schedule(DIGEST_KEY, last_digest, None)
+        else:
+            self.queue.schedule(DIGEST_KEY, self.next_digest(now), None)
+        logger.info(f"Scheduled reminders for {len(self.games)} upcoming games")
+
+    def next_digest(self, now):
+        """First digest time after `now`."""
+        return next_weekly(self.settings["weekly_summary_day"], self.settings["weekly_summary_time"], now)
+
+    def track(self, game, now):
+        """Schedule (or move) a game's reminder."""
+        if not game["id"] or not isinstance(game["date"], datetime):
+            return
+        if game["date"] <= now:
+            self.games.pop(game["id"], None)
+            self.queue.cancel(f"reminder:{game['id']}")
+            return
+        self.games[game["id"]] = game
+        self.queue.schedule(f"reminder:{game['id']}", game["date"] - self.lead_time, game["id"])
+
+    def apply_events(self, now):
+        """
+        Bring the queue up to date with the outbox.
+
+        Returns:
+            int: Sequence number of the last event applied (None if there were none)
+        """
+        last_seq = None
+        while True:
+            batch = self.events.read(last_seq if last_seq is not None else self.events.get_offset(CONSUMER))
+            if not batch:
+                return last_seq
+            for event in batch:
+                if event["type"] in ("new_game", "rescheduled", "venue_changed"):
+                    self.track(game_entry(event), now)
+                metrics.incr("notification_events")
+            last_seq = batch[-1]["seq"]
+
+    def due_sections(self, now):
+        """
+        Pop everything due by `now`.
+
+        Returns:
+            Tuple of ([(heading, [lines])] to send, sent-log keys to record)
+        """
+        reminders = []
+        digest_due = None
+        for key, due, game_id in self.queue.pop_due(now):
+            if key == DIGEST_KEY:
+                digest_due = due
+                continue
+            game = self.games.get(game_id)
+            # Too late to remind once the game has started
+            if game is None or game["date"] <= now or self.sent_log.was_sent(reminder_key(game)):
+                continue
+            reminders.append(game)
+
+        sections = [("Upcoming games", [format_game(game) for game in sorted(reminders, key=lambda g: g["date"])])]
+        sent_keys = [reminder_key(game) for game in reminders]
+
+        if digest_due is not None:
+            if not self.sent_log.was_sent(digest_key(digest_due)):
+                sections.extend(self.digest_sections(now))
+                sent_keys.append(digest_key(digest_due))
+            self.queue.schedule(DIGEST_KEY, self.next_digest(now), None)
+        return sections, sent_keys
+
+    def digest_sections(self, now):
+        """Last week's results and the coming week's games."""
+        with metrics.stage("firestore_read"):
+            played = [game for game in load_games(now - timedelta(days=DIGEST_DAYS), now)
+                      if game.get("status") == "completed"]
+        results = []
+        for game in sorted(played, key=lambda g: local_time(g["date"])):
+            entry = game_entry(game)
+            entry["score"] = {"home": game["home_team"].get("score"), "away": game["away_team"].get("score")}
+            results.append(format_game(entry))
+
+        # Games that have started are no longer needed
+        for game_id in [game_id for game_id, game in self.games.items() if game["date"] <= now]:
+            del self.games[game_id]
+        week_end = now + timedelta(days=DIGEST_DAYS)
+        upcoming = sorted((game for game in self.games.values() if game["date"] <= week_end), key=lambda g: g["date"])
+        return [("Weekly summary - results", results), ("Weekly summary - coming up", [format_game(g) for g in upcoming])]
+
+    def tick(self, now=None):
+        """
+        Apply new events, then send everything due, one email per recipient.
+
+        Returns:
+            int: Messages sent
+        """
+        now = now or datetime.now()
+        last_seq = self.apply_events(now)
+        sections, sent_keys = self.due_sections(now)
+
+        messages = [message for message in (build_message(recipient, sender_address(), sections)
+                                            for recipient in self.settings["admin_emails"]) if message]
+        if is_dry_run():
+            for message in messages:
+                logger.info(f"DRY RUN: Would send to {message['To']}: {message['Subject']}\n{message.get_content()}")
+            return 0
+
+        sent = 0
+        if messages:
+            with metrics.stage("notify_send"):
+                sent = self.transport.send_all(messages)
+            metrics.incr("notifications_sent", sent)
+            logger.info(f"Sent {sent} notification emails ({len(sent_keys)} notifications)")
+        if sent_keys:
+            self.sent_log.mark_sent(sent_keys)
+        if last_seq is not None:
+            self.events.ack(CONSUMER, last_seq)
+        return sent
+
+def run(dispatcher, once=False, interval=DEFAULT_TICK_SECONDS):
+    """Tick once, or forever, sleeping until the next item is due (at most `interval`)."""
+    while True:
+        dispatcher.tick()
+        if once:
+            return
+        next_due = dispatcher.queue.next_due()
+        wait = interval
+        if next_due is not None:
+            wait = max(1, min(interval, (next_due - datetime.now()).total_seconds()))
+        time.sleep(wait)
+
+def main():
+    """Main function to run the notification dispatcher."""
+    parser = argparse.ArgumentParser(description="Send pre-game reminders and weekly digests")
+    parser.add_argument("--once", action="store_true", help="Run a single tick and exit")
+    parser.add_argument("--interval", type=int, default=DEFAULT_TICK_SECONDS, help="Seconds between ticks")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    metrics.start_run("notification_dispatcher")
+    logger.info("=== Mentone Hockey Club Notification Dispatcher ===")
+
+    if is_dry_run():
+        logger.info("Running in DRY RUN mode - nothing will be sent")
+
+    events = outbox.get_outbox()
+    if events is None:
+        logger.error("The dispatcher follows game changes through the outbox; OUTBOX is off. Exiting.")
+        return
+
+    sent_log = SentLog(os.environ.get("NOTIFY_STATE", DEFAULT_STATE_FILE))
+    try:
+        settings = load_settings()
+        if not settings["admin_emails"]:
+            logger.warning("No admin_emails in the email settings, nothing will be sent")
+
+        dispatcher = Dispatcher(settings, get_transport(), events, sent_log)
+        # Events up to here are reflected in the games about to be loaded
+        seen_seq = events.last_seq()
+        dispatcher.seed(datetime.now())
+        if not is_dry_run():
+            events.ack(CONSUMER, seen_seq)
+        run(dispatcher, args.once, args.interval)
+
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+    finally:
+        sent_log.close()
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Notification dispatcher finished in {elapsed_time:.2f} seconds")
+    metrics.write_report()
+
+if __name__ == "__main__":
+    main()
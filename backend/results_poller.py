@@ -1,5 +1,149 @@
+from bs4 import BeautifulSoup
+import logging
+import time
+from datetime import datetime, timedelta
+
+from utils.db import db, firestore
+from utils.fetch import make_request
+from utils.parsers import TeamIndex, detect_date_format, extract_game_elements, parse_game_element
+from utils.batch import BatchWriter, batch_write_to_firestore, is_dry_run
+from utils.enhance import finish_games, generate_team_summaries, generate_club_summaries
+from utils.changes import diff_game, log_changes
+from utils.mirror import get_mirror
+from utils.team_pages import fetch_team_games, use_team_pages
+from utils import metrics, outbox, page_index, profiling
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"results_poller_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+# Games found under their old hash ID are moved and aliased as they are written
+ALIAS_COLLECTION = "game_aliases"
+BASE_URL = "https://www.hockeyvictoria.org.au/games/"
+MAX_ROUNDS = 18
+
+def get_mentone_teams():
+    """Get all active Mentone teams from Firestore, keyed by team name."""
+    logger.info("Loading Mentone teams from Firestore")
+
+    teams_ref = db.collection("teams")
+    query = teams_ref.where("is_home_club_team", "==", True)
+
+    mentone_teams = {}
+    team_docs = []
+    with metrics.stage("firestore_read"):
+        for doc in query.stream():
+            metrics.incr("firestore_reads")
+            team_data = doc.to_dict()
+            team_docs.append((doc.id, team_data))
+            if team_data.get("active", True):
+                mentone_teams[team_data["name"]] = team_data
+
+    # Keep the local mirror's copy of the teams current
+    mirror = get_mirror()
+    if mirror is not None:
+        mirror.write("teams", team_docs)
+
+    logger.info(f"Found {len(mentone_teams)} Mentone teams")
+    return mentone_teams
+
+def process_team_results(team_data, start_date, end_date):
+    """
+    Fetch a team's games and keep those inside the polling window.
+
+    Args:
+        team_data: Team document from Firestore
+        start_date: Start of the polling window
+        end_date: End of the polling window
+
+    Returns:
+        list: The team's games inside the window
+    """
+    team_name = team_data.get("name", "")
+    comp_id = str(team_data.get("comp_id", ""))
+    fixture_id = str(team_data.get("fixture_id", ""))
+
+    if not comp_id or not fixture_id:
+        logger.warning(f"Missing comp_id or fixture_id for team {team_name}, skipping")
+        return []
+
+    logger.info(f"Checking results for {team_name}")
+
+    team_index = TeamIndex({team_name: team_data})
+
+    # The team page has the whole season in one request; round pages otherwise
+    team_games = fetch_team_games(team_data, team_index) if use_team_pages() else None
+    if team_games is None:
+        team_games = crawl_round_games(comp_id, fixture_id, team_index, end_date)
+
+    # Games come with their IDs and metadata, stored with the page when it hasn't changed
+    window_games = [game for game in team_games if start_date <= game["date"] <= end_date]
+
+    metrics.incr("games_parsed", len(window_games))
+    return window_games
+
+def crawl_round_games(comp_id, fixture_id, team_index, end_date):
+    """
+    Collect a team's games round by round, up to the first round after end_date.
+
+    Returns:
+        list: Game dicts with their IDs and metadata
+    """
+    games = []
+    for round_num in range(1, MAX_ROUNDS + 1):
+        round_url = f"{BASE_URL}{comp_id}/{fixture_id}/round/{round_num}"
+        response = make_request(round_url)
+        if not response:
+            break
+
+        round_games = page_index.parse_page(
+            round_url, response.content,
+            lambda page: parse_round_games(page, comp_id, fixture_id, round_num, team_index),
+            page_index.team_context(team_index))
+
+        if not round_games:
+            if round_num > 1:
+                break
+            continue
+
+        games.extend(round_games)
+
+        # Rounds are in date order, so nothing later can fall inside the window
+        if all(game["date"] > end_date for game in round_games):
+            break
+
+    return games
+
+def parse_round_games(html, comp_id, fixture_id, round_num, team_index):
+    """Parse the tracked team's games on a round page and give them their IDs and metadata."""
+    with metrics.stage("parse"):
+        soup = BeautifulSoup(html, "html.parser")
+        game_elements = extract_game_elements(soup)
+        date_format = detect_date_format(game_elements)
+
+    round_games = []
+    for game_el in game_elements:
+        with metrics.stage("parse"):
+            game = parse_game_element(game_el, fixture_id, comp_id, team_index, round_num, date_format)
+        if game:
+            round_games.append(game)
+    return finish_games(round_games)
+
 def poll_recent_results():
-    """Poll for game results from the past week plus upcoming 2 weeks."""
+    """
+    Poll for game results from the past week plus upcoming 2 weeks.
+
+    Returns:
+        list: Change records for the games written
+    """
     # Define date range (past week + upcoming 2 weeks)
     today = datetime.now()
     start_date = today - timedelta(days=7)
@@ -12,40 +156,36 @@ def poll_recent_results():
 
     if not mentone_teams:
         logger.warning("No Mentone teams found, exiting")
-        return
+        return []
 
     # Process each team separately
     all_updated_games = []
-    total_games_created = 0
-    total_games_updated = 0
-
     for team_name, team_data in mentone_teams.items():
-        # Process results for this team
-        updated_games, games_created, games_updated = process_team_results(
-            team_data, start_date, end_date
-        )
-
-        # Add to totals
-        if updated_games:
-            all_updated_games.extend(updated_games)
-            total_games_created += games_created
-            total_games_updated += games_updated
-
-    # Update games in Firestore
+        all_updated_games.extend(process_team_results(team_data, start_date, end_date))
+
+    # Update games in Firestore; the writer's reads tell creates from updates
+    total_games_created = total_games_updated = 0
+    changes = []
     if all_updated_games:
-        update_games_in_firestore(all_updated_games)
+        total_games_created, total_games_updated, changes = update_games_in_firestore(all_updated_games)
 
         # Update summaries
         update_summaries(mentone_teams, all_updated_games)
 
     logger.info(f"Results polling completed: {len(all_updated_games)} games processed, "
                 f"{total_games_created} created, {total_games_updated} updated")
+    return changes
 
 def update_games_in_firestore(games):
-    """Update games in Firestore using batch operations."""
+    """
+    Update games in Firestore using batch operations.
+
+    Returns:
+        Tuple of (creates, updates, change records)
+    """
     if not games:
         logger.info("No games to update")
-        return 0, 0
+        return 0, 0, []
 
     logger.info(f"Updating {len(games)} games in Firestore")
 
@@ -66,14 +206,31 @@ def update_games_in_firestore(games):
 
         return game
 
-    # Use batch writing
-    creates, updates = batch_write_to_firestore(db, games, "games", transform_game)
+    # Games from pages that haven't changed since the last poll are already stored
+    games, unchanged_ids = page_index.split_unchanged(games)
+    if unchanged_ids:
+        logger.info(f"Skipping {len(unchanged_ids)} unchanged games")
+
+    # Use batch writing, diffing each game against the stored version it reads
+    with BatchWriter(db, "games", transform_game, flush_seconds=None, diff_func=diff_game,
+                     alias_collection=ALIAS_COLLECTION,
+                     stage_changes=outbox.stager("results_poller")) as writer:
+        for game in games:
+            writer.write(game)
 
-    logger.info(f"Created {creates} new games, updated {updates} existing games")
-    return creates, updates
+    logger.info(f"Created {writer.creates} new games, updated {writer.updates} existing games")
+    if writer.duplicates:
+        logger.info(f"Skipped {writer.duplicates} repeated games (played between two tracked teams)")
+    log_changes(writer.changes)
+    return writer.creates, writer.updates, writer.changes
 
 def update_summaries(mentone_teams, all_games):
     """Update team and club summaries based on games."""
+    with metrics.stage("summaries"):
+        _update_summaries(all_games)
+
+def _update_summaries(all_games):
+    """Generate and write team and club summaries."""
     # Group games by team
     team_games = {}
     for game in all_games:
@@ -93,13 +250,14 @@ def update_summaries(mentone_teams, all_games):
 
     # Generate team summaries
     team_summaries = generate_team_summaries(team_games)
+    changed_summaries = page_index.changed_summaries(team_summaries, all_games)
 
-    if team_summaries:
+    if changed_summaries:
         # Update in Firestore
-        creates, updates = batch_write_to_firestore(db, team_summaries, "team_summaries")
-        logger.info(f"Updated {len(team_summaries)} team summaries ({creates} created, {updates} updated)")
+        creates, updates = batch_write_to_firestore(db, changed_summaries, "team_summaries")
+        logger.info(f"Updated {len(changed_summaries)} team summaries ({creates} created, {updates} updated)")
 
-        # Generate and update club summaries
+        # Generate and update club summaries (from every team's summaries)
         club_summaries = generate_club_summaries(team_summaries)
         if club_summaries:
             creates, updates = batch_write_to_firestore(db, club_summaries, "club_summaries")
@@ -110,6 +268,8 @@ def update_summaries(mentone_teams, all_games):
 def main():
     """Main function to run the results poller."""
     start_time = time.time()
+    metrics.start_run("results_poller")
+    profiling.start("results_poller")
     logger.info(f"=== Mentone Hockey Club Results Poller ===")
 
     # Check if we're in dry run mode
@@ -120,11 +280,20 @@ def main():
         # Poll for recent results
         poll_recent_results()
 
+        # Everything is written: tell consumers what changed (with anything an
+        # earlier run staged but didn't publish), then let unchanged pages be
+        # skipped next time
+        if not is_dry_run():
+            outbox.publish_pending()
+            page_index.commit()
+
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
 
     elapsed_time = time.time() - start_time
     logger.info(f"Results polling completed in {elapsed_time:.2f} seconds")
+    metrics.write_report()
+    profiling.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,71 @@
-def create_competition(comp):
-    """Create a competition in Firestore."""
+from bs4 import BeautifulSoup
+import json
+import logging
+import time
+from datetime import datetime
+
+from utils.db import db, firestore
+from utils.fetch import make_request
+from utils.parsers import classify_competition, classify_team, extract_club_info, extract_team_links, get_competition_blocks
+from utils.batch import BatchWriter, is_dry_run
+from utils import page_index
+from utils.ids import make_club_id, make_comp_id, make_grade_id, make_team_id
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"season_builder_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+HOME_CLUB_ID = "mentone"  # Used for filtering home club teams
+OUTPUT_FILE = "mentone_teams.json"
+WRITE_BATCH_SIZE = 400
+
+def create_or_get_club(club_name, club_id):
+    """Get an existing club or create it in Firestore."""
+    document_id = make_club_id(club_name)
+    club_ref = db.collection("clubs").document(document_id)
+
+    club_doc = club_ref.get()
+    if club_doc.exists:
+        return club_ref, club_doc.to_dict()
+
+    is_home_club = club_id.lower() == HOME_CLUB_ID
+    club_data = {
+        "id": document_id,
+        "name": f"{club_name} Hockey Club" if is_home_club else club_name,
+        "short_name": club_name,
+        "code": "".join([word[0] for word in club_name.split()]).upper(),
+        "primary_color": "#0066cc" if is_home_club else "#333333",
+        "secondary_color": "#ffffff",
+        "active": True,
+        "is_home_club": is_home_club,
+        "created_at": firestore.SERVER_TIMESTAMP,
+        "updated_at": firestore.SERVER_TIMESTAMP
+    }
+
+    if not is_dry_run():
+        club_ref.set(club_data)
+        logger.info(f"Created club: {club_name} ({document_id})")
+    else:
+        logger.info(f"DRY RUN: Would create club: {club_name} ({document_id})")
+
+    return club_ref, club_data
+
+def build_competition(comp):
+    """Competition document for a block on the competitions index (without timestamps)."""
     comp_id = comp["comp_id"]
     fixture_id = comp["fixture_id"]
     comp_name = comp.get("comp_heading", comp["name"])
 
     # Determine competition type
-    comp_type = "Senior"  # Default type
-    if "junior" in comp_name.lower() or any(f"u{i}" in comp_name.lower() for i in range(10, 19)):
-        comp_type = "Junior"
-    elif "masters" in comp_name.lower() or any(f"{i}+" in comp_name.lower() for i in [35, 45, 60]):
-        comp_type = "Midweek/Masters"
+    comp_type = classify_competition(comp_name)
 
     # Extract season info
     season = str(datetime.now().year)  # Default to current year
@@ -18,95 +74,155 @@ def create_competition(comp):
         if len(parts) > 1 and parts[1].strip().isdigit():
             season = parts[1].strip()
 
-    # Create the Firestore document
     document_id = make_comp_id(comp_id)
-    comp_ref = db.collection("competitions").document(document_id)
-
-    comp_data = {
+    return {
         "id": document_id,
         "original_id": comp_id,
         "name": comp_name,
         "type": comp_type,
         "season": season,
         "fixture_id": fixture_id,
-        "start_date": firestore.SERVER_TIMESTAMP,
-        "created_at": firestore.SERVER_TIMESTAMP,
-        "updated_at": firestore.SERVER_TIMESTAMP,
         "active": True
     }
 
-    if not is_dry_run():
-        comp_ref.set(comp_data)
-        logger.info(f"Created competition: {comp_name} ({document_id})")
-    else:
-        logger.info(f"DRY RUN: Would create competition: {comp_name} ({document_id})")
-
-    return comp_ref, comp_data
-
-def create_grade(comp, competition_ref, competition_data):
-    """Create a grade (fixture) in Firestore."""
+def build_grade(comp, competition_ref, competition_data):
+    """Grade (fixture) document for a block on the competitions index (without timestamps)."""
     fixture_id = comp["fixture_id"]
-    comp_id = comp["comp_id"]
     comp_name = comp["name"]
 
     # Determine type and gender
     team_type, team_gender = classify_team(comp_name)
 
-    # Generate grade ID
-    document_id = make_grade_id(fixture_id)
-
-    # Create grade data
-    grade_data = {
-        "id": document_id,
+    return {
+        "id": make_grade_id(fixture_id),
         "original_id": fixture_id,
         "name": comp_name,
-        "comp_id": comp_id,
+        "comp_id": comp["comp_id"],
         "competition_name": competition_data.get("name", ""),
         "competition_id": competition_data.get("id", ""),
         "competition_ref": competition_ref,
         "type": team_type,
-        "gender": team_gender,
-        "created_at": firestore.SERVER_TIMESTAMP,
-        "updated_at": firestore.SERVER_TIMESTAMP
+        "gender": team_gender
     }
 
-    # Save to Firestore
-    grade_ref = db.collection("grades").document(document_id)
-
-    if not is_dry_run():
-        grade_ref.set(grade_data)
-        logger.info(f"Created grade: {comp_name} ({document_id})")
-    else:
-        logger.info(f"DRY RUN: Would create grade: {comp_name} ({document_id})")
-
-    return grade_ref, grade_data
-
-def find_and_create_teams(competitions):
-    """Scan competitions to find teams and create in Firestore."""
-    logger.info(f"Scanning {len(competitions)} competitions for teams...")
-    teams = []
-    seen = set()
-    processed_count = 0
-
-    # Create all competitions and grades first
+def load_existing(collection_name):
+    """
+    Read every document in a collection once.
+
+    Returns:
+        dict: Document ID -> document data
+    """
+    existing = {doc.id: doc.to_dict() for doc in db.collection(collection_name).stream()}
+    logger.info(f"Loaded {len(existing)} existing {collection_name}")
+    return existing
+
+def _comparable(value):
+    """Document references compare by path."""
+    return getattr(value, "path", value)
+
+def changed_fields(item, existing):
+    """
+    Fields of a scraped document that differ from the stored one.
+
+    Returns:
+        dict: Field -> new value (empty if nothing changed)
+    """
+    return {field: value for field, value in item.items()
+            if field not in existing or _comparable(existing[field]) != _comparable(value)}
+
+def sync_documents(collection_name, items, existing, created_fields=("created_at",)):
+    """
+    Write only the new and changed documents of a collection, in batches.
+
+    New documents get created_fields and updated_at set to the server time;
+    changed ones get just their changed fields and updated_at, so created_at
+    and start_date keep their original values.
+
+    Args:
+        collection_name: Firestore collection
+        items: Scraped documents (with IDs)
+        existing: Stored documents from load_existing
+        created_fields: Timestamp fields set only when a document is created
+
+    Returns:
+        Tuple of (created, updated, unchanged) counts
+    """
+    created = updated = unchanged = 0
+    writer = BatchWriter(db, collection_name, batch_size=WRITE_BATCH_SIZE, flush_seconds=None, check_existing=False)
+    for item in items:
+        stored = existing.get(item["id"])
+        if stored is None:
+            document = dict(item, updated_at=firestore.SERVER_TIMESTAMP)
+            for field in created_fields:
+                document[field] = firestore.SERVER_TIMESTAMP
+            created += 1
+            logger.info(f"{'DRY RUN: Would create' if is_dry_run() else 'Creating'} {collection_name} "
+                        f"{item.get('name')} ({item['id']})")
+        else:
+            changes = changed_fields(item, stored)
+            if not changes:
+                unchanged += 1
+                continue
+            document = dict(changes, id=item["id"], updated_at=firestore.SERVER_TIMESTAMP)
+            updated += 1
+            logger.info(f"{'DRY RUN: Would update' if is_dry_run() else 'Updating'} {collection_name} "
+                        f"{item.get('name')} ({item['id']}): {', '.join(sorted(changes))}")
+        writer.write(document)
+    writer.close()
+
+    logger.info(f"{collection_name}: {created} new, {updated} changed, {unchanged} unchanged")
+    return created, updated, unchanged
+
+def discover_competitions(competitions):
+    """
+    Bring the competitions and grades in Firestore in line with the competitions index.
+
+    The stored documents are read once and compared with the scraped blocks,
+    and only new or changed ones are written, so a rebuild mid-season costs
+    a handful of writes instead of two per block.
+
+    Args:
+        competitions: Blocks from get_competition_blocks
+
+    Returns:
+        Tuple of (comp_refs, comp_data_map, grade_refs, grade_data_map), keyed
+        by site competition and fixture ID
+    """
     comp_refs = {}
     comp_data_map = {}
     grade_refs = {}
     grade_data_map = {}
 
     for comp in competitions:
-        # Create competition
-        comp_ref, comp_data = create_competition(comp)
+        # A competition spans several blocks; as before, the last one's fixture ID is kept
         comp_id = comp["comp_id"]
-        comp_refs[comp_id] = comp_ref
+        comp_data = build_competition(comp)
+        comp_refs[comp_id] = db.collection("competitions").document(comp_data["id"])
         comp_data_map[comp_id] = comp_data
 
-        # Create grade
-        grade_ref, grade_data = create_grade(comp, comp_ref, comp_data)
+    for comp in competitions:
+        comp_id = comp["comp_id"]
+        grade_data = build_grade(comp, comp_refs[comp_id], comp_data_map[comp_id])
         fixture_id = comp["fixture_id"]
-        grade_refs[fixture_id] = grade_ref
+        grade_refs[fixture_id] = db.collection("grades").document(grade_data["id"])
         grade_data_map[fixture_id] = grade_data
 
+    sync_documents("competitions", comp_data_map.values(), load_existing("competitions"),
+                   created_fields=("created_at", "start_date"))
+    sync_documents("grades", grade_data_map.values(), load_existing("grades"))
+
+    return comp_refs, comp_data_map, grade_refs, grade_data_map
+
+def find_and_create_teams(competitions):
+    """Scan competitions to find teams and create in Firestore."""
+    logger.info(f"Scanning {len(competitions)} competitions for teams...")
+    teams = []
+    seen = set()
+    processed_count = 0
+
+    # Create or update competitions and grades first
+    comp_refs, comp_data_map, grade_refs, grade_data_map = discover_competitions(competitions)
+
     # Process teams
     for comp in competitions:
         processed_count += 1
@@ -124,17 +240,7 @@ def find_and_create_teams(competitions):
         soup = BeautifulSoup(response.text, "html.parser")
 
         # Extract teams from the page
-        team_info = {}
-        for a in soup.find_all("a"):
-            href = a.get("href", "")
-            text = a.text.strip()
-
-            # Check if this is a team link
-            team_match = TEAM_ID_REGEX.search(href)
-            if team_match and is_valid_team(text):
-                link_comp_id, team_id = team_match.groups()
-                if link_comp_id == comp_id:
-                    team_info[text] = team_id
+        team_info = extract_team_links(soup, comp_id)
 
         # Also look for teams in fixture details
         fixture_teams = set()
@@ -311,6 +417,10 @@ def main():
         # Create settings
         create_settings()
 
+        # Remember the competitions index so an unchanged one isn't parsed again
+        if not is_dry_run():
+            page_index.commit()
+
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=True)
 
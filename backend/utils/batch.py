@@ -1,13 +1,25 @@
 import logging
-from firebase_admin import firestore
 import os
+import sys
+import time
+
+from utils import metrics
+from utils.db import firestore
+from utils.mirror import get_mirror
 
 logger = logging.getLogger(__name__)
 
+# Constants
+DEFAULT_FLUSH_SECONDS = 5.0
+
 def is_dry_run():
     """Check if we're in dry run mode."""
     return os.environ.get('DRY_RUN', '').lower() in ('true', '1', 't')
 
+def is_stream_mode():
+    """Check if games should be written as they are parsed (STREAM_WRITES or --stream)."""
+    return os.environ.get('STREAM_WRITES', '').lower() in ('true', '1', 't') or '--stream' in sys.argv[1:]
+
 def batch_write_to_firestore(db, items, collection_name, transform_func=None, batch_size=400):
     """
     Write items to Firestore in batches to reduce costs and improve performance.
@@ -26,53 +38,274 @@ def batch_write_to_firestore(db, items, collection_name, transform_func=None, ba
         logger.info(f"DRY RUN: Would write {len(items)} items to {collection_name}")
         return 0, 0
 
-    batch = db.batch()
-    count = 0
-    creates = 0
-    updates = 0
-
+    writer = BatchWriter(db, collection_name, transform_func, batch_size, flush_seconds=None)
     for item in items:
+        writer.write(item)
+    return writer.close()
+
+def batch_delete_from_firestore(db, doc_ids, collection_name, batch_size=400):
+    """
+    Delete documents from Firestore in batches (and from the local mirror).
+
+    Args:
+        db: Firestore client
+        doc_ids: IDs of the documents to delete
+        collection_name: Firestore collection to delete from
+        batch_size: Maximum number of operations per batch (Firestore limit is 500)
+
+    Returns:
+        int: Number of documents deleted
+    """
+    doc_ids = list(doc_ids)
+    if is_dry_run():
+        logger.info(f"DRY RUN: Would delete {len(doc_ids)} items from {collection_name}")
+        return 0
+
+    mirror = get_mirror()
+    for start in range(0, len(doc_ids), batch_size):
+        chunk = doc_ids[start:start + batch_size]
+        batch = db.batch()
+        for doc_id in chunk:
+            batch.delete(db.collection(collection_name).document(doc_id))
+        with metrics.stage("firestore_write"):
+            batch.commit()
+        metrics.incr("firestore_commits")
+        metrics.incr("firestore_deletes", len(chunk))
+        logger.info(f"Deleted batch of {len(chunk)} from {collection_name}")
+
+        if mirror is not None:
+            with metrics.stage("mirror_write"):
+                mirror.delete(collection_name, chunk)
+
+    return len(doc_ids)
+
+class BatchWriter:
+    """
+    Streaming sink for batched Firestore writes.
+
+    Items are queued with write() and committed as soon as batch_size are
+    pending or flush_seconds have passed since the oldest pending one, so
+    writes land while a crawl is still running and memory stays bounded.
+    Use it as a context manager, or call close(), to commit the remainder.
+
+    With check_existing=False (bulk loads) documents are merged in without
+    the per-document read that tells creates from updates, halving the
+    operations; only `written` is counted.
+
+    diff_func(item, stored) is called with each item and the stored
+    document (None for a create) from that read; the change records it
+    returns are collected in `changes` (see utils/changes.py).
+
+    With alias_collection set, an item whose document doesn't exist yet but
+    whose legacy_id document does (a game stored under its old hash ID) is
+    migrated in the same batch: the old document's fields are carried over,
+    it is diffed as the stored version, an alias from the old ID is written
+    to alias_collection and the old document is deleted. Counted in
+    `migrated` (and as an update). When a stored item's legacy_id changes
+    (a renamed team, a game moved to another round), the old one is added
+    to its legacy_ids and aliased too, so a document left under it can be
+    merged (compact_games.py).
+
+    An item whose ID was already written by this writer is skipped (counted
+    in `duplicates`) when reads are on: a game between two tracked teams is
+    parsed once per team, and both copies would read the same pre-commit
+    state, counting two creates and reporting the change twice.
+
+    stage_changes(changes) is called with the change records of each batch
+    just before it is committed, so they can be kept durably until they are
+    published (see utils.outbox.stage).
+    """
+
+    def __init__(self, db, collection_name, transform_func=None, batch_size=400,
+                 flush_seconds=DEFAULT_FLUSH_SECONDS, check_existing=True, diff_func=None,
+                 alias_collection=None, stage_changes=None):
+        self.db = db
+        self.collection_name = collection_name
+        self.transform_func = transform_func
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.check_existing = check_existing
+        self.diff_func = diff_func
+        self.alias_collection = alias_collection
+        self.stage_changes = stage_changes
+        self.changes = []
+        self._staged = 0  # changes already handed to stage_changes
+        self.dry_run = is_dry_run()
+        self.creates = 0
+        self.updates = 0
+        self.written = 0
+        self.migrated = 0
+        self.duplicates = 0
+        self._seen_ids = set()
+        self._batch = None
+        self._count = 0
+        self._extra_ops = 0  # alias writes, and deletes of migrated documents
+        self._legacy_deletes = []
+        self._oldest = None
+        self._mirror = get_mirror()
+        # (doc_id, item, is_update) for the local mirror, applied after each commit
+        self._mirror_writes = []
+
+    def write(self, item):
+        """Queue one item, committing the batch if it is full or old enough."""
         # Apply transformation if provided
-        if transform_func:
-            item = transform_func(item)
+        if self.transform_func:
+            item = self.transform_func(item)
 
         # Get document ID
         doc_id = item.get('id')
         if not doc_id:
             logger.warning(f"Item missing ID, skipping: {item}")
-            continue
+            return
+
+        if self.check_existing:
+            if doc_id in self._seen_ids:
+                self.duplicates += 1
+                logger.debug(f"{self.collection_name} {doc_id} already written, skipping the copy")
+                return
+            self._seen_ids.add(doc_id)
+
+        if not self.dry_run:
+            if self._batch is None:
+                self._batch = self.db.batch()
+            doc_ref = self.db.collection(self.collection_name).document(doc_id)
+
+            if not self.check_existing:
+                # Bulk load: merge without reading the document first
+                self._batch.set(doc_ref, item, merge=True)
+                is_update = True
+            else:
+                # Check if document exists to count creates vs updates
+                with metrics.stage("firestore_read"):
+                    doc = doc_ref.get()
+                metrics.incr("firestore_reads")
+                legacy = None
+                if not doc.exists:
+                    legacy = self._legacy_document(item, doc_id)
+                if self.diff_func is not None:
+                    stored = doc.to_dict() if doc.exists else legacy.to_dict() if legacy is not None else None
+                    self.changes.extend(self.diff_func(item, stored))
+                if legacy is not None:
+                    item = self._migrate(doc_ref, legacy, item)
+                    is_update = False
+                elif doc.exists:
+                    # Update - don't overwrite created_at
+                    if 'created_at' in doc.to_dict() and 'created_at' not in item:
+                        item['created_at'] = doc.to_dict()['created_at']
+                    if self.alias_collection is not None:
+                        self._record_legacy_id(doc_ref, doc.to_dict(), item)
 
-        doc_ref = db.collection(collection_name).document(doc_id)
+                    self._batch.update(doc_ref, item)
+                    self.updates += 1
+                    is_update = True
+                else:
+                    # Create
+                    if 'created_at' not in item:
+                        item['created_at'] = firestore.SERVER_TIMESTAMP
 
-        # Check if document exists to count creates vs updates
-        doc = doc_ref.get()
-        if doc.exists:
-            # Update - don't overwrite created_at
-            if 'created_at' in doc.to_dict() and 'created_at' not in item:
-                item['created_at'] = doc.to_dict()['created_at']
+                    self._batch.set(doc_ref, item)
+                    self.creates += 1
+                    is_update = False
 
-            batch.update(doc_ref, item)
-            updates += 1
+            if self._mirror is not None:
+                self._mirror_writes.append((doc_id, item, is_update))
+
+        self._count += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+        # Commit when batch size is reached or the oldest item has waited long enough
+        if self._count + self._extra_ops >= self.batch_size or (
+                self.flush_seconds is not None and time.monotonic() - self._oldest >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Commit everything pending."""
+        if self._count == 0:
+            return
+
+        if self.dry_run:
+            logger.info(f"DRY RUN: Would write {self._count} items to {self.collection_name}")
         else:
-            # Create
-            if 'created_at' not in item:
-                item['created_at'] = firestore.SERVER_TIMESTAMP
+            if self.stage_changes is not None and len(self.changes) > self._staged:
+                self.stage_changes(self.changes[self._staged:])
+                self._staged = len(self.changes)
+            with metrics.stage("firestore_write"):
+                self._batch.commit()
+            metrics.incr("firestore_commits")
+            metrics.incr("firestore_writes", self._count)
+            logger.info(f"Committed batch of {self._count} to {self.collection_name}")
 
-            batch.set(doc_ref, item)
-            creates += 1
+            if self._mirror_writes:
+                with metrics.stage("mirror_write"):
+                    self._mirror.apply(self.collection_name, self._mirror_writes)
+            if self._legacy_deletes and self._mirror is not None:
+                with metrics.stage("mirror_write"):
+                    self._mirror.delete(self.collection_name, self._legacy_deletes)
 
-        count += 1
+        self.written += self._count
+        self._mirror_writes = []
+        self._legacy_deletes = []
+        self._batch = None
+        self._count = 0
+        self._extra_ops = 0
+        self._oldest = None
 
-        # Commit when batch size is reached
-        if count >= batch_size:
-            batch.commit()
-            logger.info(f"Committed batch of {count} to {collection_name}")
-            batch = db.batch()
-            count = 0
+    def _legacy_document(self, item, doc_id):
+        """Snapshot of the item's document under its legacy ID, if there is one to migrate."""
+        legacy_id = item.get("legacy_id")
+        if self.alias_collection is None or not legacy_id or legacy_id == doc_id:
+            return None
+        with metrics.stage("firestore_read"):
+            legacy = self.db.collection(self.collection_name).document(legacy_id).get()
+        metrics.incr("firestore_reads")
+        return legacy if legacy.exists else None
+
+    def _record_legacy_id(self, doc_ref, stored, item):
+        """Keep a stored document's previous legacy_id in legacy_ids, with an alias, when it changes."""
+        old_id = stored.get("legacy_id")
+        legacy_ids = set(stored.get("legacy_ids") or [])
+        if not old_id or old_id == item.get("legacy_id") or old_id in legacy_ids:
+            return
+        item["legacy_ids"] = sorted(legacy_ids | {old_id})
+        self._batch.set(self.db.collection(self.alias_collection).document(old_id),
+                        {"game_id": doc_ref.id, "created_at": firestore.SERVER_TIMESTAMP})
+        self._extra_ops += 1
+        logger.info(f"{self.collection_name} {doc_ref.id} was {old_id}, keeping it as an alias")
+
+    def _migrate(self, doc_ref, legacy, item):
+        """Queue the move of a legacy document to the item's ID; returns what is written."""
+        stored = legacy.to_dict()
+        document = dict(stored, **item)
+        document["legacy_ids"] = sorted(set(stored.get("legacy_ids") or []) | {legacy.id})
+        # The game is as old as its legacy document
+        document["created_at"] = stored.get("created_at", firestore.SERVER_TIMESTAMP)
+
+        self._batch.set(doc_ref, document)
+        self._batch.set(self.db.collection(self.alias_collection).document(legacy.id),
+                        {"game_id": doc_ref.id, "created_at": firestore.SERVER_TIMESTAMP})
+        self._batch.delete(legacy.reference)
+        self._extra_ops += 2
+        self._legacy_deletes.append(legacy.id)
+        self.updates += 1
+        self.migrated += 1
+        metrics.incr("legacy_migrations")
+        logger.info(f"Migrating {self.collection_name} {legacy.id} to {doc_ref.id}")
+        return document
+
+    def close(self):
+        """
+        Commit any remaining items.
+
+        Returns:
+            Tuple of (creates, updates) counts
+        """
+        self.flush()
+        return self.creates, self.updates
 
-    # Commit any remaining items
-    if count > 0:
-        batch.commit()
-        logger.info(f"Committed final batch of {count} to {collection_name}")
+    def __enter__(self):
+        return self
 
-    return creates, updates
\ No newline at end of file
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
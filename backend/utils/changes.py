@@ -0,0 +1,135 @@
+"""
+What changed in a game between two polls.
+
+Polls overwrite games wholesale, so on its own the games collection can't
+say what a poll actually changed. diff_game compares a freshly parsed game
+with the stored version (BatchWriter already reads it before writing, see
+its diff_func) and returns typed change records:
+
+    new_game          first time the game is seen
+    rescheduled       start time (or round) moved
+    venue_changed     venue changed
+    result_posted     both scores appeared
+    result_corrected  a posted score changed
+
+Each record names the game, its grade and round, the teams playing, its
+time and venue, with the values before and after, so summaries,
+notifications and caches can react to exactly the games that changed.
+"""
+import logging
+from datetime import datetime, timezone
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Constants
+CHANGE_TYPES = ("new_game", "rescheduled", "venue_changed", "result_posted", "result_corrected")
+
+
+def _wall_clock(value):
+    """
+    Compare dates at minute resolution, ignoring how they were stored.
+
+    Firestore hands naive datetimes back as UTC-aware ones with the same
+    wall-clock time, so aware values are converted to naive UTC.
+    """
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(second=0, microsecond=0)
+
+
+def _score(game):
+    """(home, away) score, or None unless both are posted."""
+    home = game.get("home_team", {}).get("score")
+    away = game.get("away_team", {}).get("score")
+    if home is None or away is None:
+        return None
+    return home, away
+
+
+def team_ids(game):
+    """IDs of the Mentone teams playing in a game."""
+    return [game[side]["id"] for side in ("home_team", "away_team") if game.get(side, {}).get("id")]
+
+
+def make_change(change_type, game, before=None, after=None):
+    """One change record for a game."""
+    return {
+        "type": change_type,
+        "game_id": game.get("id"),
+        "comp_id": game.get("comp_id"),
+        "fixture_id": game.get("fixture_id"),
+        "round": game.get("round"),
+        "team_ids": team_ids(game),
+        "home_team": game.get("home_team", {}).get("name"),
+        "away_team": game.get("away_team", {}).get("name"),
+        "date": game.get("date"),
+        "venue": game.get("venue"),
+        "before": before,
+        "after": after,
+        "detected_at": datetime.now(),
+    }
+
+
+def diff_game(game, stored):
+    """
+    Typed changes between a parsed game and its stored version.
+
+    Args:
+        game: Freshly parsed game
+        stored: Stored game data, or None if the game is new
+
+    Returns:
+        list: Change records (empty if nothing of interest changed)
+    """
+    if stored is None:
+        changes = [make_change("new_game", game, after={"date": game.get("date"), "venue": game.get("venue")})]
+    else:
+        changes = []
+        if (_wall_clock(game.get("date")) != _wall_clock(stored.get("date"))
+                or game.get("round") != stored.get("round")):
+            changes.append(make_change("rescheduled", game,
+                                       before={"date": stored.get("date"), "round": stored.get("round")},
+                                       after={"date": game.get("date"), "round": game.get("round")}))
+
+        if game.get("venue") != stored.get("venue"):
+            changes.append(make_change("venue_changed", game,
+                                       before={"venue": stored.get("venue")}, after={"venue": game.get("venue")}))
+
+    # A new game can already have its result
+    new_score = _score(game)
+    old_score = _score(stored) if stored is not None else None
+    if new_score is not None and new_score != old_score:
+        change_type = "result_posted" if old_score is None else "result_corrected"
+        changes.append(make_change(change_type, game,
+                                   before=None if old_score is None else {"home": old_score[0], "away": old_score[1]},
+                                   after={"home": new_score[0], "away": new_score[1]}))
+
+    for change in changes:
+        metrics.incr(f"changes_{change['type']}")
+    return changes
+
+
+def count_changes(changes):
+    """Number of changes of each type."""
+    counts = {change_type: 0 for change_type in CHANGE_TYPES}
+    for change in changes:
+        counts[change["type"]] += 1
+    return counts
+
+
+def log_changes(changes):
+    """Log what a poll changed."""
+    counts = count_changes(changes)
+    logger.info("Changes: " + ", ".join(f"{count} {change_type}" for change_type, count in counts.items()))
+    for change in changes:
+        if change["type"] != "new_game":
+            logger.info(f"{change['type']}: {change['game_id']} {change['before']} -> {change['after']}")
+
+
+def changed_game_ids(changes, types=CHANGE_TYPES):
+    """IDs of the games with a change of one of the given types."""
+    return {change["game_id"] for change in changes if change["type"] in types}
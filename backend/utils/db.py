@@ -0,0 +1,113 @@
+"""
+Lazily initialised, process-wide Firestore client.
+
+Importing firebase_admin.firestore and creating a client pulls in gRPC and
+the Google Cloud libraries, which costs a noticeable fraction of a second.
+Scripts therefore never connect at import time. Instead they use:
+
+    db          Proxy for the Firestore client; the Firebase app and client
+                are created on the first attribute access (db.collection...)
+    firestore   Proxy for firebase_admin.firestore, imported on first use
+                (firestore.SERVER_TIMESTAMP, firestore.Query, ...)
+
+Dry runs, parser benchmarks and anything else that never touches Firestore
+skip the startup cost entirely. set_db() swaps in another client (the
+emulator or benchmarks/fake_firestore.FakeClient) for every module at once.
+
+Environment:
+    FIREBASE_CREDENTIALS     Service account key (default: backend/secrets/serviceAccountKey.json)
+    FIREBASE_PROJECT_ID      Project used with the emulator (default: hockey-tracker-e67d0)
+    FIRESTORE_EMULATOR_HOST  Connect to the local emulator, no credentials needed
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Anchored at backend/ so scripts work from backend/ and creation-scripts/ alike
+DEFAULT_CREDENTIALS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "secrets", "serviceAccountKey.json")
+DEFAULT_PROJECT_ID = "hockey-tracker-e67d0"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _initialize_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return
+
+    cred_path = os.environ.get("FIREBASE_CREDENTIALS", DEFAULT_CREDENTIALS)
+    if os.environ.get("FIRESTORE_EMULATOR_HOST") and not os.path.exists(cred_path):
+        project_id = os.environ.get("FIREBASE_PROJECT_ID", DEFAULT_PROJECT_ID)
+        firebase_admin.initialize_app(options={"projectId": project_id})
+    else:
+        firebase_admin.initialize_app(credentials.Certificate(cred_path))
+
+
+def get_db():
+    """
+    Get the process-wide Firestore client, initialising Firebase on first call.
+
+    Returns:
+        Firestore client
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                start = time.perf_counter()
+                _initialize_app()
+                from firebase_admin import firestore as admin_firestore
+                _client = admin_firestore.client()
+                logger.debug(f"Initialised Firestore client in {time.perf_counter() - start:.2f}s")
+    return _client
+
+
+def set_db(client):
+    """Use `client` for every module from now on (None resets to lazy initialisation)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def is_initialized():
+    """Whether a client has been created (or set) in this process."""
+    return _client is not None
+
+
+class _LazyClient:
+    """Stands in for the Firestore client until it is first used."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __repr__(self):
+        return f"<lazy Firestore client ({'connected' if is_initialized() else 'not connected'})>"
+
+
+class _LazyModule:
+    """Imports a module on first attribute access."""
+
+    def __init__(self, module_name):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return getattr(self._module, name)
+
+    def __repr__(self):
+        return f"<lazy module {self._module_name}>"
+
+
+db = _LazyClient()
+firestore = _LazyModule("firebase_admin.firestore")
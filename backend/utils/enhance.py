@@ -1,8 +1,15 @@
 from datetime import datetime
-from firebase_admin import firestore
+from utils.db import firestore
+from utils.ids import assign_game_id
+from utils import metrics
 
 def enhance_game_metadata(game):
-    """Add useful metadata fields to games for filtering."""
+    """
+    Add useful metadata fields to games for filtering.
+
+    Everything added is derived from the parsed game, so enhanced games can
+    be stored in the page index; last_polled_at is stamped when writing.
+    """
     if "date" in game and isinstance(game["date"], datetime):
         # Add day of week as string (Monday, Tuesday, etc.)
         game["day_of_week"] = game["date"].strftime("%A")
@@ -53,11 +60,22 @@ def enhance_game_metadata(game):
                 else:
                     game["mentone_result"] = "draw"
 
-    # Track freshness
-    game["last_polled_at"] = firestore.SERVER_TIMESTAMP
-
     return game
 
+def finish_games(games):
+    """
+    Give parsed games their IDs and metadata.
+
+    The pollers' parse functions call this, so the page index stores
+    finished games and a game reused from an unchanged page is neither
+    parsed nor enhanced again.
+    """
+    for game in games:
+        assign_game_id(game)
+        with metrics.stage("enhance"):
+            enhance_game_metadata(game)
+    return games
+
 def generate_team_summaries(team_games):
     """
     Generate summary documents for each team.
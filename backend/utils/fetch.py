@@ -0,0 +1,172 @@
+"""
+Shared HTTP fetching for every scraper.
+
+All entry points (pollers, season_builder and the creation scripts) fetch
+through make_request here, so they share one connection pool, the per-host
+rate limiter, the retry policy / circuit breaker and the run metrics. This
+module and utils/parsers.py never import or initialise Firebase, so they
+are cheap to import from dry runs, benchmarks and tools.
+
+Environment:
+    FETCH_WORKERS   Threads used by fetch_all (default 1, i.e. sequential)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from utils import metrics, profiling, ratelimit, retry
+
+logger = logging.getLogger(__name__)
+
+# Constants
+REQUEST_TIMEOUT = 10  # seconds
+POOL_MAXSIZE = 16  # connections kept alive per host
+DEFAULT_FETCH_WORKERS = 1
+USER_AGENT = "MentoneHockeyTracker/1.0 (+https://github.com/bourbon-beast/hockey-tracker-vite)"
+
+# Shared retry policy (see utils/retry.py for the environment overrides)
+retry_policy = retry.RetryPolicy.from_env()
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Process-wide requests session so every scraper shares one connection pool."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+@profiling.hot
+def make_request(url, retry_count=0):
+    """
+    Make an HTTP request with status-aware retries and a per-host circuit breaker.
+
+    404s and other client errors are not retried. Connection errors, timeouts,
+    429 and 5xx are retried with exponential backoff and jitter (or the
+    server's Retry-After). Once a host keeps failing its circuit opens and
+    requests return None immediately until a probe succeeds.
+
+    Args:
+        url (str): URL to request
+        retry_count (int): Retries already used
+
+    Returns:
+        requests.Response or None: Response if successful, None if failed
+    """
+    return fetch_with_status(url, retry_count)[0]
+
+def fetch_with_status(url, retry_count=0):
+    """
+    make_request, also saying why a fetch failed.
+
+    Callers that treat a missing page differently from an outage (a 404
+    past a grade's last round vs. a server error mid-crawl) use this.
+
+    Returns:
+        Tuple of (requests.Response or None, status), where status is the
+        last HTTP status received, or None if the server never answered
+        (connection errors, timeouts, an open circuit)
+    """
+    breaker = retry.get_breaker(url)
+    attempt = retry_count
+    status = None
+
+    while True:
+        if not breaker.allow_request():
+            logger.warning(f"Circuit open for {url}, skipping request")
+            metrics.incr("http_circuit_open")
+            return None, status
+
+        ratelimit.acquire(url)
+        logger.debug(f"Requesting: {url}")
+        metrics.incr("http_requests")
+
+        response = None
+        try:
+            with metrics.stage("fetch"):
+                response = get_session().get(url, timeout=REQUEST_TIMEOUT)
+            metrics.incr("http_bytes", len(response.content))
+        except requests.exceptions.RequestException as e:
+            error = e
+            status = None
+            breaker.record_failure()
+        else:
+            status = response.status_code
+            if response.status_code < 400:
+                breaker.record_success()
+                return response, status
+
+            error = f"HTTP {response.status_code}"
+            if response.status_code in retry.BREAKER_FAILURE_STATUS:
+                breaker.record_failure()
+            else:
+                # The host answered, so it is up even if this page is missing
+                breaker.record_success()
+
+            if not retry_policy.is_retryable_status(response.status_code):
+                logger.debug(f"Request to {url} returned {response.status_code}, not retrying")
+                metrics.incr("http_not_found" if response.status_code == 404 else "http_client_errors")
+                return None, status
+
+        metrics.incr("http_errors")
+        if attempt >= retry_policy.max_retries:
+            logger.error(f"Request to {url} failed after {attempt + 1} attempts: {error}")
+            metrics.incr("http_failures")
+            return None, status
+
+        delay = retry_policy.delay(attempt, response)
+        attempt += 1
+        logger.warning(f"Request to {url} failed: {error}. "
+                       f"Retrying in {delay:.1f}s ({attempt}/{retry_policy.max_retries})...")
+        metrics.incr("http_retries")
+        with metrics.stage("backoff"):
+            time.sleep(delay)
+
+def fetch_workers():
+    """Number of concurrent fetches configured with FETCH_WORKERS."""
+    return max(1, min(POOL_MAXSIZE, int(os.environ.get("FETCH_WORKERS", DEFAULT_FETCH_WORKERS))))
+
+def fetch_all(urls, max_workers=None):
+    """
+    Fetch several URLs concurrently.
+
+    Every request still goes through make_request, so the per-host rate
+    limit and circuit breaker apply across all threads.
+
+    Args:
+        urls: URLs to fetch
+        max_workers: Threads to use (defaults to FETCH_WORKERS)
+
+    Returns:
+        list: Response or None for each URL, in the same order
+    """
+    return _fetch_each(make_request, urls, max_workers)
+
+def fetch_all_with_status(urls, max_workers=None):
+    """
+    fetch_all, with each response's status (see fetch_with_status).
+
+    Returns:
+        list: (Response or None, status) for each URL, in the same order
+    """
+    return _fetch_each(fetch_with_status, urls, max_workers)
+
+def _fetch_each(fetch, urls, max_workers):
+    max_workers = max_workers or fetch_workers()
+    if max_workers <= 1 or len(urls) <= 1:
+        return [fetch(url) for url in urls]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="fetch") as executor:
+        return list(executor.map(fetch, urls))
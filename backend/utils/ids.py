@@ -26,6 +26,38 @@ def make_game_id(comp_id, fixture_id, round_num, home_team, away_team):
     hash_str = hash_object.hexdigest()[:8]
     return f"game_{hash_str}"
 
+def make_source_game_id(source_id):
+    """Game ID from the site's own game ID (the N in /game/N)."""
+    return str(source_id)
+
+def make_legacy_game_id(game):
+    """Hash ID a parsed game had before source game IDs were used."""
+    return make_game_id(game["comp_id"], game["fixture_id"], game["round"],
+                        game["home_team"]["name"], game["away_team"]["name"])
+
+def make_game_doc_id(game):
+    """
+    Document ID of a parsed game.
+
+    The site's game ID survives renamed teams and games moved between rounds,
+    so it is used whenever the page links to the game; the hash of
+    competition, grade, round and team names is the fallback.
+    """
+    if game.get("source_id"):
+        return make_source_game_id(game["source_id"])
+    return make_legacy_game_id(game)
+
+def assign_game_id(game):
+    """Set a parsed game's document ID, keeping its hash ID as legacy_id for the alias index."""
+    game["id"] = make_game_doc_id(game)
+    if game.get("source_id"):
+        game["legacy_id"] = make_legacy_game_id(game)
+    return game["id"]
+
+def make_venue_id(venue_key):
+    """Venue document ID from a venue key (utils.venues.venue_key)."""
+    return f"venue_{venue_key}"
+
 def make_summary_id(team_id, round_num):
     """Generate summary document ID."""
     return f"summary_{team_id}_round_{round_num}"
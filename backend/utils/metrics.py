@@ -0,0 +1,209 @@
+"""
+Per-run metrics for the pollers and builders.
+
+Records exclusive wall time per stage (fetch, parse, enhance, firestore_read,
+firestore_write, summaries, ...) plus event counters (HTTP requests, bytes,
+retries, cache hits, Firestore operations). At the end of a run the metrics
+are written as a JSON report and, optionally, in Prometheus text format.
+
+Stages nest: time spent in an inner stage is not counted again in the outer
+one, so stage times add up to the instrumented part of the run.
+
+Environment:
+    METRICS_DIR              Directory for JSON run reports (default: metrics)
+    METRICS_PROMETHEUS_FILE  Also write Prometheus text format to this file
+    METRICS_DISABLED         Set to true to skip writing reports
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_METRICS_DIR = "metrics"
+PROMETHEUS_PREFIX = "hockey_poller"
+
+
+class RunMetrics:
+    """Stage timings and counters for a single run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.finished_at = None
+        self.duration = None
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _add_stage_time(self, stage_name, seconds, calls=0):
+        with self._lock:
+            stage = self.stages.setdefault(stage_name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += calls
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Time a block as `stage_name`, pausing any enclosing stage."""
+        stack = self._stack()
+        now = time.perf_counter()
+        if stack:
+            parent_name, parent_start = stack[-1]
+            self._add_stage_time(parent_name, now - parent_start)
+        stack.append((stage_name, now))
+
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _, start = stack.pop()
+            self._add_stage_time(stage_name, end - start, calls=1)
+            if stack:
+                # Resume the enclosing stage from now
+                stack[-1] = (stack[-1][0], end)
+
+    def incr(self, counter_name, value=1):
+        """Increment a named counter."""
+        with self._lock:
+            self.counters[counter_name] = self.counters.get(counter_name, 0) + value
+
+    def finish(self):
+        """Mark the run as finished."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            self.finished_at = datetime.now()
+        return self
+
+    def to_dict(self):
+        """Structured run report."""
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._start
+        instrumented = sum(s["seconds"] for s in self.stages.values())
+        return {
+            "run": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "duration_seconds": round(duration, 4),
+            "stages": {
+                name: {
+                    "seconds": round(stage["seconds"], 4),
+                    "calls": stage["calls"],
+                    "share": round(stage["seconds"] / duration, 4) if duration else 0,
+                }
+                for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+            },
+            "uninstrumented_seconds": round(max(0.0, duration - instrumented), 4),
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def to_prometheus(self):
+        """Render the run in Prometheus text exposition format."""
+        report = self.to_dict()
+        run = self.name
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_run_duration_seconds Wall time of the whole run.",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f'{PROMETHEUS_PREFIX}_run_duration_seconds{{run="{run}"}} {report["duration_seconds"]}',
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Exclusive wall time spent in each stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds gauge",
+        ]
+        for name, stage in report["stages"].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_seconds{{run="{run}",stage="{name}"}} {stage["seconds"]}')
+
+        lines.extend([
+            f"# HELP {PROMETHEUS_PREFIX}_stage_calls_total Number of times each stage ran.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_calls_total counter",
+        ])
+        for name, stage in report["stages"].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_stage_calls_total{{run="{run}",stage="{name}"}} {stage["calls"]}')
+
+        lines.extend([
+            f"# HELP {PROMETHEUS_PREFIX}_events_total Event counters (requests, bytes, retries, Firestore ops).",
+            f"# TYPE {PROMETHEUS_PREFIX}_events_total counter",
+        ])
+        for name, value in report["counters"].items():
+            lines.append(f'{PROMETHEUS_PREFIX}_events_total{{run="{run}",event="{name}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line human readable stage breakdown for the log."""
+        report = self.to_dict()
+        stages = ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in report["stages"].items())
+        return f"{self.name}: {report['duration_seconds']:.2f}s total ({stages or 'no stages'})"
+
+
+# Metrics for the current run; a default instance so instrumentation always works
+_current = RunMetrics("default")
+
+
+def start_run(name):
+    """Start collecting metrics for a new run."""
+    global _current
+    _current = RunMetrics(name)
+    return _current
+
+
+def current_run():
+    """Metrics for the run in progress."""
+    return _current
+
+
+def stage(stage_name):
+    """Time a block as a stage of the current run."""
+    return _current.stage(stage_name)
+
+
+def incr(counter_name, value=1):
+    """Increment a counter on the current run."""
+    _current.incr(counter_name, value)
+
+
+def write_report(run=None):
+    """
+    Finish the run and write its report files.
+
+    Args:
+        run: RunMetrics to write (defaults to the current run)
+
+    Returns:
+        Path of the JSON report, or None if reporting is disabled or failed
+    """
+    run = (run or _current).finish()
+    logger.info(f"Run metrics - {run.summary()}")
+
+    if os.environ.get("METRICS_DISABLED", "").lower() in ("true", "1", "t"):
+        return None
+
+    try:
+        metrics_dir = os.environ.get("METRICS_DIR", DEFAULT_METRICS_DIR)
+        os.makedirs(metrics_dir, exist_ok=True)
+        report_path = os.path.join(metrics_dir, f"{run.name}_{run.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, "w") as f:
+            json.dump(run.to_dict(), f, indent=2)
+        logger.info(f"Wrote run report to {report_path}")
+
+        prometheus_file = os.environ.get("METRICS_PROMETHEUS_FILE")
+        if prometheus_file:
+            # Write-then-rename so a node_exporter textfile collector never sees a partial file
+            tmp_path = f"{prometheus_file}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(run.to_prometheus())
+            os.replace(tmp_path, prometheus_file)
+            logger.info(f"Wrote Prometheus metrics to {prometheus_file}")
+
+        return report_path
+    except OSError as e:
+        logger.error(f"Failed to write run report: {e}")
+        return None
@@ -0,0 +1,532 @@
+"""
+Local SQLite mirror of games, teams, grades and competitions.
+
+Firestore bills every document read and a weekly summary or ladder reads a
+lot of them. When LOCAL_MIRROR is set, every batch the pollers commit to a
+mirrored collection is also written to a SQLite file, and the teams they
+load are refreshed there too. `python -m utils.mirror --sync` bootstraps
+(or repairs) the mirror with a full copy from Firestore.
+
+Documents are stored as JSON next to indexed columns (date, fixture_id,
+comp_id, round, season, club IDs). MirrorClient exposes the read-only part
+of the Firestore client API (collection/where/order_by/limit/stream/
+document/get), so the helpers in firestore_queries.py run against it
+unchanged; filters on indexed fields become SQL, anything else is
+filtered in Python.
+
+Datetimes are stored as naive UTC, the same way Firestore treats them.
+
+Environment:
+    LOCAL_MIRROR   Path of the SQLite mirror (unset = no mirror)
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Indexed columns per collection: column name -> document field path
+MIRRORED_COLLECTIONS = {
+    "games": {
+        "date": "date",
+        "fixture_id": "fixture_id",
+        "comp_id": "comp_id",
+        "round": "round",
+        "season": "season",
+        "home_club_id": "home_team.club_id",
+        "away_club_id": "away_team.club_id",
+    },
+    "teams": {
+        "fixture_id": "fixture_id",
+        "comp_id": "comp_id",
+        "club_id": "club_id",
+        "is_home_club_team": "is_home_club_team",
+    },
+    "grades": {
+        "fixture_id": "original_id",
+        "comp_id": "comp_id",
+    },
+    "competitions": {
+        "comp_id": "original_id",
+        "season": "season",
+    },
+}
+SQL_OPERATORS = {"==": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+DATETIME_TAG = "__datetime__"
+REF_TAG = "__ref__"
+
+
+def _normalise_datetime(value):
+    """Naive UTC datetime, as Firestore stores it."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _encode(value):
+    """Make a document value JSON-serialisable."""
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: _normalise_datetime(value).isoformat()}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "path") and hasattr(value, "get"):
+        # DocumentReference
+        return {REF_TAG: value.path}
+
+    from utils.db import firestore
+    if value is firestore.SERVER_TIMESTAMP:
+        return {DATETIME_TAG: datetime.now(timezone.utc).replace(tzinfo=None).isoformat()}
+    return str(value)
+
+
+def _get_field(data, field_path):
+    """Resolve a dotted field path against a document dict."""
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _column_value(value):
+    """Value stored in an indexed column (datetimes as sortable ISO strings)."""
+    if isinstance(value, dict) and DATETIME_TAG in value:
+        return value[DATETIME_TAG]
+    if isinstance(value, datetime):
+        return _normalise_datetime(value).isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (str, int, float)):
+        return value
+    return None
+
+
+def _matches(value, op, expected):
+    """Evaluate a where() filter in Python (fields without a column)."""
+    if op == "==":
+        return value == expected
+    if op == "!=":
+        return value is not None and value != expected
+    if op == "in":
+        return value in expected
+    if op == "not-in":
+        return value is not None and value not in expected
+    if op == "array_contains":
+        return isinstance(value, list) and expected in value
+    if value is None:
+        return False
+    try:
+        if op == "<":
+            return value < expected
+        if op == "<=":
+            return value <= expected
+        if op == ">":
+            return value > expected
+        if op == ">=":
+            return value >= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+class Mirror:
+    """SQLite store holding the mirrored collections."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for collection, columns in MIRRORED_COLLECTIONS.items():
+                column_defs = "".join(f", {column}" for column in columns)
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {collection} (id TEXT PRIMARY KEY, data TEXT NOT NULL{column_defs})"
+                )
+                # Mirrors created before a column was added
+                existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({collection})")}
+                for column in columns:
+                    if column not in existing:
+                        self._conn.execute(f"ALTER TABLE {collection} ADD COLUMN {column}")
+                        self._conn.execute(
+                            f"UPDATE {collection} SET {column} = json_extract(data, '$.{columns[column]}')"
+                        )
+                for column in columns:
+                    self._conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{collection}_{column} ON {collection} ({column})"
+                    )
+
+    def write(self, collection, items, merge=False):
+        """
+        Store documents in a mirrored collection (other collections are ignored).
+
+        Args:
+            collection: Collection name
+            items: Iterable of (doc_id, data) pairs
+            merge: Update the given fields of existing documents instead of replacing them
+        """
+        self.apply(collection, [(doc_id, data, merge) for doc_id, data in items])
+
+    def apply(self, collection, writes):
+        """
+        Apply a committed batch to a mirrored collection in one transaction.
+
+        Args:
+            collection: Collection name
+            writes: Iterable of (doc_id, data, merge) in commit order
+        """
+        columns = MIRRORED_COLLECTIONS.get(collection)
+        if columns is None:
+            return
+
+        with self._lock, self._conn:
+            for doc_id, data, merge in writes:
+                data = _encode(data)
+                if merge:
+                    row = self._conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (doc_id,)).fetchone()
+                    if row:
+                        data = {**json.loads(row[0]), **data}
+
+                values = [doc_id, json.dumps(data)] + [_column_value(_get_field(data, path)) for path in columns.values()]
+                placeholders = ", ".join("?" for _ in values)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {collection} (id, data, {', '.join(columns)}) VALUES ({placeholders})",
+                    values,
+                )
+
+    def clear(self, collection):
+        """Remove every document from a mirrored collection."""
+        if collection not in MIRRORED_COLLECTIONS:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {collection}")
+
+    def delete(self, collection, doc_ids):
+        """Remove documents from a mirrored collection."""
+        if collection not in MIRRORED_COLLECTIONS:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(f"DELETE FROM {collection} WHERE id = ?", [(doc_id,) for doc_id in doc_ids])
+
+    def decode(self, value):
+        """Turn stored JSON back into document values (datetimes, references)."""
+        if isinstance(value, dict):
+            if DATETIME_TAG in value:
+                return datetime.fromisoformat(value[DATETIME_TAG])
+            if REF_TAG in value:
+                collection, doc_id = value[REF_TAG].rsplit("/", 1)
+                return MirrorDocumentReference(self, collection, doc_id)
+            return {key: self.decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        return value
+
+    def get(self, collection, doc_id):
+        """A single document, or None."""
+        if collection not in MIRRORED_COLLECTIONS:
+            return None
+        with self._lock:
+            row = self._conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (doc_id,)).fetchone()
+        return self.decode(json.loads(row[0])) if row else None
+
+    def query(self, collection, filters=(), order=(), limit=None):
+        """
+        Run a Firestore-style query.
+
+        Returns:
+            list: (doc_id, data) pairs
+        """
+        columns = MIRRORED_COLLECTIONS.get(collection)
+        if columns is None:
+            return []
+        field_columns = {path: column for column, path in columns.items()}
+
+        clauses, params, python_filters = [], [], []
+        for field_path, op, value in filters:
+            column = field_columns.get(field_path)
+            if column and op in SQL_OPERATORS:
+                clauses.append(f"{column} {SQL_OPERATORS[op]} ?")
+                params.append(_column_value(value))
+            elif column and op == "in":
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(_column_value(item) for item in value)
+            else:
+                python_filters.append((field_path, op, value))
+
+        sql = f"SELECT id, data FROM {collection}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        # Like Firestore, results are ordered by any inequality fields first,
+        # then the explicit order, then document ID
+        ordered_fields = [field for field, _ in order]
+        for field_path, op, _ in filters:
+            if op in ("<", "<=", ">", ">=", "!=", "not-in") and field_path not in ordered_fields:
+                order = ((field_path, "ASCENDING"),) + tuple(order)
+                ordered_fields.append(field_path)
+
+        # Ordering and limits go to SQL only when no filter has to run in Python
+        sql_order = not python_filters and all(field in field_columns for field, _ in order)
+        order_terms = [f"{field_columns[field]} {'DESC' if direction == 'DESCENDING' else 'ASC'}"
+                       for field, direction in order] if sql_order else []
+        sql += " ORDER BY " + ", ".join(order_terms + ["id"])
+        if limit is not None and sql_order:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = [(doc_id, self.decode(json.loads(data))) for doc_id, data in rows]
+
+        if python_filters:
+            results = [
+                (doc_id, data) for doc_id, data in results
+                if all(_matches(_get_field(data, path), op, value) for path, op, value in python_filters)
+            ]
+        if not sql_order:
+            for field_path, direction in reversed(order):
+                results.sort(key=lambda item: (_get_field(item[1], field_path) is None,
+                                               _get_field(item[1], field_path)),
+                             reverse=direction == "DESCENDING")
+            if limit is not None:
+                results = results[:limit]
+        return results
+
+    def execute(self, sql, params=()):
+        """Run ad-hoc SQL against the mirror (rows come back as tuples)."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def count(self, collection):
+        """Number of documents in a mirrored collection."""
+        return self.execute(f"SELECT COUNT(*) FROM {collection}")[0][0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MirrorSnapshot:
+    """Minimal DocumentSnapshot."""
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return self._data
+
+    def get(self, field_path):
+        return _get_field(self._data or {}, field_path)
+
+
+class MirrorDocumentReference:
+    """Read-only DocumentReference into the mirror."""
+
+    def __init__(self, mirror, collection_name, doc_id):
+        self._mirror = mirror
+        self.collection_name = collection_name
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self.collection_name}/{self.id}"
+
+    def get(self):
+        return MirrorSnapshot(self, self._mirror.get(self.collection_name, self.id))
+
+
+class MirrorQuery:
+    """Read-only query over a mirrored collection."""
+
+    def __init__(self, mirror, collection_name, filters=(), order=(), limit_count=None):
+        self._mirror = mirror
+        self.collection_name = collection_name
+        self._filters = tuple(filters)
+        self._order = tuple(order)
+        self._limit = limit_count
+
+    def where(self, field_path, op_string, value):
+        return MirrorQuery(self._mirror, self.collection_name, self._filters + ((field_path, op_string, value),),
+                           self._order, self._limit)
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return MirrorQuery(self._mirror, self.collection_name, self._filters,
+                           self._order + ((field_path, direction),), self._limit)
+
+    def limit(self, count):
+        return MirrorQuery(self._mirror, self.collection_name, self._filters, self._order, count)
+
+    def stream(self):
+        for doc_id, data in self._mirror.query(self.collection_name, self._filters, self._order, self._limit):
+            yield MirrorSnapshot(MirrorDocumentReference(self._mirror, self.collection_name, doc_id), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class MirrorCollectionReference(MirrorQuery):
+    """Read-only CollectionReference into the mirror."""
+
+    def document(self, doc_id):
+        return MirrorDocumentReference(self._mirror, self.collection_name, doc_id)
+
+
+class MirrorClient:
+    """Stands in for the Firestore client on reads, served from the mirror."""
+
+    def __init__(self, mirror):
+        self.mirror = mirror
+
+    def collection(self, name):
+        return MirrorCollectionReference(self.mirror, name)
+
+
+class MirrorWriter:
+    """
+    BatchWriter counterpart that writes to the mirror only.
+
+    Bulk jobs use it to build a local store without touching Firestore.
+    Documents are merged into any existing copy; only `written` is counted.
+    """
+
+    def __init__(self, mirror, collection_name, transform_func=None, batch_size=400):
+        from utils.batch import is_dry_run
+
+        self.mirror = mirror
+        self.collection_name = collection_name
+        self.transform_func = transform_func
+        self.batch_size = batch_size
+        self.dry_run = is_dry_run()
+        self.creates = 0
+        self.updates = 0
+        self.written = 0
+        self._pending = []
+
+    def write(self, item):
+        """Queue one document, writing the batch once it is full."""
+        if self.transform_func:
+            item = self.transform_func(item)
+
+        doc_id = item.get("id")
+        if not doc_id:
+            logger.warning(f"Item missing ID, skipping: {item}")
+            return
+
+        self._pending.append((doc_id, item))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write everything pending in one transaction."""
+        if not self._pending:
+            return
+        if self.dry_run:
+            logger.info(f"DRY RUN: Would write {len(self._pending)} items to the local {self.collection_name}")
+        else:
+            self.mirror.write(self.collection_name, self._pending, merge=True)
+        self.written += len(self._pending)
+        self._pending = []
+
+    def close(self):
+        """
+        Write any remaining documents.
+
+        Returns:
+            Tuple of (creates, updates) counts
+        """
+        self.flush()
+        return self.creates, self.updates
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror(path=None):
+    """
+    The process-wide mirror.
+
+    Args:
+        path: SQLite file (defaults to LOCAL_MIRROR)
+
+    Returns:
+        Mirror, or None if no path is configured
+    """
+    global _mirror
+    path = path or os.environ.get("LOCAL_MIRROR")
+    if not path:
+        return None
+    with _mirror_lock:
+        if _mirror is None or _mirror.path != path:
+            _mirror = Mirror(path)
+            logger.info(f"Using local mirror {path}")
+        return _mirror
+
+
+def sync_from_firestore(client, mirror, collections=None):
+    """
+    Copy whole collections from Firestore into the mirror.
+
+    Returns:
+        dict: Documents copied per collection
+    """
+    counts = {}
+    for collection in collections or MIRRORED_COLLECTIONS:
+        docs = [(doc.id, doc.to_dict()) for doc in client.collection(collection).stream()]
+        mirror.clear(collection)
+        mirror.write(collection, docs)
+        counts[collection] = len(docs)
+        logger.info(f"Mirrored {len(docs)} {collection}")
+    return counts
+
+
+def main():
+    """Sync the mirror from Firestore or show what it holds."""
+    parser = argparse.ArgumentParser(description="Maintain the local SQLite mirror")
+    parser.add_argument("--path", default=None, help="SQLite file (defaults to LOCAL_MIRROR)")
+    parser.add_argument("--sync", action="store_true", help="Copy games, teams, grades and competitions from Firestore")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mirror = get_mirror(args.path)
+    if mirror is None:
+        parser.error("Set LOCAL_MIRROR or pass --path")
+
+    if args.sync:
+        from utils.db import db
+        sync_from_firestore(db, mirror)
+
+    for collection in MIRRORED_COLLECTIONS:
+        print(f"{collection}: {mirror.count(collection)}")
+
+
+if __name__ == "__main__":
+    main()
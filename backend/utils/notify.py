@@ -0,0 +1,248 @@
+"""
+Building blocks of the notification dispatcher (notification_dispatcher.py).
+
+ReminderQueue keeps every pending notification in a heap ordered by when it
+is due, so scheduling, rescheduling and popping what is due each cost
+O(log n) however many games a season has; cancelled or moved entries are
+dropped lazily when they reach the top. Messages are grouped per recipient,
+one email each per dispatch, and sent through a transport:
+
+    SmtpTransport   An SMTP server, one connection per dispatch
+    MboxTransport   Appends to a local mbox file instead of sending, to check
+                    the output locally or in tests
+
+Environment:
+    SMTP_HOST       Send through this SMTP server (unset = write to NOTIFY_MBOX)
+    SMTP_PORT       Port (default 587)
+    SMTP_USER       Login user, if the server needs one
+    SMTP_PASSWORD   Login password
+    SMTP_STARTTLS   Set to false for servers without STARTTLS (default true)
+    NOTIFY_FROM     Sender address (default noreply@mentone.com)
+    NOTIFY_MBOX     Mailbox written without SMTP_HOST (default notifications.mbox)
+"""
+import heapq
+import itertools
+import logging
+import mailbox
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_SMTP_PORT = 587
+DEFAULT_SENDER = "noreply@mentone.com"
+DEFAULT_MBOX = "notifications.mbox"
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def local_time(value):
+    """
+    Game time as stored by the pollers (naive, site-local).
+
+    Firestore hands naive datetimes back as UTC-aware ones with the same
+    wall-clock time.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def next_weekly(day_name, time_text, after):
+    """
+    First time after `after` that falls on a weekday at a time of day.
+
+    Args:
+        day_name: Weekday name, e.g. "Sunday"
+        time_text: "HH:MM"
+        after: datetime
+
+    Returns:
+        datetime
+    """
+    hour, minute = (int(part) for part in time_text.split(":"))
+    days_ahead = (WEEKDAYS.index(day_name.lower()) - after.weekday()) % 7
+    candidate = (after + timedelta(days=days_ahead)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= after:
+        candidate += timedelta(days=7)
+    return candidate
+
+
+class ReminderQueue:
+    """Time-indexed priority queue of keyed notifications."""
+
+    def __init__(self):
+        self._heap = []
+        self._live = {}  # key -> counter of its current entry
+        self._counter = itertools.count()
+
+    def schedule(self, key, due, payload):
+        """Schedule (or move) the notification for `key`. O(log n)."""
+        counter = next(self._counter)
+        self._live[key] = counter
+        heapq.heappush(self._heap, (due, counter, key, payload))
+
+    def cancel(self, key):
+        """Drop the notification for `key`; its heap entry is skipped when popped."""
+        self._live.pop(key, None)
+
+    def _drop_stale(self):
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """When the next notification is due, or None if there are none."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """
+        Remove and return every notification due by `now`.
+
+        Returns:
+            list: (key, due, payload), earliest first
+        """
+        due_items = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            due, counter, key, payload = heapq.heappop(self._heap)
+            del self._live[key]
+            due_items.append((key, due, payload))
+            self._drop_stale()
+        return due_items
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, key):
+        return key in self._live
+
+
+class SentLog:
+    """Keys of notifications already sent, so restarts never send one twice."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sent (key TEXT PRIMARY KEY, sent_at REAL NOT NULL)")
+
+    def was_sent(self, key):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sent WHERE key = ?", (key,)).fetchone() is not None
+
+    def mark_sent(self, keys):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO sent (key, sent_at) VALUES (?, ?)",
+                                   [(key, now) for key in keys])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def format_game(game):
+    """One line describing a game."""
+    when = local_time(game["date"]).strftime("%a %d %b %I:%M %p")
+    line = f"{when}  {game.get('home_team')} vs {game.get('away_team')} at {game.get('venue') or 'TBC'}"
+    score = game.get("score")
+    if score:
+        line += f"  ({score['home']}-{score['away']})"
+    return line
+
+
+def build_message(recipient, sender, sections):
+    """
+    One email holding everything due for a recipient.
+
+    Args:
+        recipient: Address
+        sender: From address
+        sections: [(heading, [lines])], empty sections are left out
+
+    Returns:
+        EmailMessage or None if there is nothing to say
+    """
+    sections = [(heading, lines) for heading, lines in sections if lines]
+    if not sections:
+        return None
+
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = "Mentone Hockey: " + ", ".join(heading for heading, _ in sections)
+    message.set_content("\n\n".join(f"{heading}\n" + "\n".join(lines) for heading, lines in sections) + "\n")
+    return message
+
+
+class SmtpTransport:
+    """Send through an SMTP server, one connection per dispatch."""
+
+    def __init__(self, host, port=DEFAULT_SMTP_PORT, user=None, password=None, starttls=True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+
+    def send_all(self, messages):
+        if not messages:
+            return 0
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+            for message in messages:
+                smtp.send_message(message)
+        return len(messages)
+
+
+class MboxTransport:
+    """Write messages to a local mbox file instead of sending them."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send_all(self, messages):
+        if not messages:
+            return 0
+        box = mailbox.mbox(self.path)
+        box.lock()
+        try:
+            for message in messages:
+                box.add(message)
+            box.flush()
+        finally:
+            box.unlock()
+            box.close()
+        return len(messages)
+
+
+def get_transport():
+    """Transport configured by the environment (SMTP_HOST, else NOTIFY_MBOX)."""
+    host = os.environ.get("SMTP_HOST")
+    if host:
+        return SmtpTransport(
+            host,
+            int(os.environ.get("SMTP_PORT", DEFAULT_SMTP_PORT)),
+            os.environ.get("SMTP_USER"),
+            os.environ.get("SMTP_PASSWORD"),
+            os.environ.get("SMTP_STARTTLS", "true").lower() not in ("false", "0", "f"),
+        )
+    return MboxTransport(os.environ.get("NOTIFY_MBOX", DEFAULT_MBOX))
+
+
+def sender_address():
+    return os.environ.get("NOTIFY_FROM", DEFAULT_SENDER)
@@ -0,0 +1,371 @@
+"""
+Ordered outbox of game change events.
+
+The pollers append the change records from utils/changes.py here after
+their writes go through, each under a monotonically increasing sequence
+number. Consumers (notifications, dashboards, caches) keep the last
+sequence number they handled and read only the events after it, instead of
+scanning the games collection to find out what changed:
+
+    outbox = get_outbox()
+    events = outbox.read_new("notifications")
+    ...handle them...
+    outbox.ack("notifications", events[-1]["seq"])
+
+Two stores share the interface:
+    FirestoreOutbox   change_events collection, one document per event keyed
+                      on its zero-padded sequence number, consumer offsets in
+                      outbox_offsets. Sequence numbers are claimed by creating
+                      the event documents in one atomic batch; if another
+                      poller claimed them first the batch fails and is retried
+                      above the new last event, so numbers never repeat or
+                      appear out of order.
+    LocalOutbox       Append-only SQLite log, for running locally and for
+                      consumers on the same machine.
+
+Change records are staged in a local pending file before the game writes
+they describe are committed (BatchWriter's stage_changes hook), and only
+removed from it once published. If a poller dies, or publishing fails,
+between committing games and publishing, the next run publishes what was
+left: the stored games would otherwise already match the pages and nothing
+would be diffed again. Delivery is at least once; a batch that failed to
+commit after staging publishes events the next poll reports again.
+
+Environment:
+    OUTBOX           "firestore" (default), "off", or the path of a local SQLite outbox
+    OUTBOX_PENDING   Pending-events file (default outbox_pending.db)
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils import metrics
+from utils.db import db, firestore
+
+logger = logging.getLogger(__name__)
+
+# Constants
+EVENTS_COLLECTION = "change_events"
+OFFSETS_COLLECTION = "outbox_offsets"
+DEFAULT_READ_LIMIT = 500
+APPEND_BATCH_SIZE = 400
+MAX_APPEND_ATTEMPTS = 5
+DEFAULT_PENDING_FILE = "outbox_pending.db"
+DATETIME_TAG = "__datetime__"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if DATETIME_TAG in value:
+            return datetime.fromisoformat(value[DATETIME_TAG])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def event_id(seq):
+    """Document ID of an event; zero-padded so IDs sort like sequence numbers."""
+    return f"{seq:012d}"
+
+
+class Outbox:
+    """Interface shared by the outbox stores."""
+
+    def last_seq(self):
+        """Sequence number of the newest event (0 if there are none)."""
+        raise NotImplementedError
+
+    def append(self, events, source):
+        """
+        Append events in order.
+
+        Args:
+            events: Change records
+            source: Name of the writer (e.g. fixture_poller)
+
+        Returns:
+            list: Sequence numbers given to the events
+        """
+        raise NotImplementedError
+
+    def read(self, after_seq=0, limit=DEFAULT_READ_LIMIT):
+        """Events with a sequence number above after_seq, oldest first."""
+        raise NotImplementedError
+
+    def get_offset(self, consumer):
+        """Last sequence number a consumer has handled (0 if none)."""
+        raise NotImplementedError
+
+    def ack(self, consumer, seq):
+        """Record that a consumer has handled every event up to seq."""
+        raise NotImplementedError
+
+    def read_new(self, consumer, limit=DEFAULT_READ_LIMIT):
+        """Events a consumer hasn't handled yet, oldest first."""
+        return self.read(self.get_offset(consumer), limit)
+
+    def close(self):
+        pass
+
+
+class FirestoreOutbox(Outbox):
+    """Outbox in a Firestore collection."""
+
+    def __init__(self, client=None, collection_name=EVENTS_COLLECTION):
+        self.client = client or db
+        self.collection_name = collection_name
+
+    def last_seq(self):
+        query = (self.client.collection(self.collection_name)
+                 .order_by("seq", direction=firestore.Query.DESCENDING).limit(1))
+        for doc in query.stream():
+            return doc.to_dict()["seq"]
+        return 0
+
+    def _append_batch(self, events, source):
+        from google.api_core.exceptions import Conflict
+
+        for attempt in range(1, MAX_APPEND_ATTEMPTS + 1):
+            first = self.last_seq() + 1
+            batch = self.client.batch()
+            for seq, event in enumerate(events, first):
+                document = dict(event, seq=seq, source=source, created_at=firestore.SERVER_TIMESTAMP)
+                batch.create(self.client.collection(self.collection_name).document(event_id(seq)), document)
+            try:
+                batch.commit()
+                return list(range(first, first + len(events)))
+            except Conflict:
+                # Another poller took these numbers between our read and commit
+                logger.info(f"Outbox sequence {first} already taken, retrying (attempt {attempt})")
+                metrics.incr("outbox_append_conflicts")
+        raise RuntimeError(f"Could not append to {self.collection_name} after {MAX_APPEND_ATTEMPTS} attempts")
+
+    def append(self, events, source):
+        seqs = []
+        for start in range(0, len(events), APPEND_BATCH_SIZE):
+            seqs.extend(self._append_batch(events[start:start + APPEND_BATCH_SIZE], source))
+        return seqs
+
+    def read(self, after_seq=0, limit=DEFAULT_READ_LIMIT):
+        query = (self.client.collection(self.collection_name)
+                 .where("seq", ">", after_seq).order_by("seq").limit(limit))
+        return [doc.to_dict() for doc in query.stream()]
+
+    def get_offset(self, consumer):
+        doc = self.client.collection(OFFSETS_COLLECTION).document(consumer).get()
+        return doc.to_dict().get("seq", 0) if doc.exists else 0
+
+    def ack(self, consumer, seq):
+        self.client.collection(OFFSETS_COLLECTION).document(consumer).set(
+            {"seq": seq, "updated_at": firestore.SERVER_TIMESTAMP})
+
+
+class LocalOutbox(Outbox):
+    """Outbox in an append-only SQLite log."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "source TEXT NOT NULL, data TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS offsets (consumer TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+
+    def last_seq(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def append(self, events, source):
+        now = time.time()
+        seqs = []
+        with self._lock, self._conn:
+            for event in events:
+                cursor = self._conn.execute("INSERT INTO events (source, data, created_at) VALUES (?, ?, ?)",
+                                            (source, json.dumps(_encode(event)), now))
+                seqs.append(cursor.lastrowid)
+        return seqs
+
+    def read(self, after_seq=0, limit=DEFAULT_READ_LIMIT):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, source, data, created_at FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after_seq, limit),
+            ).fetchall()
+        return [dict(_decode(json.loads(data)), seq=seq, source=source,
+                     created_at=datetime.fromtimestamp(created_at))
+                for seq, source, data, created_at in rows]
+
+    def get_offset(self, consumer):
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM offsets WHERE consumer = ?", (consumer,)).fetchone()
+        return row[0] if row else 0
+
+    def ack(self, consumer, seq):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO offsets (consumer, seq) VALUES (?, ?)", (consumer, seq))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PendingEvents:
+    """Staged change records waiting to be published, in an SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "source TEXT NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def add(self, events, source):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO pending (source, data) VALUES (?, ?)",
+                                   [(source, json.dumps(_encode(event))) for event in events])
+
+    def load(self):
+        """Staged events, oldest first, as (id, source, event)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, source, data FROM pending ORDER BY id").fetchall()
+        return [(row_id, source, _decode(json.loads(data))) for row_id, source, data in rows]
+
+    def remove(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM pending WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+_pending = None
+
+
+def get_outbox():
+    """The process-wide outbox from OUTBOX, or None if it is off."""
+    global _outbox
+    setting = os.environ.get("OUTBOX", "firestore")
+    if setting.lower() in ("off", "false", "0", ""):
+        return None
+    with _outbox_lock:
+        if _outbox is None or getattr(_outbox, "path", "firestore") != setting:
+            _outbox = FirestoreOutbox() if setting.lower() == "firestore" else LocalOutbox(setting)
+        return _outbox
+
+
+def get_pending():
+    """The process-wide pending-events file, or None if the outbox is off."""
+    global _pending
+    if get_outbox() is None:
+        return None
+    path = os.environ.get("OUTBOX_PENDING", DEFAULT_PENDING_FILE)
+    with _outbox_lock:
+        if _pending is None or _pending.path != path:
+            _pending = PendingEvents(path)
+        return _pending
+
+
+def stage(changes, source):
+    """
+    Keep change records until they are published (call before committing their writes).
+
+    Args:
+        changes: Change records from utils.changes
+        source: Name of the poller
+    """
+    pending = get_pending()
+    if pending is None or not changes:
+        return
+    pending.add(list(changes), source)
+
+
+def stager(source):
+    """stage_changes hook for a BatchWriter writing on behalf of `source`."""
+    return lambda changes: stage(changes, source)
+
+
+def publish_pending():
+    """
+    Append every staged change record to the outbox, in the order staged.
+
+    Includes records left by earlier runs that stopped before publishing.
+
+    Returns:
+        list: Sequence numbers given to the events
+    """
+    outbox = get_outbox()
+    pending = get_pending()
+    if outbox is None or pending is None:
+        return []
+
+    staged = pending.load()
+    seqs = []
+    start = 0
+    while start < len(staged):
+        # Consecutive records from the same source go in one append
+        source = staged[start][1]
+        end = start
+        while end < len(staged) and staged[end][1] == source:
+            end += 1
+        chunk = staged[start:end]
+        seqs.extend(publish([event for _, _, event in chunk], source))
+        pending.remove([row_id for row_id, _, _ in chunk])
+        start = end
+    return seqs
+
+
+def publish(changes, source):
+    """
+    Append change records to the outbox.
+
+    Pollers stage their records and call publish_pending instead, so that
+    records survive a crash between the writes and publishing.
+
+    Args:
+        changes: Change records from utils.changes
+        source: Name of the writer
+
+    Returns:
+        list: Sequence numbers given to the events
+    """
+    outbox = get_outbox()
+    if outbox is None or not changes:
+        return []
+
+    with metrics.stage("outbox_write"):
+        seqs = outbox.append(list(changes), source)
+    metrics.incr("outbox_events", len(seqs))
+    logger.info(f"Published {len(seqs)} change events (seq {seqs[0]}-{seqs[-1]})")
+    return seqs
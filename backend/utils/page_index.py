@@ -0,0 +1,277 @@
+"""
+Content hashes of fetched pages, to skip work for pages that haven't changed.
+
+The site sends no ETags, but between polls most round and team pages are
+byte-for-byte the same. With PAGE_INDEX set, each page body is normalised
+(scripts, comments, tokens and whitespace stripped) and hashed together
+with the teams it was parsed against. When the hash matches the one stored
+for the URL, the games parsed last time are reused instead of parsing the
+page again, and their IDs are reported as unchanged so the pollers skip
+writing them and the summaries they feed.
+
+A stored page is only reused until the first of its upcoming games starts,
+because a game's status (scheduled/in progress) depends on the time it was
+parsed. New hashes are kept in memory and saved by commit() once the run's
+writes have gone through, so a failed run never hides a page from the next.
+
+Environment:
+    PAGE_INDEX   Path of the SQLite hash index (unset = always parse and write)
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils import metrics
+from utils.ids import make_game_doc_id
+
+logger = logging.getLogger(__name__)
+
+# Constants
+# Bump when the parsers change what they extract, so stored results are redone
+INDEX_VERSION = 4
+DATETIME_TAG = "__datetime__"
+VOLATILE_PATTERNS = [
+    re.compile(rb"<script\b.*?</script>", re.IGNORECASE | re.DOTALL),
+    re.compile(rb"<style\b.*?</style>", re.IGNORECASE | re.DOTALL),
+    re.compile(rb"<!--.*?-->", re.DOTALL),
+    re.compile(rb"<(?:input|meta)\b[^>]*(?:csrf|token|nonce)[^>]*>", re.IGNORECASE),
+    re.compile(rb"\snonce=\"[^\"]*\"", re.IGNORECASE),
+]
+WHITESPACE_REGEX = re.compile(rb"\s+")
+BETWEEN_TAGS_REGEX = re.compile(rb">\s+<")
+
+
+def normalise_html(body):
+    """Strip the parts of a page that change on every request."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    for pattern in VOLATILE_PATTERNS:
+        body = pattern.sub(b"", body)
+    body = BETWEEN_TAGS_REGEX.sub(b"><", body)
+    return WHITESPACE_REGEX.sub(b" ", body).strip()
+
+
+def team_context(teams):
+    """Stable description of the teams a page is parsed against (TeamIndex or dict)."""
+    teams = getattr(teams, "teams", teams) or {}
+    return json.dumps(sorted((name, str(data.get("id")), str(data.get("fixture_id"))) for name, data in teams.items()))
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if DATETIME_TAG in value:
+            return datetime.fromisoformat(value[DATETIME_TAG])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def game_key(game):
+    """ID the pollers give a parsed game."""
+    return make_game_doc_id(game)
+
+
+class PageIndex:
+    """URL -> (content hash, parse result) store."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, digest TEXT NOT NULL, "
+                "result TEXT NOT NULL, valid_until TEXT, updated_at REAL NOT NULL)"
+            )
+        self._pending = {}
+        self.unchanged_ids = set()
+
+    def digest(self, body, context=""):
+        """Hash of a normalised page body plus the parse context."""
+        hasher = hashlib.sha256(f"{INDEX_VERSION}\n{context}\n".encode("utf-8"))
+        hasher.update(normalise_html(body))
+        return hasher.hexdigest()
+
+    def get(self, url, digest):
+        """
+        The stored parse result for an unchanged page.
+
+        Returns:
+            The result, or None if the page is new, changed or its stored games have gone stale
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT digest, result, valid_until FROM pages WHERE url = ?",
+                                     (url,)).fetchone()
+        if row is None or row[0] != digest:
+            return None
+        if row[2] is not None and datetime.now() >= datetime.fromisoformat(row[2]):
+            return None
+        return _decode(json.loads(row[1]))
+
+    def put(self, url, digest, result):
+        """Remember a parse result; saved by commit()."""
+        now = datetime.now()
+        upcoming = [game["date"] for game in result
+                    if isinstance(game, dict) and isinstance(game.get("date"), datetime) and game["date"] > now]
+        valid_until = min(upcoming).isoformat() if upcoming else None
+        with self._lock:
+            self._pending[url] = (digest, json.dumps(_encode(result)), valid_until)
+
+    def mark_unchanged(self, games):
+        """Record the IDs of games that came from unchanged pages."""
+        self.unchanged_ids.update(game_key(game) for game in games)
+
+    def commit(self):
+        """Save the hashes of the pages parsed this run."""
+        with self._lock, self._conn:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (url, digest, result, valid_until, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(url, digest, result, valid_until, now) for url, (digest, result, valid_until) in self._pending.items()],
+            )
+            saved = len(self._pending)
+            self._pending = {}
+        logger.info(f"Saved {saved} page hashes to {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_page_index():
+    """The process-wide page index, or None if PAGE_INDEX isn't set."""
+    global _index
+    path = os.environ.get("PAGE_INDEX")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != path:
+            _index = PageIndex(path)
+            logger.info(f"Using page hash index {path}")
+        return _index
+
+
+def lookup(url, body, context=""):
+    """
+    Check a fetched page against the index.
+
+    Returns:
+        Tuple of (digest, stored result or None); (None, None) without an index
+    """
+    index = get_page_index()
+    if index is None:
+        return None, None
+    digest = index.digest(body, context)
+    result = index.get(url, digest)
+    if result is not None:
+        metrics.incr("pages_unchanged")
+    return digest, result
+
+
+def remember(url, digest, result, games=True):
+    """Store what a changed page parsed to (no-op without an index or a result)."""
+    index = get_page_index()
+    if index is None or digest is None or result is None:
+        return
+    metrics.incr("pages_changed")
+    index.put(url, digest, result if games else [result])
+
+
+def parse_page(url, body, parse_func, context="", games=True):
+    """
+    Parse a page, reusing the stored result if its content hasn't changed.
+
+    Args:
+        url: Page URL the hash is stored under
+        body: Page content
+        parse_func: Called with the body when the page has to be parsed
+        context: Anything else the result depends on (see team_context)
+        games: Whether the result is a list of games to report as unchanged
+
+    Returns:
+        Whatever parse_func returns
+    """
+    digest, result = lookup(url, body, context)
+    if result is not None:
+        if games:
+            mark_unchanged(result)
+            return result
+        return result[0]
+
+    result = parse_func(body)
+    remember(url, digest, result, games)
+    return result
+
+
+def mark_unchanged(games):
+    """Report games reused from an unchanged page."""
+    index = get_page_index()
+    if index is not None:
+        index.mark_unchanged(games)
+
+
+def is_unchanged(game):
+    """Whether a game came from an unchanged page this run."""
+    index = get_page_index()
+    return index is not None and game.get("id") in index.unchanged_ids
+
+
+def split_unchanged(games):
+    """
+    Separate the games that need writing from those on unchanged pages.
+
+    Returns:
+        Tuple of (games to write, IDs of unchanged games)
+    """
+    index = get_page_index()
+    if index is None or not index.unchanged_ids:
+        return games, []
+    changed = [game for game in games if game.get("id") not in index.unchanged_ids]
+    unchanged = [game["id"] for game in games if game.get("id") in index.unchanged_ids]
+    return changed, unchanged
+
+
+def changed_summaries(summaries, games):
+    """The team summaries covering at least one game that needs writing."""
+    index = get_page_index()
+    if index is None or not index.unchanged_ids:
+        return summaries
+    keys = set()
+    for game in games:
+        if game.get("id") in index.unchanged_ids:
+            continue
+        for side in ("home_team", "away_team"):
+            keys.add((game[side].get("id"), game.get("round")))
+    return [summary for summary in summaries if (summary["team_id"], summary["round"]) in keys]
+
+
+def commit():
+    """Save this run's page hashes (call once its writes have succeeded)."""
+    index = get_page_index()
+    if index is not None:
+        index.commit()
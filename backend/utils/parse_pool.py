@@ -0,0 +1,208 @@
+"""
+Process-pool parse stage.
+
+BeautifulSoup parsing is CPU-bound and holds the GIL, so once fetching is
+concurrent it becomes the bottleneck. ParsePool ships each round page to a
+worker process as raw bytes and gets back compact game records (the plain
+dicts parse_game_element builds), never soup objects, so parse throughput
+scales with the number of cores. Useful for full-season backfills across
+every grade.
+
+With no workers configured pages are parsed in this process by the same
+code, so callers don't need a separate path.
+
+Environment:
+    PARSE_WORKERS   Worker processes: 0 parses inline (default), "auto" uses
+                    one per core
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from utils import page_index, profiling
+from utils.enhance import finish_games
+from utils.ids import make_team_id
+from utils.parsers import TeamIndex, detect_date_format, extract_game_elements, extract_team_links, parse_game_element
+from utils.team_pages import parse_team_page
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_PARSE_WORKERS = 0
+# Pages handed to a worker at a time; amortises pickling overhead
+CHUNK_SIZE = 4
+
+
+def parse_workers():
+    """Number of parse processes configured with PARSE_WORKERS."""
+    value = os.environ.get("PARSE_WORKERS", str(DEFAULT_PARSE_WORKERS)).strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+
+def parse_round_html(job):
+    """
+    Parse one round page into game records.
+
+    Args:
+        job: Tuple of (html bytes or None, comp_id, fixture_id, round_num, teams)
+             where teams is the {name: team_data} dict to match against
+
+    Returns:
+        list: Game dicts with their IDs and metadata (empty if the page is missing)
+    """
+    html, comp_id, fixture_id, round_num, teams = job
+    if not html:
+        return []
+
+    soup = BeautifulSoup(html, "html.parser")
+    team_index = TeamIndex(teams)
+    game_elements = extract_game_elements(soup)
+    date_format = detect_date_format(game_elements)
+    games = []
+    for game_el in game_elements:
+        game = parse_game_element(game_el, fixture_id, comp_id, team_index, round_num, date_format)
+        if game:
+            games.append(game)
+
+    # Drop the tree before returning so workers don't hold on to it
+    soup.decompose()
+    return finish_games(games)
+
+
+def parse_team_html(job):
+    """
+    Parse a team fixture page.
+
+    Args:
+        job: Tuple of (html bytes or None, comp_id, fixture_id, teams)
+
+    Returns:
+        list or None: Game dicts, or None if the page can't replace the round pages
+    """
+    html, comp_id, fixture_id, teams = job
+    if not html:
+        return None
+    return parse_team_page(html, comp_id, fixture_id, TeamIndex(teams))
+
+
+def parse_history_round(job):
+    """
+    Parse a round page of a past season, for the backfill.
+
+    Past seasons' teams aren't in Firestore, so Mentone games are matched
+    to the team IDs linked from the page itself.
+
+    Args:
+        job: Tuple of (html bytes or None, comp_id, fixture_id, round_num)
+
+    Returns:
+        Tuple of (game dicts, number of game elements on the page)
+    """
+    html, comp_id, fixture_id, round_num = job
+    if not html:
+        return [], 0
+
+    soup = BeautifulSoup(html, "html.parser")
+    teams = {name: {"id": make_team_id(team_id), "fixture_id": fixture_id}
+             for name, team_id in extract_team_links(soup, comp_id).items() if "Mentone" in name}
+    team_index = TeamIndex(teams)
+
+    game_elements = extract_game_elements(soup)
+    date_format = detect_date_format(game_elements)
+    games = []
+    for game_el in game_elements:
+        game = parse_game_element(game_el, fixture_id, comp_id, team_index, round_num, date_format)
+        if game:
+            games.append(game)
+
+    soup.decompose()
+    return games, len(game_elements)
+
+
+def _init_worker():
+    # A forked worker inherits the parent's profiling session but can never
+    # write it out, so profile only in the parent
+    profiling._session = None
+
+
+class ParsePool:
+    """Parses round pages in worker processes (or inline with no workers)."""
+
+    def __init__(self, workers=None):
+        self.workers = parse_workers() if workers is None else workers
+        self._executor = None
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            logger.info(f"Parsing with {self.workers} worker processes")
+
+    def parse_rounds(self, jobs):
+        """
+        Parse several round pages.
+
+        Args:
+            jobs: Iterable of parse_round_html job tuples
+
+        Returns:
+            list: One list of game dicts per job, in the same order
+        """
+        return self.map(parse_round_html, jobs)
+
+    def parse_pages(self, func, pages):
+        """
+        Parse fetched pages of games, reusing stored results for unchanged ones.
+
+        Args:
+            func: Module-level parse function taking a job
+            pages: (url, job, context) per page, where job[0] is the page body
+                   (None if the fetch failed) and context is as for page_index.lookup
+
+        Returns:
+            list: One result per page, in the same order
+        """
+        results = [None] * len(pages)
+        digests = {}
+        to_parse = []
+        for position, (url, job, context) in enumerate(pages):
+            if job[0]:
+                digest, stored = page_index.lookup(url, job[0], context)
+                if stored is not None:
+                    page_index.mark_unchanged(stored)
+                    results[position] = stored
+                    continue
+                digests[position] = digest
+            to_parse.append(position)
+
+        parsed = self.map(func, [pages[position][1] for position in to_parse])
+        for position, result in zip(to_parse, parsed):
+            results[position] = result
+            if position in digests:
+                page_index.remember(pages[position][0], digests[position], result)
+        return results
+
+    def map(self, func, jobs):
+        """
+        Run a module-level parse function over jobs in the pool.
+
+        Returns:
+            list: func(job) for each job, in the same order
+        """
+        jobs = list(jobs)
+        if self._executor is None or len(jobs) <= 1:
+            return [func(job) for job in jobs]
+        return list(self._executor.map(func, jobs, chunksize=CHUNK_SIZE))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
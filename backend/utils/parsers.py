@@ -1,63 +1,154 @@
 import re
 from datetime import datetime
 import logging
+from functools import lru_cache
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
-import requests
+
+from utils import metrics, page_index, profiling
+from utils.fetch import make_request  # Re-exported for existing callers
+from utils.venues import UNKNOWN_VENUE, normalise_venue_name
 
 logger = logging.getLogger(__name__)
 
 # Constants
-REQUEST_TIMEOUT = 10  # seconds
-MAX_RETRIES = 3
-RETRY_DELAY = 2  # seconds
+# Competitions index page listing every grade of the season
+COMPETITIONS_URL = "https://www.revolutionise.com.au/vichockey/games/"
+SITE_URL = "https://www.hockeyvictoria.org.au"
+# Classes of one grade's block on the competitions index
+COMPETITION_BLOCK_CLASSES = {"px-4", "py-2", "border-top"}
+
+# Regex patterns
+COMP_FIXTURE_REGEX = re.compile(r"/games/(\d+)/(\d+)")
+TEAM_ID_REGEX = re.compile(r"/games/team/(\d+)/(\d+)")
+GAME_ID_REGEX = re.compile(r'/game/(\d+)$')
+
+# Date formats used on the site, parsed with regex + integer construction
+# instead of strptime. Each entry mirrors one strptime format:
+#   long    "%A, %d %B %Y %I:%M %p"  Monday, 14 April 2025 7:30 PM
+#   short   "%a %d %b %Y %I:%M %p"   Sat 05 Apr 2025 7:30 PM
+#   short24 "%a %d %b %Y %H:%M"      Sat 05 Apr 2025 19:30
+DATE_FORMATS = {
+    "long": re.compile(r"([a-z]+),\s+(\d{1,2})\s+([a-z]+)\s+(\d{4})\s+(\d{1,2}):(\d{1,2})\s+([ap]m)", re.I),
+    "short": re.compile(r"([a-z]+)\s+(\d{1,2})\s+([a-z]+)\s+(\d{4})\s+(\d{1,2}):(\d{1,2})\s+([ap]m)", re.I),
+    "short24": re.compile(r"([a-z]+)\s+(\d{1,2})\s+([a-z]+)\s+(\d{4})\s+(\d{1,2}):(\d{1,2})()", re.I),
+}
+# strptime formats, only used when the fast path can't handle a string
+DATE_STRPTIME_FORMATS = {
+    "long": "%A, %d %B %Y %I:%M %p",
+    "short": "%a %d %b %Y %I:%M %p",
+    "short24": "%a %d %b %Y %H:%M",
+}
+DATE_CACHE_SIZE = 4096
+
+WEEKDAY_NAMES = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"}
+WEEKDAY_ABBRS = {"mon", "tue", "wed", "thu", "fri", "sat", "sun"}
+MONTH_NAMES = {name: index for index, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], 1)}
+MONTH_ABBRS = {name[:3]: index for name, index in MONTH_NAMES.items()}
+
+# Formats tried for dates without the " - " separator, unless the page's
+# format is known (see detect_date_format)
+SHORT_DATE_FORMATS = ("short", "short24")
+
+def _build_date(format_name, match):
+    """Turn a DATE_FORMATS match into a datetime, or None if a field is out of range."""
+    weekday, day, month, year, hour, minute, meridiem = match.groups()
+    weekday = weekday.lower()
+    month = month.lower()
+
+    if format_name == "long":
+        if weekday not in WEEKDAY_NAMES or month not in MONTH_NAMES:
+            return None
+        month_num = MONTH_NAMES[month]
+    else:
+        if weekday not in WEEKDAY_ABBRS or month not in MONTH_ABBRS:
+            return None
+        month_num = MONTH_ABBRS[month]
 
-def make_request(url, retry_count=0):
-    """
-    Make an HTTP request with retries and error handling.
-    """
-    try:
-        logger.debug(f"Requesting: {url}")
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        if retry_count < MAX_RETRIES:
-            logger.warning(f"Request to {url} failed: {e}. Retrying ({retry_count+1}/{MAX_RETRIES})...")
-            import time
-            time.sleep(RETRY_DELAY)
-            return make_request(url, retry_count + 1)
-        else:
-            logger.error(f"Request to {url} failed after {MAX_RETRIES} attempts: {e}")
+    hour = int(hour)
+    minute = int(minute)
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
             return None
+        hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    elif hour > 23:
+        return None
 
-def parse_date_string(date_text):
-    """Parse various date formats from Hockey Victoria site."""
     try:
-        # Try format: "Monday, 14 April 2025 - 7:30 PM"
-        if " - " in date_text:
-            date_parts = date_text.split(" - ")
-            date_str = date_parts[0]  # "Monday, 14 April 2025"
-            time_str = date_parts[1] if len(date_parts) > 1 else "12:00 PM"  # "7:30 PM"
-            return datetime.strptime(f"{date_str} {time_str}", "%A, %d %B %Y %I:%M %p")
-
-        # Try alternative formats
-        formats = [
-            "%a %d %b %Y %I:%M %p",  # Sat 05 Apr 2025 7:30 PM
-            "%a %d %b %Y %H:%M",     # Sat 05 Apr 2025 19:30
-        ]
+        # The weekday name is ignored, as strptime does
+        return datetime(int(year), month_num, int(day), hour, minute)
+    except ValueError:
+        return None
 
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_text, fmt)
-            except ValueError:
-                continue
+def _date_candidates(date_text, date_format=None):
+    """The text to match and the formats to try, the page's own format first."""
+    # "Monday, 14 April 2025 - 7:30 PM" is the long format with a separator
+    if " - " in date_text:
+        date_parts = date_text.split(" - ")
+        return f"{date_parts[0]} {date_parts[1]}", ("long",)
+    if date_format in SHORT_DATE_FORMATS:
+        return date_text, (date_format,) + tuple(name for name in SHORT_DATE_FORMATS if name != date_format)
+    return date_text, SHORT_DATE_FORMATS
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_known_date(date_text, date_format=None):
+    """
+    Parse a date string in one of the site's formats.
 
-        logger.warning(f"Could not parse date: {date_text}")
-        return datetime.now()  # Fallback
+    Memoised: a round only has a handful of distinct date strings.
 
-    except Exception as e:
-        logger.error(f"Error parsing date '{date_text}': {e}")
-        return datetime.now()  # Fallback
+    Args:
+        date_text: Date string from a fixture page
+        date_format: Format the page uses (from detect_date_format), tried first
+
+    Returns:
+        datetime, or None if no format matches
+    """
+    text, candidates = _date_candidates(date_text, date_format)
+
+    for format_name in candidates:
+        match = DATE_FORMATS[format_name].fullmatch(text)
+        if match:
+            parsed = _build_date(format_name, match)
+            if parsed is not None:
+                return parsed
+
+    # Slow path for anything the regexes reject but strptime might accept
+    for format_name in candidates:
+        try:
+            parsed = datetime.strptime(text, DATE_STRPTIME_FORMATS[format_name])
+        except ValueError:
+            continue
+        metrics.incr("date_parse_slow_path")
+        return parsed
+
+    return None
+
+def parse_date_string(date_text, date_format=None):
+    """
+    Parse various date formats from Hockey Victoria site.
+
+    Unparseable dates fall back to the current time and are counted in the
+    run metrics as date_parse_fallbacks.
+
+    Args:
+        date_text: Date string from a fixture page
+        date_format: Format the page uses (from detect_date_format), tried first
+    """
+    parsed = _parse_known_date(date_text, date_format)
+    if parsed is not None:
+        return parsed
+
+    metrics.incr("date_parse_fallbacks")
+    if " - " in date_text:
+        logger.error(f"Error parsing date '{date_text}': does not match '{DATE_STRPTIME_FORMATS['long']}'")
+    else:
+        logger.warning(f"Could not parse date: {date_text}")
+    return datetime.now()  # Fallback
 
 def extract_club_info(team_name):
     """Extract club name and ID from team name."""
@@ -73,82 +164,275 @@ def extract_club_info(team_name):
 
     return club_name, club_id
 
-def find_best_team_match(team_name, fixture_id, mentone_teams):
-    """Find the best matching Mentone team ID."""
-    if "Mentone" not in team_name:
-        return None
+class TeamIndex:
+    """
+    Lookup tables over the tracked teams for find_best_team_match.
 
-    # Try exact match first
-    for name, data in mentone_teams.items():
-        if name == team_name:
-            return data["id"]
+    Build it once from the {name: team_data} dict the pollers load
+    and pass it wherever that dict went. Exact names and fixture IDs are dict
+    lookups. Partial matches look up the name and its substrings in an index
+    of every substring of the tracked names, so they cost the same however
+    many teams there are, and are memoised per team name.
+    """
 
-    # Try fixture ID match
-    for name, data in mentone_teams.items():
-        if str(data["fixture_id"]) == str(fixture_id):
-            return data["id"]
+    def __init__(self, teams):
+        self.teams = teams
+        self._names = list(teams)
+        self.by_name = {name: data["id"] for name, data in teams.items()}
+
+        # fixture_id -> team IDs, in the dict's order
+        self.by_fixture = {}
+        for data in teams.values():
+            self.by_fixture.setdefault(str(data["fixture_id"]), []).append(data["id"])
+
+        # name -> its position, and substring -> position of the first name containing it
+        self._positions = {name: position for position, name in enumerate(self._names)}
+        self._containing = {}
+        for position, name in enumerate(self._names):
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    self._containing.setdefault(name[start:end], position)
+        self._longest = max((len(name) for name in self._names), default=0)
+
+        self._partial_cache = {}
+
+    def match(self, team_name, fixture_id):
+        """Exact name, then fixture ID, then partial name match; None if nothing matches."""
+        if team_name in self.by_name:
+            return self.by_name[team_name]
+
+        fixture_ids = self.by_fixture.get(str(fixture_id))
+        if fixture_ids:
+            return fixture_ids[0]
+
+        if team_name not in self._partial_cache:
+            self._partial_cache[team_name] = self._partial_match(team_name)
+        return self._partial_cache[team_name]
+
+    def _partial_match(self, team_name):
+        """
+        First team, in the dict's order, whose name contains, or is
+        contained in, team_name.
+        """
+        # Teams whose name contains team_name
+        positions = [self._containing[team_name]] if team_name in self._containing else []
+
+        # Teams whose name is contained in team_name
+        for start in range(len(team_name)):
+            for end in range(start + 1, min(len(team_name), start + self._longest) + 1):
+                position = self._positions.get(team_name[start:end])
+                if position is not None:
+                    positions.append(position)
+
+        return self.teams[self._names[min(positions)]]["id"] if positions else None
 
-    # Try partial match
-    for name, data in mentone_teams.items():
-        if name in team_name or team_name in name:
-            return data["id"]
+def find_best_team_match(team_name, fixture_id, mentone_teams):
+    """
+    Find the best matching Mentone team ID.
 
-    return None
+    Args:
+        team_name: Team name as shown on the page
+        fixture_id: Grade the game belongs to
+        mentone_teams: TeamIndex, or the {name: team_data} dict to index
+
+    Returns:
+        Team ID, or None if there is no match
+    """
+    if "Mentone" not in team_name:
+        return None
 
+    if not isinstance(mentone_teams, TeamIndex):
+        mentone_teams = TeamIndex(mentone_teams)
+    return mentone_teams.match(team_name, fixture_id)
+
+# Every keyword the team/competition classifiers look at, in one pattern.
+# Matching inside a lookahead finds overlapping keywords, so the result is the
+# same as a separate substring test per keyword ("men" inside "women", "u13"
+# and "35+" inside "u135+"). The leading class skips positions where no
+# keyword can start.
+CLASSIFY_KEYWORD_REGEX = re.compile(
+    r"(?=[pvsjmoiwbgu346])(?=(premier league|vic league|pennant|senior|junior|midweek|masters|outdoor"
+    r"|indoor|women|men|boys|girls|mixed|u1[0-8]|35\+|45\+|60\+))"
+)
+CLASSIFY_CACHE_SIZE = 4096
+
+# Gender/type keywords in priority order
+TEAM_TYPE_KEYWORDS = [
+    ("senior", "Senior"),
+    ("junior", "Junior"),
+    ("midweek", "Midweek"),
+    ("masters", "Masters"),
+    ("outdoor", "Outdoor"),
+    ("indoor", "Indoor"),
+]
+GENDER_KEYWORDS = [
+    ("women", "Women"),
+    ("men", "Men"),
+    ("boys", "Boys"),
+    ("girls", "Girls"),
+    ("mixed", "Mixed"),
+]
+SENIOR_KEYWORDS = {"premier league", "vic league", "pennant"}
+JUNIOR_TEAM_KEYWORDS = {"u12", "u14", "u16", "u18"}
+JUNIOR_COMP_KEYWORDS = {"junior", "u10", "u11", "u12", "u13", "u14", "u15", "u16", "u17", "u18"}
+MASTERS_KEYWORDS = {"masters", "35+", "45+", "60+"}
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def _classify_keywords(name):
+    """Set of classifier keywords found anywhere in a name (shared by both classifiers)."""
+    return frozenset(CLASSIFY_KEYWORD_REGEX.findall(name.lower()))
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
 def classify_team(comp_name):
     """
     Classify a team by type and gender based on competition name.
+
+    Returns:
+        tuple: (team_type, gender)
     """
-    comp_name_lower = comp_name.lower()
-
-    # Gender/type classification based on naming
-    GENDER_MAP = {
-        "men": "Men",
-        "women": "Women",
-        "boys": "Boys",
-        "girls": "Girls",
-        "mixed": "Mixed"
-    }
-
-    TYPE_KEYWORDS = {
-        "senior": "Senior",
-        "junior": "Junior",
-        "midweek": "Midweek",
-        "masters": "Masters",
-        "outdoor": "Outdoor",
-        "indoor": "Indoor"
-    }
+    keywords = _classify_keywords(comp_name)
 
     # Determine team type
-    team_type = "Unknown"
-    for keyword, value in TYPE_KEYWORDS.items():
-        if keyword in comp_name_lower:
-            team_type = value
-            break
+    team_type = next((value for keyword, value in TEAM_TYPE_KEYWORDS if keyword in keywords), "Unknown")
 
     # Special case handling
-    if "premier league" in comp_name_lower or "vic league" in comp_name_lower or "pennant" in comp_name_lower:
+    if keywords & SENIOR_KEYWORDS:
         team_type = "Senior"
-    elif "u12" in comp_name_lower or "u14" in comp_name_lower or "u16" in comp_name_lower or "u18" in comp_name_lower:
+    elif keywords & JUNIOR_TEAM_KEYWORDS:
         team_type = "Junior"
-    elif "masters" in comp_name_lower or "35+" in comp_name_lower or "45+" in comp_name_lower or "60+" in comp_name_lower:
+    elif keywords & MASTERS_KEYWORDS:
         team_type = "Midweek"
 
     # Determine gender from competition name
-    if "women's" in comp_name_lower or "women" in comp_name_lower:
-        gender = "Women"
-    elif "men's" in comp_name_lower or "men" in comp_name_lower:
-        gender = "Men"
-    else:
-        # Fall back to keyword checking
-        gender = "Unknown"
-        for keyword, value in GENDER_MAP.items():
-            if keyword in comp_name_lower:
-                gender = value
-                break
+    gender = next((value for keyword, value in GENDER_KEYWORDS if keyword in keywords), "Unknown")
 
     return team_type, gender
 
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def classify_competition(comp_name):
+    """
+    Classify a competition as Senior, Junior or Midweek/Masters.
+
+    Junior covers "junior" and the U10-U18 age groups; masters covers
+    "masters" and the 35+/45+/60+ divisions.
+    """
+    keywords = _classify_keywords(comp_name)
+    if keywords & JUNIOR_COMP_KEYWORDS:
+        return "Junior"
+    if keywords & MASTERS_KEYWORDS:
+        return "Midweek/Masters"
+    return "Senior"
+
+def is_valid_team(name):
+    """Filter out false positives like venue names."""
+    invalid_keywords = ["playing fields", "grammar"]
+    return all(kw not in name.lower() for kw in invalid_keywords) and "hockey club" in name.lower()
+
+def create_team_name(comp_name, club="Mentone"):
+    """Create a descriptive team name from competition name."""
+    name = comp_name.split(' - ')[0] if ' - ' in comp_name else comp_name
+    return f"{club} - {name}"
+
+def get_competition_blocks(base_url=COMPETITIONS_URL):
+    """
+    Scrape the competitions index page to get all competition blocks.
+
+    Args:
+        base_url (str): Competitions index page
+
+    Returns:
+        list: Competition dicts with name, comp_heading, comp_id, fixture_id and url
+    """
+    logger.info("Discovering competitions from main page...")
+    res = make_request(base_url)
+    if not res:
+        logger.error(f"Failed to get main page: {base_url}")
+        return []
+
+    return page_index.parse_page(base_url, res.content, parse_competition_blocks, games=False)
+
+def _is_index_element(tag):
+    """Competition heading or competition block on the index page."""
+    if tag.name == "h2":
+        return True
+    return tag.name == "div" and COMPETITION_BLOCK_CLASSES.issubset(tag.get("class") or ())
+
+def iter_competition_blocks(soup):
+    """
+    Yield the competition blocks of a parsed competitions index in page order.
+
+    Headings and blocks are visited in a single walk of the document, each
+    block taking the most recent h2 above it as its competition heading,
+    instead of searching backwards from every block.
+
+    Args:
+        soup: Parsed competitions index page
+
+    Yields:
+        dict: Competition with name, comp_heading, comp_id, fixture_id and url
+    """
+    current_heading = ""
+    for el in soup.find_all(_is_index_element):
+        if el.name == "h2":
+            current_heading = el.text.strip()
+            continue
+
+        a = el.find("a")
+        if a and a.get("href"):
+            match = COMP_FIXTURE_REGEX.search(a["href"])
+            if match:
+                comp_id, fixture_id = match.groups()
+                comp_name = a.text.strip()
+                logger.debug(f"Added competition: {comp_name} ({comp_id}/{fixture_id})")
+                yield {
+                    "name": comp_name,
+                    "comp_heading": current_heading,
+                    "comp_id": comp_id,
+                    "fixture_id": fixture_id,
+                    "url": urljoin(SITE_URL, a["href"])
+                }
+
+def parse_competition_blocks(html):
+    """
+    Parse a fetched competitions index page.
+
+    Args:
+        html: Page content
+
+    Returns:
+        list: Competition dicts with name, comp_heading, comp_id, fixture_id and url
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    competitions = list(iter_competition_blocks(soup))
+    soup.decompose()
+
+    logger.info(f"Found {len(competitions)} competitions")
+    return competitions
+
+def extract_team_links(soup, comp_id):
+    """
+    Map the club team names linked from a page to their team IDs.
+
+    Args:
+        soup: Parsed round or ladder page
+        comp_id: Only links into this competition are used
+
+    Returns:
+        dict: {team name: team_id}
+    """
+    team_info = {}
+    for a in soup.find_all("a"):
+        href = a.get("href", "")
+        text = a.text.strip()
+
+        # Check if this is a team link
+        team_match = TEAM_ID_REGEX.search(href)
+        if team_match and is_valid_team(text):
+            link_comp_id, team_id = team_match.groups()
+            if link_comp_id == comp_id:
+                team_info[text] = team_id
+    return team_info
+
 def extract_game_elements(soup):
     """Extract game elements from HTML, trying different selectors."""
     game_elements = []
@@ -168,10 +452,49 @@ def extract_game_elements(soup):
 
     return game_elements
 
-def parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num):
-    """Parse a game element and extract details."""
-    from utils.ids import make_game_id
+def game_date_text(game_el):
+    """Date and time text of a game element, or None if it has none."""
+    date_el = game_el.select_one(".fixture-details-date-long")
+    if date_el:
+        return date_el.text.strip()
+
+    # Try alternative date element
+    datetime_el = game_el.select_one("div.col-md")
+    if datetime_el:
+        lines = datetime_el.get_text("\n", strip=True).split("\n")
+        date_str = lines[0]
+        time_str = lines[1] if len(lines) > 1 else "12:00"
+        return f"{date_str} {time_str}"
+    return None
+
+def detect_date_format(game_elements):
+    """
+    Date format a page's games use, from the first date that matches one.
+
+    A page uses one layout throughout, so its format is worked out once and
+    passed to parse_game_element rather than rediscovered for every game.
+
+    Returns:
+        str: DATE_FORMATS key, or None if no date matches
+    """
+    for game_el in game_elements:
+        date_text = game_date_text(game_el)
+        if not date_text:
+            continue
+        text, candidates = _date_candidates(date_text)
+        for format_name in candidates:
+            if DATE_FORMATS[format_name].fullmatch(text):
+                return format_name
+    return None
 
+@profiling.hot
+def parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num, date_format=None):
+    """
+    Parse a game element and extract details.
+
+    date_format is the page's date format from detect_date_format, so each
+    date is matched against the right format first.
+    """
     try:
         # Extract teams from fixture
         team_els = []
@@ -210,25 +533,14 @@ def parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num):
         game = {}
 
         # Extract date and time
-        date_el = game_el.select_one(".fixture-details-date-long")
-        if date_el:
-            game["date"] = parse_date_string(date_el.text.strip())
-        else:
-            # Try alternative date element
-            datetime_el = game_el.select_one("div.col-md")
-            if datetime_el:
-                lines = datetime_el.get_text("\n", strip=True).split("\n")
-                date_str = lines[0]
-                time_str = lines[1] if len(lines) > 1 else "12:00"
-                game["date"] = parse_date_string(f"{date_str} {time_str}")
-            else:
-                game["date"] = datetime.now()
+        date_text = game_date_text(game_el)
+        game["date"] = parse_date_string(date_text, date_format) if date_text else datetime.now()
 
         # Extract venue
         venue_el = game_el.select_one(".fixture-details-venue")
         if not venue_el:
             venue_el = game_el.select_one("div.col-md a")
-        game["venue"] = venue_el.text.strip() if venue_el else "Unknown Venue"
+        game["venue"] = normalise_venue_name(venue_el.text) if venue_el else UNKNOWN_VENUE
 
         # Extract club info and team IDs
         home_club_name, home_club_id = extract_club_info(home_team_name)
@@ -281,7 +593,21 @@ def parse_game_element(game_el, fixture_id, comp_id, mentone_teams, round_num):
         else:
             game["status"] = "scheduled"
 
+        # The site's own game ID, from the details link
+        details_el = game_el.select_one("a.btn-outline-primary[href], a[href*='/game/']")
+        if details_el:
+            game["url"] = urljoin(SITE_URL, details_el["href"])
+            game_id_match = GAME_ID_REGEX.search(game["url"].split("?")[0].rstrip("/"))
+            if game_id_match:
+                game["source_id"] = game_id_match.group(1)
+
         # Add metadata for dashboard filtering
         game["round"] = round_num
         game["comp_id"] = comp_id
-        game["fixture_id"] = fixture_i
\ No newline at end of file
+        game["fixture_id"] = fixture_id
+
+        return game
+
+    except Exception as e:
+        logger.error(f"Error parsing game element: {e}")
+        return None
@@ -0,0 +1,245 @@
+"""
+Opt-in profiling hooks for the hot scraping path.
+
+Functions decorated with @profiling.hot (process_round_page,
+parse_game_element, make_request) run untouched unless profiling is enabled
+with the PROFILE_DIR environment variable or the --profile DIR flag. When it
+is, each run writes a directory containing:
+
+    profile.prof        cProfile stats (snakeviz / pstats)
+    profile.txt         Top functions by cumulative time
+    stacks.folded       Sampled stacks in folded format (flamegraph.pl, speedscope)
+    allocations.txt     Top allocation sites from tracemalloc
+    hot_functions.json  Call counts and wall time per hot function
+
+Environment:
+    PROFILE_DIR          Enables profiling and sets the output directory
+    PROFILE_MODES        Comma separated subset of cprofile,sampling,tracemalloc
+    PROFILE_INTERVAL_MS  Sampling interval (default 5)
+"""
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Constants
+ALL_MODES = ("cprofile", "sampling", "tracemalloc")
+DEFAULT_INTERVAL_MS = 5
+TOP_FUNCTIONS = 60
+TOP_ALLOCATIONS = 30
+MAX_STACK_DEPTH = 64
+
+
+class ProfileSession:
+    """Collects profiles for one run."""
+
+    def __init__(self, run_name, output_dir, modes=ALL_MODES, interval_ms=DEFAULT_INTERVAL_MS):
+        self.run_name = run_name
+        self.output_dir = output_dir
+        self.modes = set(modes)
+        self.interval = interval_ms / 1000
+        self.started_at = datetime.now()
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._active_threads = set()
+        self._stacks = {}
+        self._function_stats = {}
+        self._stop_event = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        if "tracemalloc" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        if "sampling" in self.modes:
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+        logger.info(f"Profiling enabled ({', '.join(sorted(self.modes))}), writing to {self.output_dir}")
+
+    def _profile_for_thread(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = cProfile.Profile()
+            self._local.profile = profile
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def call(self, func, args, kwargs):
+        """Run a hot function under the active profilers."""
+        depth = getattr(self._local, "depth", 0)
+        outermost = depth == 0
+        self._local.depth = depth + 1
+
+        if outermost:
+            with self._lock:
+                self._active_threads.add(threading.get_ident())
+            if "cprofile" in self.modes:
+                self._profile_for_thread().enable()
+
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            if outermost:
+                if "cprofile" in self.modes:
+                    self._local.profile.disable()
+                with self._lock:
+                    self._active_threads.discard(threading.get_ident())
+
+            with self._lock:
+                stats = self._function_stats.setdefault(func.__qualname__, {"calls": 0, "seconds": 0.0})
+                stats["calls"] += 1
+                stats["seconds"] += elapsed
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            with self._lock:
+                active = list(self._active_threads)
+            if not active:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    key = ";".join(reversed(stack))
+                    with self._lock:
+                        self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    def dump(self):
+        """Stop profiling and write all outputs; returns the output directory."""
+        self._stop_event.set()
+        if self._sampler:
+            self._sampler.join(timeout=1)
+
+        run_dir = os.path.join(self.output_dir, f"{self.run_name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}")
+        os.makedirs(run_dir, exist_ok=True)
+
+        if "cprofile" in self.modes and self._profiles:
+            stats = None
+            for profile in self._profiles:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            if stats is not None and stats.total_calls:
+                stats.dump_stats(os.path.join(run_dir, "profile.prof"))
+                text = io.StringIO()
+                stats.stream = text
+                stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+                with open(os.path.join(run_dir, "profile.txt"), "w") as f:
+                    f.write(text.getvalue())
+
+        if "sampling" in self.modes:
+            with open(os.path.join(run_dir, "stacks.folded"), "w") as f:
+                for stack, count in sorted(self._stacks.items(), key=lambda item: -item[1]):
+                    f.write(f"{stack} {count}\n")
+
+        if "tracemalloc" in self.modes and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(os.path.join(run_dir, "allocations.txt"), "w") as f:
+                f.write(f"Current traced memory: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB\n\n")
+                for index, stat in enumerate(snapshot.statistics("lineno")[:TOP_ALLOCATIONS], 1):
+                    frame = stat.traceback[0]
+                    f.write(f"#{index}: {frame.filename}:{frame.lineno} "
+                            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+
+        with open(os.path.join(run_dir, "hot_functions.json"), "w") as f:
+            json.dump({
+                name: {"calls": s["calls"], "seconds": round(s["seconds"], 4)}
+                for name, s in sorted(self._function_stats.items())
+            }, f, indent=2)
+
+        logger.info(f"Wrote profiles to {run_dir}")
+        return run_dir
+
+
+# Active session, None when profiling is disabled
+_session = None
+
+
+def hot(func):
+    """Mark a function as part of the hot path; profiled only when enabled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _session
+        if session is None:
+            return func(*args, **kwargs)
+        return session.call(func, args, kwargs)
+    return wrapper
+
+
+def profile_dir_from_args(argv=None):
+    """Return the directory passed with --profile DIR (or --profile=DIR), if any."""
+    argv = sys.argv[1:] if argv is None else argv
+    for index, arg in enumerate(argv):
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1]
+        if arg == "--profile" and index + 1 < len(argv):
+            return argv[index + 1]
+    return None
+
+
+def start(run_name, output_dir=None):
+    """
+    Start profiling the hot path if enabled.
+
+    Args:
+        run_name: Used to name the output directory
+        output_dir: Overrides --profile / PROFILE_DIR
+
+    Returns:
+        The ProfileSession, or None when profiling is disabled
+    """
+    global _session
+    output_dir = output_dir or profile_dir_from_args() or os.environ.get("PROFILE_DIR")
+    if not output_dir:
+        return None
+
+    modes = [m.strip() for m in os.environ.get("PROFILE_MODES", ",".join(ALL_MODES)).split(",") if m.strip()]
+    unknown = set(modes) - set(ALL_MODES)
+    if unknown:
+        logger.warning(f"Ignoring unknown profile modes: {', '.join(sorted(unknown))}")
+    interval_ms = float(os.environ.get("PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS))
+
+    _session = ProfileSession(run_name, output_dir, [m for m in modes if m in ALL_MODES], interval_ms)
+    _session.start()
+    return _session
+
+
+def stop():
+    """Stop profiling and write outputs; returns the output directory or None."""
+    global _session
+    session, _session = _session, None
+    if session is None:
+        return None
+
+    try:
+        return session.dump()
+    except OSError as e:
+        logger.error(f"Failed to write profiles: {e}")
+        return None
@@ -0,0 +1,134 @@
+"""
+Token-bucket rate limiting shared by every scraper.
+
+All fetches call acquire(url) before hitting the network. Each host gets a
+bucket refilled at RATE_LIMIT_RPS tokens per second, holding at most
+RATE_LIMIT_BURST tokens. Callers reserve a token and sleep only for the
+deficit, so crawls run at exactly the allowed rate instead of sleeping a
+fixed amount after every request.
+
+When RATE_LIMIT_LOCK_DIR is set the bucket state lives in a lock file per
+host, so several scripts running at once share one budget.
+
+Environment:
+    RATE_LIMIT_RPS        Requests per second per host (default 2)
+    RATE_LIMIT_BURST      Bucket capacity (default 2)
+    RATE_LIMIT_LOCK_DIR   Directory for cross-process bucket files
+"""
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows - fall back to per-process buckets
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_RATE = 2.0  # requests per second, same pace as the old 0.5s sleeps
+DEFAULT_BURST = 2
+
+
+class TokenBucket:
+    """In-process token bucket."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens now and return how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+
+class FileTokenBucket:
+    """Token bucket whose state is shared between processes through a locked file."""
+
+    def __init__(self, path, rate, capacity):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens now and return how long the caller must wait before using them."""
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, 256)
+                now = time.time()
+                try:
+                    state = json.loads(raw) if raw else {}
+                    bucket_tokens = float(state["tokens"])
+                    updated = float(state["updated"])
+                except (ValueError, KeyError):
+                    bucket_tokens, updated = self.capacity, now
+
+                bucket_tokens = min(self.capacity, bucket_tokens + max(0.0, now - updated) * self.rate)
+                bucket_tokens -= tokens
+
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps({"tokens": bucket_tokens, "updated": now}).encode())
+                return max(0.0, -bucket_tokens / self.rate)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host):
+    """Get (or create) the bucket for a host using the environment settings."""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate = float(os.environ.get("RATE_LIMIT_RPS", DEFAULT_RATE))
+            capacity = float(os.environ.get("RATE_LIMIT_BURST", DEFAULT_BURST))
+            lock_dir = os.environ.get("RATE_LIMIT_LOCK_DIR")
+
+            if lock_dir and fcntl is not None:
+                os.makedirs(lock_dir, exist_ok=True)
+                bucket = FileTokenBucket(os.path.join(lock_dir, f"{host}.bucket"), rate, capacity)
+            else:
+                if lock_dir:
+                    logger.warning("File locking unavailable, rate limiting per process only")
+                bucket = TokenBucket(rate, capacity)
+
+            logger.debug(f"Rate limiting {host} to {rate} req/s (burst {capacity})")
+            _buckets[host] = bucket
+        return bucket
+
+
+def acquire(url, tokens=1):
+    """
+    Block until a request to `url` is allowed.
+
+    Returns:
+        Seconds spent waiting
+    """
+    host = urlparse(url).netloc or url
+    wait = get_bucket(host).reserve(tokens)
+    if wait > 0:
+        metrics.incr("rate_limit_waits")
+        with metrics.stage("rate_limit"):
+            time.sleep(wait)
+    return wait
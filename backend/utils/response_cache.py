@@ -0,0 +1,125 @@
+"""
+Persistent cache of fetched pages.
+
+Pages from finished seasons never change, so a backfill only needs to
+download each one once. ResponseCache keeps response bodies in a SQLite
+file keyed by URL (zlib-compressed). cached_fetch_all serves hits from it
+and fetches only the misses, concurrently and through utils.fetch, so the
+rate limiter, retries and circuit breaker still apply. Re-running a crawl,
+or re-parsing after a parser fix, then costs no requests at all.
+
+Failed fetches are never cached.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from utils import metrics
+from utils.fetch import fetch_all_with_status
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """URL -> page body store in SQLite."""
+
+    def __init__(self, path, max_age=None):
+        """
+        Args:
+            path: SQLite file (created if missing)
+            max_age: Seconds before a cached page is fetched again (None = never)
+        """
+        self.path = path
+        self.max_age = max_age
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(url TEXT PRIMARY KEY, body BLOB NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, url):
+        """Cached body of `url` as bytes, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT body, fetched_at FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        body, fetched_at = row
+        if self.max_age is not None and time.time() - fetched_at > self.max_age:
+            return None
+        return zlib.decompress(body)
+
+    def put_many(self, pages):
+        """
+        Store fetched pages.
+
+        Args:
+            pages: Iterable of (url, body bytes)
+        """
+        now = time.time()
+        rows = [(url, zlib.compress(body), now) for url, body in pages]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO responses (url, body, fetched_at) VALUES (?, ?, ?)", rows)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cached_fetch_all(urls, cache, max_workers=None):
+    """
+    Fetch several pages, serving what it can from the cache.
+
+    Args:
+        urls: URLs to fetch
+        cache: ResponseCache, or None to always fetch
+        max_workers: Concurrent fetches for the misses (defaults to FETCH_WORKERS)
+
+    Returns:
+        list: Page body bytes, or None if the fetch failed, for each URL in order
+    """
+    return [body for body, _ in cached_fetch_all_with_status(urls, cache, max_workers)]
+
+
+def cached_fetch_all_with_status(urls, cache, max_workers=None):
+    """
+    cached_fetch_all, with the HTTP status of each page.
+
+    Cached pages report 200. A failed fetch reports the last status the
+    server sent, or None if it never answered (see fetch_with_status).
+
+    Returns:
+        list: (body bytes or None, status) for each URL, in order
+    """
+    results = [(body, 200) if body is not None else (None, None)
+               for body in (cache.get(url) if cache is not None else None for url in urls)]
+    misses = [index for index, (body, _) in enumerate(results) if body is None]
+    metrics.incr("response_cache_hits", len(urls) - len(misses))
+    metrics.incr("response_cache_misses", len(misses))
+    if not misses:
+        return results
+
+    responses = fetch_all_with_status([urls[index] for index in misses], max_workers)
+    fetched = []
+    for index, (response, status) in zip(misses, responses):
+        if response is not None:
+            results[index] = (response.content, status)
+            fetched.append((urls[index], response.content))
+        else:
+            results[index] = (None, status)
+
+    if cache is not None and fetched:
+        cache.put_many(fetched)
+    return results
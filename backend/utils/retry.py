@@ -0,0 +1,171 @@
+"""
+Retry policy and circuit breaker for HTTP requests.
+
+RetryPolicy decides whether a failed request is worth retrying (connection
+errors, timeouts, 429 and 5xx are; 404 and other client errors are not) and
+how long to wait: exponential backoff with full jitter, or the server's
+Retry-After header when it sends one.
+
+CircuitBreaker tracks consecutive server failures per host. Once the
+threshold is reached the circuit opens and requests fail immediately; after
+the reset timeout a single probe request is let through and a success
+closes the circuit again.
+
+Environment:
+    HTTP_MAX_RETRIES            Retries after the first attempt (default 3)
+    HTTP_BACKOFF_BASE           First backoff delay in seconds (default 1)
+    HTTP_BACKOFF_MAX            Largest backoff / Retry-After honoured (default 30)
+    CIRCUIT_FAILURE_THRESHOLD   Consecutive failures that open a circuit (default 5)
+    CIRCUIT_RESET_SECONDS       Time before a probe is allowed (default 60)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Constants
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Statuses that say the server itself is unhealthy (429 is throttling, not an outage)
+BREAKER_FAILURE_STATUS = {500, 502, 503, 504}
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 60.0
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date).
+
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Status-aware retry decisions with exponential backoff and full jitter."""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, rng=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_retries=int(os.environ.get("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+            backoff_base=float(os.environ.get("HTTP_BACKOFF_BASE", DEFAULT_BACKOFF_BASE)),
+            backoff_max=float(os.environ.get("HTTP_BACKOFF_MAX", DEFAULT_BACKOFF_MAX)),
+        )
+
+    def is_retryable_status(self, status_code):
+        return status_code in RETRYABLE_STATUS
+
+    def delay(self, attempt, response=None):
+        """
+        Seconds to wait before retry number `attempt` (0-based).
+
+        Honours Retry-After on 429/503, otherwise uses full jitter:
+        uniform(0, min(backoff_max, base * 2**attempt)).
+        """
+        if response is not None and response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return self._rng.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker (closed -> open -> half-open -> closed)."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed, host is responding again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url):
+    """Get (or create) the circuit breaker for a URL's host."""
+    host = urlparse(url).netloc or url
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+                reset_seconds=float(os.environ.get("CIRCUIT_RESET_SECONDS", DEFAULT_RESET_SECONDS)),
+            )
+            _breakers[host] = breaker
+        return breaker
+
+
+def reset_breakers():
+    """Forget all circuit state (e.g. between runs in one process)."""
+    with _breakers_lock:
+        _breakers.clear()
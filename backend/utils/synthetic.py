@@ -0,0 +1,521 @@
+"""
+Seeded synthetic league generator for load testing.
+
+Builds a full fake league (clubs, competitions, grades, teams and a complete
+round-robin season of games) and renders it both as Firestore-ready documents
+and as round/team/index pages that match the selectors used by the scrapers
+in utils/parsers.py and utils/team_pages.py. The same seed always produces the same league.
+
+Usage (from the backend directory):
+    python -m utils.synthetic --scale 10 --out synthetic_league
+"""
+import argparse
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from html import escape
+
+from utils.ids import assign_game_id, make_club_id, make_comp_id, make_grade_id, make_team_id
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_SEED = 2025
+HOME_CLUB = "Mentone"
+
+# Defaults roughly match the current real league: 12 tracked grades of ~10 teams
+DEFAULT_GRADES = 12
+DEFAULT_TEAMS_PER_GRADE = 10
+DEFAULT_ROUNDS = 18
+
+CLUB_NAMES = [
+    "Mentone", "Camberwell", "Doncaster", "Essendon", "Footscray", "Hawthorn",
+    "Knox", "Melbourne", "Monash University", "Mornington Peninsula", "Old Xaverians",
+    "Waverley", "Yarra Valley", "Southern United", "Greensborough", "Box Hill",
+    "Dandenong", "Frankston", "Casey", "Altona", "Brunswick", "Carlton",
+    "Eltham", "Geelong", "Hampton", "Kilsyth", "Malvern", "Northcote",
+    "Ringwood", "St Kilda", "Sandringham", "Toorak", "Williamstown", "Werribee",
+]
+
+# (grade name, type, gender) templates cycled to build as many grades as needed
+GRADE_TEMPLATES = [
+    ("Women's Premier League", "Senior", "Women"),
+    ("Men's Premier League", "Senior", "Men"),
+    ("Women's Vic League 1", "Senior", "Women"),
+    ("Men's Vic League 1", "Senior", "Men"),
+    ("Women's Pennant A", "Senior", "Women"),
+    ("Men's Pennant B", "Senior", "Men"),
+    ("Women's Metro 1 South", "Senior", "Women"),
+    ("Men's Metro 2 South", "Senior", "Men"),
+    ("U14 Boys Pennant", "Junior", "Boys"),
+    ("U16 Girls Pennant", "Junior", "Girls"),
+    ("Masters Men 35+", "Midweek", "Men"),
+    ("Masters Women 45+", "Midweek", "Women"),
+]
+
+VENUES = [
+    "Mentone Grammar Playing Fields", "State Netball Hockey Centre",
+    "Doncaster Hockey Centre", "Footscray Hockey Centre", "Hawthorn Hockey Pavilion",
+    "Knox Regional Hockey Centre", "Monash University Sports Fields",
+    "Waverley Hockey Centre", "Yarra Valley Hockey Centre", "Rosanna Hockey Centre",
+]
+
+# Goal distribution for a single side, weighted towards low scores
+GOAL_WEIGHTS = [22, 27, 21, 14, 8, 5, 2, 1]
+
+SENIOR_START_TIMES = ["11:00", "12:30", "14:00", "15:30", "17:00", "18:30"]
+MIDWEEK_START_TIMES = ["18:00", "19:30", "20:30"]
+
+
+def _round_robin(teams, num_rounds):
+    """
+    Build a round-robin draw using the circle method.
+
+    Args:
+        teams: List of team dicts (a bye is added for odd counts)
+        num_rounds: Number of rounds to produce (wraps the draw if needed)
+
+    Returns:
+        List of rounds, each a list of (home, away) pairs
+    """
+    slots = list(teams)
+    if len(slots) % 2:
+        slots.append(None)
+
+    half = len(slots) // 2
+    base_rounds = []
+    for r in range(len(slots) - 1):
+        pairs = []
+        for i in range(half):
+            home, away = slots[i], slots[-(i + 1)]
+            if home is None or away is None:
+                continue
+            # Alternate home ground so clubs don't host every week
+            pairs.append((home, away) if r % 2 == 0 else (away, home))
+        base_rounds.append(pairs)
+        slots.insert(1, slots.pop())
+
+    rounds = []
+    for r in range(num_rounds):
+        pairs = base_rounds[r % len(base_rounds)]
+        if (r // len(base_rounds)) % 2:
+            pairs = [(away, home) for home, away in pairs]
+        rounds.append(pairs)
+    return rounds
+
+
+def _club_doc(club_name):
+    """Create a club document in the same shape season_builder writes."""
+    is_home_club = club_name == HOME_CLUB
+    return {
+        "id": make_club_id(club_name),
+        "name": f"{club_name} Hockey Club",
+        "short_name": club_name,
+        "code": "".join(word[0] for word in club_name.split()).upper(),
+        "primary_color": "#0066cc" if is_home_club else "#333333",
+        "secondary_color": "#ffffff",
+        "active": True,
+        "is_home_club": is_home_club,
+    }
+
+
+def generate_league(seed=DEFAULT_SEED, scale=1, num_grades=None, teams_per_grade=DEFAULT_TEAMS_PER_GRADE,
+                    num_rounds=DEFAULT_ROUNDS, season=None, start_date=None, as_of=None):
+    """
+    Generate a complete synthetic league.
+
+    Args:
+        seed: Random seed; the same seed always yields the same league
+        scale: Multiplier on the default number of grades (10 = 10x league size)
+        num_grades: Explicit grade count, overrides scale
+        teams_per_grade: Teams drawn into each grade (the home club is always one)
+        num_rounds: Rounds in the season
+        season: Season year (defaults to the current year)
+        start_date: Date of round 1 (defaults to the first Saturday of April)
+        as_of: Games before this time get scores (defaults to mid-season)
+
+    Returns:
+        Dict with lists of Firestore-ready "clubs", "competitions", "grades",
+        "teams" and "games" documents
+    """
+    rng = random.Random(seed)
+    season = season or datetime.now().year
+    num_grades = num_grades or DEFAULT_GRADES * scale
+
+    if start_date is None:
+        start_date = datetime(season, 4, 1)
+        start_date += timedelta(days=(5 - start_date.weekday()) % 7)
+    if as_of is None:
+        as_of = start_date + timedelta(weeks=num_rounds // 2)
+
+    # Make sure there are enough clubs to fill every grade
+    club_names = list(CLUB_NAMES)
+    while len(club_names) < teams_per_grade:
+        club_names.append(f"Synthetic {len(club_names) + 1}")
+
+    clubs = {name: _club_doc(name) for name in club_names}
+    competitions = {}
+    grades = []
+    teams = []
+    games = []
+
+    # Senior and junior grades share a competition per type, as on the real site
+    base_comp_id = 20000 + rng.randint(0, 999)
+    base_fixture_id = 30000 + rng.randint(0, 999)
+    source_game_id = 2000000 + rng.randint(0, 99999)
+
+    for grade_index in range(num_grades):
+        template_name, team_type, gender = GRADE_TEMPLATES[grade_index % len(GRADE_TEMPLATES)]
+        tier = grade_index // len(GRADE_TEMPLATES)
+        grade_name = template_name if tier == 0 else f"{template_name} {tier + 1}"
+        comp_name = f"{grade_name} - {season}"
+
+        comp_key = (team_type, tier)
+        if comp_key not in competitions:
+            comp_id = str(base_comp_id + len(competitions))
+            competitions[comp_key] = {
+                "id": make_comp_id(comp_id),
+                "original_id": comp_id,
+                "name": f"{season} {team_type} Competition",
+                "type": team_type,
+                "season": str(season),
+                "active": True,
+            }
+        competition = competitions[comp_key]
+        comp_id = competition["original_id"]
+        fixture_id = str(base_fixture_id + grade_index)
+        competition.setdefault("fixture_id", fixture_id)
+
+        grades.append({
+            "id": make_grade_id(fixture_id),
+            "original_id": fixture_id,
+            "name": comp_name,
+            "comp_id": comp_id,
+            "competition_name": competition["name"],
+            "competition_id": competition["id"],
+            "type": team_type,
+            "gender": gender,
+        })
+
+        # Draw opponents for the home club from the wider club pool
+        others = rng.sample([c for c in club_names if c != HOME_CLUB], teams_per_grade - 1)
+        grade_teams = []
+        for club_name in [HOME_CLUB] + others:
+            original_id = str(rng.randint(100000, 999999))
+            team = {
+                "id": make_team_id(original_id),
+                "original_id": original_id,
+                "name": f"{club_name} - {grade_name}",
+                "site_name": f"{club_name} Hockey Club",
+                "fixture_id": fixture_id,
+                "comp_id": comp_id,
+                "type": team_type,
+                "gender": gender,
+                "club": club_name,
+                "club_id": make_club_id(club_name).replace("club_", ""),
+                "is_home_club_team": club_name == HOME_CLUB,
+                "comp_name": comp_name,
+                "competition_name": competition["name"],
+                "competition_id": competition["id"],
+                "grade_name": comp_name,
+                "grade_id": make_grade_id(fixture_id),
+                "active": True,
+            }
+            grade_teams.append(team)
+            teams.append(team)
+
+        start_times = MIDWEEK_START_TIMES if team_type == "Midweek" else SENIOR_START_TIMES
+        day_offset = -3 if team_type == "Midweek" else 0  # Midweek grades play on Wednesday
+
+        for round_index, pairs in enumerate(_round_robin(grade_teams, num_rounds)):
+            round_num = round_index + 1
+            round_day = start_date + timedelta(weeks=round_index, days=day_offset)
+
+            for home, away in pairs:
+                hour, minute = (int(part) for part in rng.choice(start_times).split(":"))
+                game_date = round_day.replace(hour=hour, minute=minute)
+                venue = rng.choice(VENUES)
+                source_game_id += rng.randint(1, 7)
+
+                game = {
+                    "date": game_date,
+                    "venue": venue,
+                    "home_team": {
+                        "name": home["site_name"],
+                        "id": home["id"] if home["is_home_club_team"] else None,
+                        "club": home["club"],
+                        "club_id": home["club_id"],
+                    },
+                    "away_team": {
+                        "name": away["site_name"],
+                        "id": away["id"] if away["is_home_club_team"] else None,
+                        "club": away["club"],
+                        "club_id": away["club_id"],
+                    },
+                    "round": round_num,
+                    "comp_id": comp_id,
+                    "fixture_id": fixture_id,
+                    "type": team_type,
+                    "gender": gender,
+                    "url": f"/game/{source_game_id}",
+                    "source_id": str(source_game_id),
+                }
+
+                if game_date < as_of:
+                    game["home_team"]["score"] = rng.choices(range(len(GOAL_WEIGHTS)), GOAL_WEIGHTS)[0]
+                    game["away_team"]["score"] = rng.choices(range(len(GOAL_WEIGHTS)), GOAL_WEIGHTS)[0]
+                    game["status"] = "completed"
+                else:
+                    game["status"] = "scheduled"
+
+                assign_game_id(game)
+                games.append(game)
+
+    logger.info(f"Generated synthetic league: {len(clubs)} clubs, {len(grades)} grades, "
+                f"{len(teams)} teams, {len(games)} games")
+
+    return {
+        "clubs": list(clubs.values()),
+        "competitions": list(competitions.values()),
+        "grades": grades,
+        "teams": teams,
+        "games": games,
+    }
+
+
+def home_club_games(league):
+    """Return the games the pollers would store (those involving the home club)."""
+    return [
+        game for game in league["games"]
+        if HOME_CLUB in game["home_team"]["name"] or HOME_CLUB in game["away_team"]["name"]
+    ]
+
+
+def mentone_teams_map(league):
+    """Build the {team_name: team_data} map the pollers get from get_mentone_teams()."""
+    return {team["name"]: team for team in league["teams"] if team["is_home_club_team"]}
+
+
+def _render_game_card(game, team_ids, show_round=False):
+    """Render one game in the live site's card layout."""
+    home, away = game["home_team"], game["away_team"]
+    home_id = team_ids.get((game["fixture_id"], home["name"]), "")
+    away_id = team_ids.get((game["fixture_id"], away["name"]), "")
+    date = game["date"]
+
+    def score_html(team):
+        score = team.get("score")
+        return f'<div class="fixture-details-team-score">{"-" if score is None else score}</div>'
+
+    # Team pages label each game with its round
+    round_html = f'<div class="small text-muted">Round {game["round"]}</div>' if show_round else ""
+
+    return (
+        '<div class="card card-hover mb-4">'
+        f'<div class="card-body font-size-sm">{round_html}'
+        '<div class="row">'
+        '<div class="col-md pb-3 pb-lg-0 text-center text-md-left">'
+        f'<div>{date.strftime("%a %d %b %Y")}</div><div>{date.strftime("%H:%M")}</div>'
+        f'<a href="/venues/{escape(game["venue"].lower().replace(" ", "-"))}">{escape(game["venue"])}</a>'
+        '</div>'
+        f'<div class="col-lg-3 text-center"><a href="/games/team/{game["comp_id"]}/{home_id}">'
+        f'{escape(home["name"])}</a>{score_html(home)}</div>'
+        f'<div class="col-lg-3 text-center"><a href="/games/team/{game["comp_id"]}/{away_id}">'
+        f'{escape(away["name"])}</a>{score_html(away)}</div>'
+        '<div class="col-lg-2 text-center">'
+        f'<a class="btn btn-outline-primary btn-sm" href="https://www.hockeyvictoria.org.au{game["url"]}">Details</a>'
+        '</div>'
+        '</div></div></div>'
+    )
+
+
+def _render_fixture_details(game, team_ids, show_round=False):
+    """Render one game in the older fixture-details layout."""
+    home, away = game["home_team"], game["away_team"]
+    date_text = game["date"].strftime("%A, %d %B %Y - %I:%M %p")
+    round_html = f'<div class="fixture-details-round">Round {game["round"]}</div>' if show_round else ""
+
+    def score_text(team):
+        score = team.get("score")
+        return "-" if score is None else str(score)
+
+    return (
+        f'<div class="fixture-details">{round_html}'
+        f'<div class="fixture-details-date-long">{date_text}</div>'
+        f'<div class="fixture-details-venue">{escape(game["venue"])}</div>'
+        f'<div class="fixture-details-team-name">{escape(home["name"])}</div>'
+        f'<div class="fixture-details-team-score">{score_text(home)}</div>'
+        f'<div class="fixture-details-team-name">{escape(away["name"])}</div>'
+        f'<div class="fixture-details-team-score">{score_text(away)}</div>'
+        '</div>'
+    )
+
+
+def render_round_page(games, round_num, layout="card", team_ids=None):
+    """
+    Render a round page for one grade.
+
+    Args:
+        games: Games in the grade/round (any club)
+        round_num: Round number shown in the heading
+        layout: "card" (current site) or "fixture-details" (older layout)
+        team_ids: Optional {(fixture_id, site team name): team id} for team links
+
+    Returns:
+        HTML string parseable by extract_game_elements/parse_game_element
+    """
+    render = _render_game_card if layout == "card" else _render_fixture_details
+    body = "".join(render(game, team_ids or {}) for game in games)
+    return (
+        "<!DOCTYPE html><html><head><title>Hockey Victoria</title></head><body>"
+        f'<div class="container"><h1 class="h3">Round {round_num}</h1>{body}</div>'
+        "</body></html>"
+    )
+
+
+def render_team_page(team, games, layout="card", team_ids=None):
+    """
+    Render a team fixture page (/games/team/{comp_id}/{team_id}).
+
+    Args:
+        team: Team document
+        games: The team's games, in date order
+        layout: "card" (current site) or "fixture-details" (older layout)
+        team_ids: Optional {(fixture_id, site team name): team id} for team links
+
+    Returns:
+        HTML string parseable by utils/team_pages.parse_team_page
+    """
+    render = _render_game_card if layout == "card" else _render_fixture_details
+    body = "".join(render(game, team_ids or {}, show_round=True) for game in games)
+    return (
+        "<!DOCTYPE html><html><head><title>Hockey Victoria</title></head><body>"
+        f'<div class="container"><h2 class="h4">{escape(team["comp_name"])} · {escape(team["site_name"])}</h2>'
+        f"{body}</div></body></html>"
+    )
+
+
+def iter_team_pages(league, layout="card"):
+    """
+    Yield the team fixture page of every team in the league.
+
+    Yields:
+        Tuple of (comp_id, team original_id, html)
+    """
+    team_ids = {(team["fixture_id"], team["site_name"]): team["original_id"] for team in league["teams"]}
+    by_team = {}
+    for game in league["games"]:
+        for side in ("home_team", "away_team"):
+            by_team.setdefault((game["fixture_id"], game[side]["name"]), []).append(game)
+
+    for team in league["teams"]:
+        games = sorted(by_team.get((team["fixture_id"], team["site_name"]), []), key=lambda game: game["date"])
+        yield team["comp_id"], team["original_id"], render_team_page(team, games, layout, team_ids)
+
+
+def render_competition_index(league):
+    """Render the competitions index page parsed by get_competition_blocks."""
+    comp_names = {c["original_id"]: c["name"] for c in league["competitions"]}
+    sections = {}
+    for grade in league["grades"]:
+        sections.setdefault(grade["comp_id"], []).append(grade)
+
+    parts = []
+    for comp_id, grades in sections.items():
+        parts.append(f'<h2 class="h4">{escape(comp_names[comp_id])}</h2>')
+        for grade in grades:
+            parts.append(
+                '<div class="px-4 py-2 border-top">'
+                f'<a href="/games/{comp_id}/{grade["original_id"]}">{escape(grade["name"])}</a>'
+                '</div>'
+            )
+    return f"<!DOCTYPE html><html><body>{''.join(parts)}</body></html>"
+
+
+def iter_round_pages(league, layout="card"):
+    """
+    Yield every round page of the league.
+
+    Yields:
+        Tuple of (comp_id, fixture_id, round_num, html)
+    """
+    team_ids = {(team["fixture_id"], team["site_name"]): team["original_id"] for team in league["teams"]}
+    by_round = {}
+    for game in league["games"]:
+        by_round.setdefault((game["comp_id"], game["fixture_id"], game["round"]), []).append(game)
+
+    for (comp_id, fixture_id, round_num), games in sorted(by_round.items()):
+        yield comp_id, fixture_id, round_num, render_round_page(games, round_num, layout, team_ids)
+
+
+def _json_default(value):
+    """Serialise datetimes for JSON dumps."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def write_league(league, output_dir, layout="card"):
+    """
+    Write the league to disk.
+
+    Layout:
+        {output_dir}/firestore/{collection}.json   Firestore-ready documents
+        {output_dir}/html/games/index.html          Competition index page
+        {output_dir}/html/games/{comp}/{fixture}/round/{n}.html
+        {output_dir}/html/games/team/{comp}/{team}.html
+    """
+    firestore_dir = os.path.join(output_dir, "firestore")
+    os.makedirs(firestore_dir, exist_ok=True)
+    for collection, docs in league.items():
+        with open(os.path.join(firestore_dir, f"{collection}.json"), "w") as f:
+            json.dump(docs, f, indent=2, default=_json_default)
+
+    html_dir = os.path.join(output_dir, "html", "games")
+    os.makedirs(html_dir, exist_ok=True)
+    with open(os.path.join(html_dir, "index.html"), "w") as f:
+        f.write(render_competition_index(league))
+
+    page_count = 0
+    for comp_id, fixture_id, round_num, html in iter_round_pages(league, layout):
+        round_dir = os.path.join(html_dir, comp_id, fixture_id, "round")
+        os.makedirs(round_dir, exist_ok=True)
+        with open(os.path.join(round_dir, f"{round_num}.html"), "w") as f:
+            f.write(html)
+        page_count += 1
+
+    for comp_id, team_id, html in iter_team_pages(league, layout):
+        team_dir = os.path.join(html_dir, "team", comp_id)
+        os.makedirs(team_dir, exist_ok=True)
+        with open(os.path.join(team_dir, f"{team_id}.html"), "w") as f:
+            f.write(html)
+        page_count += 1
+
+    logger.info(f"Wrote {page_count} round and team pages and {len(league)} collections to {output_dir}")
+
+
+def main():
+    """Generate a synthetic league from the command line."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic hockey league for load testing")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier on the current league size")
+    parser.add_argument("--grades", type=int, default=None, help="Explicit number of grades")
+    parser.add_argument("--teams-per-grade", type=int, default=DEFAULT_TEAMS_PER_GRADE)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--season", type=int, default=None)
+    parser.add_argument("--layout", choices=["card", "fixture-details"], default="card")
+    parser.add_argument("--out", default="synthetic_league")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    league = generate_league(seed=args.seed, scale=args.scale, num_grades=args.grades,
+                             teams_per_grade=args.teams_per_grade, num_rounds=args.rounds,
+                             season=args.season)
+    write_league(league, args.out, layout=args.layout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Team fixture pages.
+
+/games/team/{comp_id}/{team_id} lists a team's whole season on one page:
+every fixture, with its round, date, venue and score. Reading it replaces
+up to MAX_ROUNDS round page requests per team with a single request.
+
+The pollers fall back to crawling round pages whenever the team page can't
+be used:
+    - the team has no numeric site team ID (season_builder's placeholder IDs)
+    - the page can't be fetched or has no fixtures on it
+    - a game on it has no round number (game IDs include the round)
+
+Environment:
+    TEAM_PAGES   Set to false to always crawl round pages (default true)
+"""
+import logging
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+from utils import metrics, page_index
+from utils.enhance import finish_games
+from utils.fetch import make_request
+from utils.parsers import SITE_URL, detect_date_format, extract_game_elements, parse_game_element
+
+logger = logging.getLogger(__name__)
+
+# Constants
+TEAM_PAGE_URL = SITE_URL + "/games/team/{comp_id}/{team_id}"
+ROUND_REGEX = re.compile(r"\bRound\s+(\d+)\b", re.IGNORECASE)
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def use_team_pages():
+    """Whether the pollers should try team pages before round pages (TEAM_PAGES)."""
+    return os.environ.get("TEAM_PAGES", "true").lower() not in ("false", "0", "f")
+
+
+def team_page_url(team_data):
+    """
+    Team fixture page URL for a team document.
+
+    Returns:
+        str or None: None if the team has no site team ID
+    """
+    comp_id = str(team_data.get("comp_id", ""))
+    team_id = str(team_data.get("original_id", ""))
+    if not comp_id or not team_id.isdigit():
+        return None
+    return TEAM_PAGE_URL.format(comp_id=comp_id, team_id=team_id)
+
+
+def extract_game_round(game_el):
+    """
+    Round number of a game on a team page.
+
+    Looks in the game element itself, then in the closest heading above it.
+
+    Returns:
+        int or None
+    """
+    match = ROUND_REGEX.search(game_el.get_text(" ", strip=True))
+    if not match:
+        heading = game_el.find_previous(lambda tag: tag.name in HEADING_TAGS and ROUND_REGEX.search(tag.get_text()))
+        match = ROUND_REGEX.search(heading.get_text()) if heading else None
+    return int(match.group(1)) if match else None
+
+
+def parse_team_page(html, comp_id, fixture_id, team_index):
+    """
+    Parse every game on a team fixture page.
+
+    Args:
+        html: Page content
+        comp_id: Competition the team plays in
+        fixture_id: Grade the team plays in
+        team_index: TeamIndex (or {name: team_data}) for the team
+
+    Returns:
+        list or None: Game dicts with their IDs and metadata, or None if the
+        page can't stand in for the round pages
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    game_elements = extract_game_elements(soup)
+    if not game_elements:
+        return None
+    date_format = detect_date_format(game_elements)
+
+    games = []
+    for game_el in game_elements:
+        round_num = extract_game_round(game_el)
+        game = parse_game_element(game_el, fixture_id, comp_id, team_index, round_num, date_format)
+        if not game:
+            continue
+        if round_num is None:
+            logger.info(f"Game without a round number on the team page for {comp_id}/{fixture_id}")
+            return None
+        games.append(game)
+
+    soup.decompose()
+    return finish_games(games) if games else None
+
+
+def fetch_team_games(team_data, team_index):
+    """
+    Fetch and parse a team's season from its team page.
+
+    Returns:
+        list or None: Game dicts with their IDs and metadata, or None to fall
+        back to round pages
+    """
+    url = team_page_url(team_data)
+    if url is None:
+        metrics.incr("team_page_fallbacks")
+        return None
+
+    logger.info(f"Checking team page: {url}")
+    response = make_request(url)
+    games = None
+    if response:
+        comp_id = str(team_data.get("comp_id", ""))
+        fixture_id = str(team_data.get("fixture_id", ""))
+        with metrics.stage("parse"):
+            games = page_index.parse_page(
+                url, response.content,
+                lambda page: parse_team_page(page, comp_id, fixture_id, team_index),
+                page_index.team_context(team_index))
+
+    if games is None:
+        logger.info(f"Team page unusable for {team_data.get('name', url)}, falling back to round pages")
+        metrics.incr("team_page_fallbacks")
+        return None
+
+    metrics.incr("team_pages_used")
+    return games
@@ -0,0 +1,266 @@
+"""
+Venue names, coordinates and geohashes.
+
+Fixture pages give a game's venue as free text ("Unknown Venue" when it is
+missing), spelt slightly differently from page to page: doubled spaces, "&"
+for "and", a pitch number on the end. normalise_venue_name tidies a name and
+interns it, so a season of games shares one string per venue, and venue_key
+reduces it to the lowercase tokens that identify the venue.
+
+VenueRegistry resolves a name to one venue record: the entry of the local
+gazetteer (venues_gazetteer.json: name, aliases, address, lat, lng) whose
+name or an alias has the same key, else the entry sharing most of its
+distinctive words, else a record of its own without coordinates. Records
+are shared, so every spelling of a venue resolves to the same object.
+Resolutions are kept in a SQLite cache stamped with the gazetteer's content
+hash, so each spelling is matched once rather than on every run, and editing
+the gazetteer redoes them. Located records carry the geohash of their
+coordinates, so venues near a point are a prefix range query.
+
+Environment:
+    VENUE_GAZETTEER   Gazetteer file (default venues_gazetteer.json in the backend directory)
+    VENUE_CACHE       Path of the SQLite resolution cache (unset = resolve in memory only)
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from utils import metrics
+from utils.ids import make_venue_id
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "venues_gazetteer.json")
+UNKNOWN_VENUE = "Unknown Venue"
+PLACEHOLDER_KEYS = {"unknown_venue", "tba", "tbc", "tbd"}
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Share of distinctive words a name needs in common with a gazetteer entry
+MATCH_THRESHOLD = 0.5
+
+WHITESPACE_REGEX = re.compile(r"\s+")
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+# "Pitch 2", "- Field B", "(Turf 1)" at the end of a name
+PITCH_REGEX = re.compile(r"[\s,(-]*\b(?:pitch|field|turf|court)\s+(?:no\.?\s*)?(?:\d+|[a-z])\b\)?$",
+                         re.IGNORECASE)
+TOKEN_ALIASES = {"center": "centre", "ctr": "centre", "cntr": "centre", "uni": "university", "univ": "university"}
+# Words too common in venue names to tell venues apart
+GENERIC_TOKENS = {"and", "the", "of", "hockey", "centre", "club", "field", "fields", "playing", "sports",
+                  "ground", "grounds", "pavilion", "reserve"}
+
+
+def normalise_venue_name(text):
+    """
+    Tidy a venue name from a fixture page and intern it.
+
+    Returns:
+        str: The name with whitespace collapsed (UNKNOWN_VENUE if empty)
+    """
+    name = WHITESPACE_REGEX.sub(" ", text or "").strip(" ,-")
+    return sys.intern(name) if name else UNKNOWN_VENUE
+
+
+def venue_key(name):
+    """
+    Lowercase tokens identifying a venue, joined by underscores.
+
+    Pitch numbers are dropped and common abbreviations expanded, so
+    "State Netball & Hockey Ctr - Pitch 2" and "State Netball and Hockey
+    Centre" share a key. Placeholders like "Unknown Venue" give "".
+    """
+    name = PITCH_REGEX.sub("", WHITESPACE_REGEX.sub(" ", name or "").strip())
+    tokens = [TOKEN_ALIASES.get(token, token) for token in TOKEN_REGEX.findall(name.lower().replace("&", " and "))]
+    key = "_".join(tokens)
+    return "" if key in PLACEHOLDER_KEYS else key
+
+
+def _distinctive(key):
+    return {token for token in key.split("_") if token and token not in GENERIC_TOKENS}
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Geohash of a point; nearby points share prefixes."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+class VenueCache:
+    """Venue key -> matched gazetteer venue ID store in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions "
+                "(key TEXT PRIMARY KEY, gazetteer_version TEXT NOT NULL, venue_id TEXT)"
+            )
+
+    def get(self, key, version):
+        """
+        Cached resolution of a key.
+
+        Returns:
+            Tuple of (found, venue_id); venue_id is None for a key that
+            matched no gazetteer entry
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT venue_id FROM resolutions WHERE key = ? AND gazetteer_version = ?", (key, version)
+            ).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def put(self, key, version, venue_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions (key, gazetteer_version, venue_id) VALUES (?, ?, ?)",
+                (key, version, venue_id),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class VenueRegistry:
+    """Resolves venue names to shared venue records."""
+
+    def __init__(self, gazetteer_path=DEFAULT_GAZETTEER, cache=None):
+        """
+        Args:
+            gazetteer_path: JSON list of {name, aliases, address, lat, lng}
+            cache: VenueCache, or None to resolve in memory only
+        """
+        self.cache = cache
+        self.records = {}
+        self._by_key = {}
+        self._distinctive = []
+        self._resolved = {}
+        self.version = "none"
+
+        if gazetteer_path and os.path.exists(gazetteer_path):
+            with open(gazetteer_path, "rb") as f:
+                raw = f.read()
+            self.version = hashlib.sha1(raw).hexdigest()[:12]
+            for entry in json.loads(raw):
+                self._add_entry(entry)
+        else:
+            logger.warning(f"No venue gazetteer at {gazetteer_path}, venues will have no coordinates")
+        logger.info(f"Loaded {len(self.records)} gazetteer venues")
+
+    def _add_entry(self, entry):
+        key = venue_key(entry["name"])
+        lat, lng = entry.get("lat"), entry.get("lng")
+        located = lat is not None and lng is not None
+        record = {
+            "id": make_venue_id(key),
+            "name": normalise_venue_name(entry["name"]),
+            "address": entry.get("address"),
+            "lat": lat,
+            "lng": lng,
+            "geohash": geohash_encode(lat, lng) if located else None,
+        }
+        self.records[record["id"]] = record
+        for name in [entry["name"]] + list(entry.get("aliases", [])):
+            alias_key = venue_key(name)
+            self._by_key[alias_key] = record["id"]
+            self._distinctive.append((record["id"], _distinctive(alias_key)))
+
+    def _match(self, key):
+        """Gazetteer venue sharing most distinctive words with a key, if clearly the best."""
+        tokens = _distinctive(key)
+        if not tokens:
+            return None
+        scores = {}
+        for venue_id, entry_tokens in self._distinctive:
+            if entry_tokens:
+                score = len(tokens & entry_tokens) / len(tokens | entry_tokens)
+                scores[venue_id] = max(score, scores.get(venue_id, 0))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < MATCH_THRESHOLD:
+            return None
+        if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+            return None
+        return ranked[0][0]
+
+    def _lookup(self, key):
+        venue_id = self._by_key.get(key)
+        if venue_id is not None:
+            return venue_id
+        if self.cache is not None:
+            found, venue_id = self.cache.get(key, self.version)
+            if found:
+                metrics.incr("venue_cache_hits")
+                return venue_id
+        venue_id = self._match(key)
+        metrics.incr("venue_matches")
+        if self.cache is not None:
+            self.cache.put(key, self.version, venue_id)
+        return venue_id
+
+    def resolve(self, name):
+        """
+        Venue record for a venue name.
+
+        Returns:
+            dict: {id, name, address, lat, lng, geohash} shared by every
+            spelling of the venue (address and coordinates None when it is
+            not in the gazetteer), or None for a missing venue
+        """
+        key = venue_key(name)
+        if not key:
+            return None
+        record = self._resolved.get(key)
+        if record is None:
+            venue_id = self._lookup(key)
+            if venue_id is None:
+                record = {"id": make_venue_id(key), "name": normalise_venue_name(name),
+                          "address": None, "lat": None, "lng": None, "geohash": None}
+                logger.debug(f"Venue not in the gazetteer: {name}")
+            else:
+                record = self.records[venue_id]
+            self._resolved[key] = record
+        return record
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+
+def get_registry():
+    """Registry configured by VENUE_GAZETTEER and VENUE_CACHE."""
+    cache_path = os.environ.get("VENUE_CACHE")
+    return VenueRegistry(os.environ.get("VENUE_GAZETTEER", DEFAULT_GAZETTEER),
+                         VenueCache(cache_path) if cache_path else None)
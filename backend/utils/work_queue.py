@@ -0,0 +1,146 @@
+"""
+Resumable work queue for long crawls.
+
+Tasks live in a SQLite file with a status (pending, running, done,
+failed), so a crawl that is interrupted - or dies - picks up where it
+stopped the next time it runs: tasks a previous run had claimed but not
+finished go back to pending. Keys are unique, so re-adding work that is
+already queued or done is a no-op, and tasks are claimed in the order they
+were added.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Constants
+DEFAULT_MAX_ATTEMPTS = 3
+STATUSES = ("pending", "running", "done", "failed")
+
+
+class WorkQueue:
+    """Persistent FIFO of keyed tasks."""
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path: SQLite file (created if missing)
+            max_attempts: Failures after which a task is parked as failed
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL, kind TEXT NOT NULL, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+                "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, seq)")
+
+            # Claimed by a run that never finished them
+            resumed = self._conn.execute("UPDATE tasks SET status = 'pending' WHERE status = 'running'").rowcount
+        if resumed:
+            logger.info(f"Resuming {resumed} unfinished tasks from {path}")
+
+    def add(self, key, kind, payload):
+        """Queue a task unless one with this key already exists. Returns True if it was added."""
+        return self.add_many([(key, kind, payload)]) == 1
+
+    def add_many(self, tasks):
+        """
+        Queue several tasks, skipping keys already present.
+
+        Args:
+            tasks: Iterable of (key, kind, payload dict)
+
+        Returns:
+            int: Number of tasks added
+        """
+        now = time.time()
+        rows = [(key, kind, json.dumps(payload, sort_keys=True), now) for key, kind, payload in tasks]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (key, kind, payload, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, limit):
+        """
+        Take up to `limit` pending tasks, oldest first, and mark them running.
+
+        Returns:
+            list: Task dicts with key, kind, payload and attempts
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT key, kind, payload, attempts FROM tasks WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET status = 'running', updated_at = ? WHERE key = ?",
+                [(time.time(), key) for key, _, _, _ in rows],
+            )
+        return [{"key": key, "kind": kind, "payload": json.loads(payload), "attempts": attempts}
+                for key, kind, payload, attempts in rows]
+
+    def complete(self, keys):
+        """Mark tasks done."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE tasks SET status = 'done', error = NULL, updated_at = ? WHERE key = ?",
+                                   [(now, key) for key in keys])
+
+    def fail(self, key, error):
+        """
+        Record a failed attempt; the task is retried until it reaches max_attempts.
+
+        Returns:
+            bool: True if the task will be retried
+        """
+        with self._lock, self._conn:
+            attempts = self._conn.execute("SELECT attempts FROM tasks WHERE key = ?", (key,)).fetchone()[0] + 1
+            status = "pending" if attempts < self.max_attempts else "failed"
+            self._conn.execute("UPDATE tasks SET status = ?, attempts = ?, error = ?, updated_at = ? WHERE key = ?",
+                               (status, attempts, str(error), time.time(), key))
+        return status == "pending"
+
+    def retry_failed(self):
+        """Put every failed task back in the queue. Returns how many there were."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed'"
+            ).rowcount
+
+    def failures(self):
+        """(key, error) of every task parked as failed."""
+        with self._lock:
+            return self._conn.execute("SELECT key, error FROM tasks WHERE status = 'failed' ORDER BY seq").fetchall()
+
+    def counts(self):
+        """Number of tasks in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update(rows)
+        return counts
+
+    def clear(self):
+        """Forget every task."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
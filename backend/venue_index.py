@@ -0,0 +1,186 @@
+"""
+Build the venues collection the map views read.
+
+Every venue with games gets one document: its canonical name, address,
+coordinates and geohash from the venue registry (utils/venues.py), the
+spellings the fixture pages use for it, and its upcoming games in date
+order. The frontend then draws the venue map from a single read of venues,
+and venues near a point are one range query on geohash, instead of working
+venues out of the games on every load.
+
+Upcoming games come from one range query. Only venue documents whose
+contents changed are written, and venues whose games have all been played
+are emptied rather than deleted. Run it after the pollers, e.g. from the
+same cron job.
+
+Usage (from the backend directory):
+    python venue_index.py
+
+Environment:
+    DRY_RUN        Report what would be written without writing anything
+    VENUE_GAZETTEER, VENUE_CACHE (utils/venues.py)
+"""
+import logging
+import time
+from datetime import datetime, timezone
+
+from utils.db import db, firestore
+from utils.batch import BatchWriter, is_dry_run
+from utils.changes import team_ids
+from utils.venues import get_registry
+from utils import metrics
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(f"venue_index_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Constants
+VENUES_COLLECTION = "venues"
+WRITE_BATCH_SIZE = 400
+# Keeps each venue document well under Firestore's 1 MiB limit
+MAX_UPCOMING_GAMES = 100
+
+def load_upcoming_games(now):
+    """Games starting from `now`, in one range query."""
+    with metrics.stage("firestore_read"):
+        games = [doc.to_dict() for doc in db.collection("games").where("date", ">=", now).stream()]
+    metrics.incr("firestore_reads", len(games))
+    logger.info(f"Loaded {len(games)} upcoming games")
+    return games
+
+def game_summary(game):
+    """What a venue document lists of each upcoming game."""
+    home, away = game.get("home_team", {}), game.get("away_team", {})
+    return {
+        "id": game.get("id"),
+        "date": game.get("date"),
+        "comp_id": game.get("comp_id"),
+        "fixture_id": game.get("fixture_id"),
+        "round": game.get("round"),
+        "home_team": home.get("name"),
+        "away_team": away.get("name"),
+        "home_club_id": home.get("club_id"),
+        "away_club_id": away.get("club_id"),
+        "team_ids": team_ids(game),
+    }
+
+def _sort_date(value):
+    """Naive, for ordering games read back from Firestore (aware) alongside parsed ones (naive)."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value or datetime.max
+
+def build_venues(games, registry):
+    """
+    Group upcoming games by venue.
+
+    Args:
+        games: Upcoming game data
+        registry: VenueRegistry
+
+    Returns:
+        dict: Venue ID -> venue document
+    """
+    venues = {}
+    unplaced = 0
+    for game in games:
+        record = registry.resolve(game.get("venue"))
+        if record is None:
+            unplaced += 1
+            continue
+        venue = venues.get(record["id"])
+        if venue is None:
+            venue = venues[record["id"]] = dict(record, names=set(), upcoming_games=[])
+        venue["names"].add(game["venue"])
+        venue["upcoming_games"].append(game_summary(game))
+
+    for venue in venues.values():
+        venue["names"] = sorted(venue["names"])
+        venue["upcoming_games"].sort(key=lambda g: (_sort_date(g["date"]), g["id"] or ""))
+        venue["upcoming_count"] = len(venue["upcoming_games"])
+        venue["upcoming_games"] = venue["upcoming_games"][:MAX_UPCOMING_GAMES]
+        venue["next_game_date"] = venue["upcoming_games"][0]["date"]
+
+    if unplaced:
+        logger.info(f"{unplaced} upcoming games have no venue yet")
+    return venues
+
+def _comparable(value):
+    """Stored values as they compare with freshly built ones."""
+    if isinstance(value, dict):
+        return {key: _comparable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_comparable(item) for item in value]
+    if isinstance(value, datetime):
+        return _sort_date(value).replace(second=0, microsecond=0)
+    return value
+
+def sync_venues(venues):
+    """
+    Write the venue documents that changed and empty those with no games left.
+
+    Returns:
+        Tuple of (written, unchanged) counts
+    """
+    with metrics.stage("firestore_read"):
+        existing = {doc.id: doc.to_dict() for doc in db.collection(VENUES_COLLECTION).stream()}
+
+    for venue_id, stored in existing.items():
+        if venue_id not in venues and stored.get("upcoming_count"):
+            venues[venue_id] = {"id": venue_id, "upcoming_games": [], "upcoming_count": 0, "next_game_date": None}
+
+    written = unchanged = 0
+    with BatchWriter(db, VENUES_COLLECTION, batch_size=WRITE_BATCH_SIZE, flush_seconds=None,
+                     check_existing=False) as writer:
+        for venue_id, venue in venues.items():
+            stored = existing.get(venue_id)
+            if stored is None:
+                document = dict(venue, created_at=firestore.SERVER_TIMESTAMP, updated_at=firestore.SERVER_TIMESTAMP)
+            else:
+                changes = {field: value for field, value in venue.items()
+                           if _comparable(stored.get(field)) != _comparable(value)}
+                if not changes:
+                    unchanged += 1
+                    continue
+                document = dict(changes, id=venue_id, updated_at=firestore.SERVER_TIMESTAMP)
+            logger.info(f"{'DRY RUN: Would write' if is_dry_run() else 'Writing'} venue {venue_id} "
+                        f"({venue['upcoming_count']} upcoming games)")
+            writer.write(document)
+            written += 1
+
+    logger.info(f"venues: {written} written, {unchanged} unchanged")
+    return written, unchanged
+
+def main():
+    """Main function to rebuild the venue index."""
+    start_time = time.time()
+    metrics.start_run("venue_index")
+    logger.info("=== Mentone Hockey Club Venue Index ===")
+
+    if is_dry_run():
+        logger.info("Running in DRY RUN mode - no Firestore changes will be made")
+
+    registry = get_registry()
+    try:
+        venues = build_venues(load_upcoming_games(datetime.now()), registry)
+        located = sum(1 for venue in venues.values() if venue["geohash"])
+        logger.info(f"Found {len(venues)} venues with upcoming games ({located} located)")
+        sync_venues(venues)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}", exc_info=True)
+    finally:
+        registry.close()
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Venue index completed in {elapsed_time:.2f} seconds")
+    metrics.write_report()
+
+if __name__ == "__main__":
+    main()
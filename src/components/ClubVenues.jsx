@@ -1,51 +1,77 @@
 import React, { useState, useEffect } from 'react';
 import VenueMap from './VenueMap';
-import { fetchGamesByDateRange } from '../services/firestoreService';
+import { fetchGamesByDateRange, fetchVenues } from '../services/firestoreService';
 import { format, startOfMonth, endOfMonth, addMonths, subMonths } from 'date-fns';
 
+// Games store club IDs without the "club_" prefix
+const normaliseClubId = (id) => (id || '').toLowerCase().replace('club_', '');
+
+// An upcoming game from the venue index, in the shape of a game document
+const summaryToGame = (game) => ({
+    ...game,
+    home_team: { name: game.home_team, club_id: game.home_club_id },
+    away_team: { name: game.away_team, club_id: game.away_club_id },
+    status: 'scheduled'
+});
+
 const ClubVenues = ({ clubId = 'club_mentone' }) => {
     const [venues, setVenues] = useState([]);
     const [loading, setLoading] = useState(true);
     const [selectedVenue, setSelectedVenue] = useState(null);
     const [currentMonth, setCurrentMonth] = useState(() => startOfMonth(new Date()));
-    const currentMonthEnd = endOfMonth(currentMonth);
 
-    // Fetch games and extract venues
+    // Upcoming games come from the venue index; games already played (the
+    // index only lists upcoming ones) from the games query, as before
     useEffect(() => {
         const fetchVenueData = async () => {
             setLoading(true);
 
             try {
-                // Get games for the selected month
-                const gamesData = await fetchGamesByDateRange(
-                    currentMonth,
-                    currentMonthEnd,
-                    clubId
-                );
-
-                // Extract unique venues with game counts
+                const now = new Date();
+                const monthEnd = endOfMonth(currentMonth);
+                const playedEnd = now < monthEnd ? now : monthEnd;
+                const upcomingStart = now > currentMonth ? now : currentMonth;
+                const [venuesIndex, playedGames] = await Promise.all([
+                    monthEnd >= now ? fetchVenues() : Promise.resolve([]),
+                    currentMonth < now ? fetchGamesByDateRange(currentMonth, playedEnd, clubId) : Promise.resolve([])
+                ]);
+
+                const club = normaliseClubId(clubId);
+                const isClubGame = game =>
+                    normaliseClubId(game.home_club_id) === club || normaliseClubId(game.away_club_id) === club;
+
                 const venueMap = new Map();
+                const venueIdByName = new Map();
+                venuesIndex.forEach(venue => {
+                    (venue.names || []).forEach(name => venueIdByName.set(name, venue.id));
+                    venueMap.set(venue.id, {
+                        id: venue.id,
+                        name: venue.name,
+                        address: venue.address || venue.name,
+                        games: (venue.upcoming_games || [])
+                            .filter(game => isClubGame(game) && game.date >= upcomingStart && game.date <= monthEnd)
+                            .map(summaryToGame)
+                    });
+                });
 
-                gamesData.forEach(game => {
+                // Played games join their indexed venue when it is known, else one named after them
+                playedGames.forEach(game => {
                     const venueName = game.venue || 'Unknown Venue';
-
-                    if (!venueMap.has(venueName)) {
-                        venueMap.set(venueName, {
-                            id: venueName.replace(/\s+/g, '-').toLowerCase(),
-                            name: venueName,
-                            address: venueName, // Ideally would have real addresses
-                            gamesCount: 1,
-                            games: [game]
-                        });
-                    } else {
-                        const venue = venueMap.get(venueName);
-                        venue.gamesCount++;
-                        venue.games.push(game);
+                    const venueId = venueIdByName.get(venueName) || venueName.replace(/\s+/g, '-').toLowerCase();
+                    if (!venueMap.has(venueId)) {
+                        venueMap.set(venueId, { id: venueId, name: venueName, address: venueName, games: [] });
                     }
+                    venueMap.get(venueId).games.push(game);
                 });
 
-                // Convert to array and sort by game count
+                // Venues with games this month, busiest first
                 const venuesData = Array.from(venueMap.values())
+                    .filter(venue => venue.games.length > 0)
+                    .map(venue => ({
+                        ...venue,
+                        gamesCount: venue.games.length,
+                        games: venue.games.sort((a, b) => new Date(a.date) - new Date(b.date))
+                    }))
                     .sort((a, b) => b.gamesCount - a.gamesCount);
 
                 setVenues(venuesData);
@@ -57,7 +83,7 @@ const ClubVenues = ({ clubId = 'club_mentone' }) => {
         };
 
         fetchVenueData();
-    }, [clubId, currentMonth, currentMonthEnd]);
+    }, [clubId, currentMonth]);
 
     // Navigate to previous month
     const goToPreviousMonth = () => {
@@ -1,48 +1,39 @@
 import React, { useState, useEffect } from 'react';
+import { fetchVenues } from '../services/firestoreService';
 
 const VenueMap = () => {
-    const [venues, setVenues] = useState([
-        {
-            id: 1,
-            name: 'Mentone Grammar Playing Fields',
-            address: 'Mentone, VIC',
-            x: 150,
-            y: 120,
-            gamesCount: 8
-        },
-        {
-            id: 2,
-            name: 'State Netball Hockey Centre',
-            address: 'Parkville, VIC',
-            x: 50,
-            y: 70,
-            gamesCount: 4
-        },
-        {
-            id: 3,
-            name: 'Footscray Hockey Centre',
-            address: 'Footscray, VIC',
-            x: 30,
-            y: 150,
-            gamesCount: 2
-        },
-        {
-            id: 4,
-            name: 'Hawthorn Hockey Club',
-            address: 'Hawthorn, VIC',
-            x: 120,
-            y: 60,
-            gamesCount: 3
-        },
-        {
-            id: 5,
-            name: 'Doncaster Hockey Club',
-            address: 'Doncaster, VIC',
-            x: 200,
-            y: 40,
-            gamesCount: 1
-        }
-    ]);
+    const [venues, setVenues] = useState([]);
+
+    // Venues come precomputed from the venue index, one read per load
+    useEffect(() => {
+        const loadVenues = async () => {
+            try {
+                const venuesData = await fetchVenues();
+                const located = venuesData.filter(venue => venue.lat != null && venue.lng != null);
+
+                // Fit the located venues into the map, with a margin around the edges
+                const lats = located.map(venue => venue.lat);
+                const lngs = located.map(venue => venue.lng);
+                const [minLat, maxLat] = [Math.min(...lats), Math.max(...lats)];
+                const [minLng, maxLng] = [Math.min(...lngs), Math.max(...lngs)];
+                const scale = (value, min, max) => (max > min ? 10 + ((value - min) / (max - min)) * 80 : 50);
+
+                setVenues(located
+                    .map(venue => ({
+                        ...venue,
+                        address: venue.address || venue.name,
+                        gamesCount: venue.upcoming_count || 0,
+                        x: scale(venue.lng, minLng, maxLng),
+                        y: 100 - scale(venue.lat, minLat, maxLat)
+                    }))
+                    .sort((a, b) => b.gamesCount - a.gamesCount));
+            } catch (error) {
+                console.error('Error loading venues:', error);
+            }
+        };
+
+        loadVenues();
+    }, []);
 
     const [selectedVenue, setSelectedVenue] = useState(null);
 
@@ -84,8 +75,8 @@ const VenueMap = () => {
                             key={venue.id}
                             className="absolute cursor-pointer transition-transform hover:scale-110"
                             style={{
-                                left: `${venue.x}px`,
-                                top: `${venue.y}px`
+                                left: `${venue.x}%`,
+                                top: `${venue.y}%`
                             }}
                             onClick={() => handleVenueClick(venue)}
                         >
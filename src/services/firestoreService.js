@@ -156,6 +156,35 @@ export const groupGamesByCategory = (games) => {
     };
 };
 
+/**
+ * Fetch the venue index (written by backend/venue_index.py) in one read
+ * @returns {Promise<Array>} Venues with coordinates, geohash and upcoming games
+ */
+export const fetchVenues = async () => {
+    try {
+        const venuesRef = collection(db, 'venues');
+        const querySnapshot = await getDocs(venuesRef);
+
+        const toDate = (value) => (value instanceof Timestamp ? value.toDate() : value);
+
+        const venues = [];
+        querySnapshot.forEach((doc) => {
+            const data = doc.data();
+            venues.push({
+                id: doc.id,
+                ...data,
+                next_game_date: toDate(data.next_game_date),
+                upcoming_games: (data.upcoming_games || []).map(game => ({ ...game, date: toDate(game.date) })),
+            });
+        });
+
+        return venues;
+    } catch (error) {
+        console.error('Error fetching venues:', error);
+        throw error;
+    }
+};
+
 /**
  * Fetch all clubs
  */